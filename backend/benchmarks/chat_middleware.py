@@ -0,0 +1,364 @@
+"""
+Benchmark concurrent chat streams while other chats run a slow RAG lookup.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.chat_middleware --streams 20 --heavy 1 \\
+        --rag-seconds 2 --output chat-middleware-results.json
+
+The app runs under uvicorn in a child process with a temporary DATA_DIR,
+Ollama disabled and one OpenAI connection to a fake upstream served by this
+process, which streams --chunks chunks every --chunk-interval seconds for
+the model "bench". get_rag_context is replaced in the child by a step that
+takes --rag-seconds, sleeping (--rag-mode sleep, like a vector database or
+embedding request) or spinning (--rag-mode cpu), so that only the cost of
+the middleware around it is measured.
+
+Two scenarios run against the same server:
+
+    baseline   --streams chats without files
+    heavy      the same chats, plus --heavy chats with files started once
+               the streams are flowing, which go through the RAG step
+
+They run in turn --rounds times and each reports the medians over its
+rounds of the chunks/s of the streams, their time to first chunk and the
+gaps between their chunks; a step blocking the event loop shows up as
+gaps of about --rag-seconds and a drop of throughput in the heavy scenario.
+Run it on an earlier commit to compare.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+MODEL_ID = "bench"
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def serve(args):
+    import uvicorn
+
+    import open_webui.main as main
+
+    def slow_rag_context(*_args, **_kwargs):
+        if args.rag_mode == "cpu":
+            end = time.perf_counter() + args.rag_seconds
+            while time.perf_counter() < end:
+                pass
+        else:
+            time.sleep(args.rag_seconds)
+        return [], []
+
+    main.get_rag_context = slow_rag_context
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def fake_upstream(chunks: int, interval: float) -> web.Application:
+    async def models(request):
+        return web.json_response(
+            {"object": "list", "data": [{"id": MODEL_ID, "object": "model"}]}
+        )
+
+    async def chat_completions(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(chunks):
+            chunk = {
+                "id": "bench",
+                "object": "chat.completion.chunk",
+                "model": MODEL_ID,
+                "choices": [{"index": 0, "delta": {"content": f"token{i} "}}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(interval)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/v1/models", models)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def wait_for_server(session: aiohttp.ClientSession, url: str, process):
+    for _ in range(600):
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}")
+        try:
+            async with session.get(f"{url}/health") as r:
+                if r.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("The server did not start")
+
+
+async def sign_up(session: aiohttp.ClientSession, url: str) -> str:
+    async with session.post(
+        f"{url}/api/v1/auths/signup",
+        json={"name": "bench", "email": "bench@example.com", "password": "bench"},
+    ) as r:
+        r.raise_for_status()
+        return (await r.json())["token"]
+
+
+async def wait_for_model(session: aiohttp.ClientSession, url: str, headers: dict):
+    for _ in range(100):
+        async with session.get(f"{url}/api/models", headers=headers) as r:
+            if any(model["id"] == MODEL_ID for model in (await r.json())["data"]):
+                return
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"The model {MODEL_ID} is not listed")
+
+
+async def chat(
+    session: aiohttp.ClientSession, url: str, headers: dict, files: bool
+) -> dict:
+    body = {
+        "model": MODEL_ID,
+        "stream": True,
+        "messages": [{"role": "user", "content": "Hello"}],
+    }
+    if files:
+        body["files"] = [{"type": "collection", "id": "bench", "name": "bench"}]
+
+    start = time.perf_counter()
+    arrivals = []
+    async with session.post(
+        f"{url}/api/chat/completions", headers=headers, json=body
+    ) as r:
+        r.raise_for_status()
+        async for line in r.content:
+            if line.startswith(b"data: ") and b"chat.completion.chunk" in line:
+                arrivals.append(time.perf_counter())
+    return {"start": start, "end": time.perf_counter(), "arrivals": arrivals}
+
+
+async def run_scenario(
+    session: aiohttp.ClientSession, url: str, headers: dict, args, heavy: int
+) -> dict:
+    streams = [
+        asyncio.create_task(chat(session, url, headers, files=False))
+        for _ in range(args.streams)
+    ]
+    heavy_results = []
+    if heavy:
+        # Let the streams flow before the RAG steps start
+        await asyncio.sleep(args.chunks * args.chunk_interval / 4)
+        heavy_results = await asyncio.gather(
+            *[chat(session, url, headers, files=True) for _ in range(heavy)]
+        )
+    results = await asyncio.gather(*streams)
+
+    chunks = sum(len(result["arrivals"]) for result in results)
+    elapsed = max(r["end"] for r in results) - min(r["start"] for r in results)
+    first_chunk = [
+        result["arrivals"][0] - result["start"]
+        for result in results
+        if result["arrivals"]
+    ]
+    gaps = [
+        later - earlier
+        for result in results
+        for earlier, later in zip(result["arrivals"], result["arrivals"][1:])
+    ]
+    return {
+        "streams": args.streams,
+        "heavy": heavy,
+        "chunks": chunks,
+        "chunks_per_s": chunks / elapsed if elapsed else 0.0,
+        "first_chunk_p50_ms": percentile(first_chunk, 50),
+        "first_chunk_p95_ms": percentile(first_chunk, 95),
+        "gap_p50_ms": percentile(gaps, 50),
+        "gap_p99_ms": percentile(gaps, 99),
+        "gap_max_ms": max(gaps) * 1000 if gaps else 0.0,
+        "heavy_latency_ms": [
+            (result["end"] - result["start"]) * 1000 for result in heavy_results
+        ],
+    }
+
+
+def summarize(runs: list[dict]) -> dict:
+    # Medians over the rounds, the RAG chat latencies of every round
+    return {
+        key: (
+            [value for run in runs for value in run[key]]
+            if isinstance(runs[0][key], list)
+            else float(np.median([run[key] for run in runs]))
+        )
+        for key in runs[0]
+    }
+
+
+async def run(args) -> dict:
+    upstream_port, port = free_port(), free_port()
+    runner = web.AppRunner(fake_upstream(args.chunks, args.chunk_interval))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", upstream_port).start()
+
+    data_dir = tempfile.mkdtemp(prefix="chat-middleware-benchmark-")
+    env = {
+        **os.environ,
+        "DATA_DIR": data_dir,
+        "GLOBAL_LOG_LEVEL": "ERROR",
+        "ENABLE_OLLAMA_API": "false",
+        "OPENAI_API_BASE_URLS": f"http://127.0.0.1:{upstream_port}/v1",
+        "OPENAI_API_KEYS": "bench",
+        "RAG_EMBEDDING_ENGINE": "ollama",
+        "VECTOR_DB": "numpy",
+        "WEBUI_SECRET_KEY": "bench",
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.chat_middleware",
+            "--serve",
+            "--port",
+            str(port),
+            "--rag-seconds",
+            str(args.rag_seconds),
+            "--rag-mode",
+            args.rag_mode,
+        ],
+        env=env,
+        stdout=None if args.verbose else subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+
+    url = f"http://127.0.0.1:{port}"
+    try:
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0),
+            timeout=aiohttp.ClientTimeout(total=None),
+        ) as session:
+            await wait_for_server(session, url, process)
+            headers = {"Authorization": f"Bearer {await sign_up(session, url)}"}
+            await wait_for_model(session, url, headers)
+
+            # Warm up the connections and lazy imports of both paths
+            await asyncio.gather(
+                chat(session, url, headers, files=False),
+                *[chat(session, url, headers, files=True) for _ in range(args.heavy)],
+            )
+
+            rounds = {"baseline": [], "heavy": []}
+            for i in range(args.rounds):
+                print(f"round {i + 1}/{args.rounds} ...", flush=True)
+                for name, heavy in [("baseline", 0), ("heavy", args.heavy)]:
+                    rounds[name].append(
+                        await run_scenario(session, url, headers, args, heavy)
+                    )
+            return {name: summarize(runs) for name, runs in rounds.items()}
+    finally:
+        process.terminate()
+        process.wait()
+        await runner.cleanup()
+
+
+def print_results(results: dict, args):
+    for name, result in results.items():
+        print(
+            f"{name:>9}: {result['chunks_per_s']:8.1f} chunks/s  "
+            f"first chunk p50 {result['first_chunk_p50_ms']:7.1f} ms  "
+            f"p95 {result['first_chunk_p95_ms']:7.1f} ms  "
+            f"gap p50 {result['gap_p50_ms']:7.1f} ms  "
+            f"p99 {result['gap_p99_ms']:7.1f} ms  "
+            f"max {result['gap_max_ms']:7.1f} ms"
+        )
+        if result["heavy_latency_ms"]:
+            print(
+                f"{'':>9}  RAG chats {', '.join(f'{latency:.0f}' for latency in result['heavy_latency_ms'])} ms"
+            )
+
+    baseline, heavy = results["baseline"], results["heavy"]
+    if baseline["chunks_per_s"]:
+        change = (heavy["chunks_per_s"] / baseline["chunks_per_s"] - 1) * 100
+        print(
+            f"\nThroughput of the streams with {args.heavy} RAG chat(s) of "
+            f"{args.rag_seconds}s ({args.rag_mode}): {change:+.1f}%, "
+            f"worst gap {heavy['gap_max_ms']:.0f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--heavy", type=int, default=1)
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--chunk-interval", type=float, default=0.02)
+    parser.add_argument("--rag-seconds", type=float, default=2.0)
+    parser.add_argument("--rag-mode", default="sleep", choices=["sleep", "cpu"])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true")
+    # Used by the parent to run the app
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    results = asyncio.run(run(args))
+    print_results(results, args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "created_at": int(time.time()),
+                        "commit": git_commit(),
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "args": {
+                            key: value
+                            for key, value in vars(args).items()
+                            if key not in ["serve", "port"]
+                        },
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,547 @@
+"""
+Benchmark ingestion and retrieval of the RAG stack on synthetic corpora.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.rag --backends numpy,chroma --sizes 1000,10000 \\
+        --output rag-results.json
+
+Every (backend, size) pair runs in a fresh process with a temporary
+DATA_DIR and VECTOR_DB set to the backend, so peak RSS is per run and the
+configured databases are never touched. Backends that need a server
+(milvus, qdrant, ...) use the usual environment variables to find it.
+
+Chunks are generated from a synthetic vocabulary and embedded by a
+deterministic bag-of-words embedder, so runs are reproducible offline.
+Every query is made of words of one chunk, recall@k is the fraction of
+queries whose chunk is among the k results. --embedder st:<model> uses a
+local SentenceTransformer model instead.
+
+Workloads, each reporting p50/p95 latency and throughput:
+
+    ingest        save_docs_to_vector_db, one file of --file-size chunks per call
+    vector        query_doc
+    hybrid        query_doc_with_hybrid_search (BM25 + vector + rerank)
+    rag_context   get_rag_context over the collection
+    merge         merge_and_sort_query_results of --merge-collections results
+
+Pass --baseline with the JSON of an earlier run to print the changes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+VOCABULARY_SIZE = 50000
+CHUNK_WORDS = 60
+QUERY_WORDS = 6
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+
+def peak_rss_mb() -> float:
+    # Kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+####################
+# Corpus
+####################
+
+
+def make_corpus(size: int, queries: int, seed: int = 0):
+    """Chunks drawn from topic-skewed Zipf distributions, and queries made of
+    the rarer words of random chunks."""
+    rng = np.random.default_rng(seed)
+    topics = max(size // 100, 10)
+
+    weights = 1 / np.arange(1, VOCABULARY_SIZE + 1) ** 1.1
+    weights /= weights.sum()
+    topic_offsets = rng.integers(0, VOCABULARY_SIZE, topics)
+
+    chunks = []
+    rare_words = []
+    for idx in range(size):
+        ranks = rng.choice(VOCABULARY_SIZE, CHUNK_WORDS, p=weights)
+        words = [
+            f"w{word}"
+            for word in (ranks + topic_offsets[idx % topics]) % VOCABULARY_SIZE
+        ]
+        chunks.append(" ".join(words))
+        # The least frequent words identify a chunk best
+        rare_words.append(
+            list(dict.fromkeys(words[i] for i in np.argsort(-ranks)))[:QUERY_WORDS]
+        )
+
+    targets = rng.integers(0, size, queries)
+    query_texts = [" ".join(rare_words[target]) for target in targets]
+    return chunks, query_texts, targets.tolist()
+
+
+class FakeEmbedder:
+    """Deterministic bag-of-words embeddings: every word has a fixed random
+    vector, a text is the normalized sum of the vectors of its words."""
+
+    def __init__(self, dim: int, seed: int = 0):
+        self.dim = dim
+        # Vectors of the synthetic vocabulary, other words are seeded by crc32
+        self._table = (
+            np.random.default_rng(seed)
+            .standard_normal((VOCABULARY_SIZE, dim))
+            .astype(np.float32)
+        )
+        self._vectors = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        if word[:1] == "w" and word[1:].isdigit() and int(word[1:]) < VOCABULARY_SIZE:
+            return self._table[int(word[1:])]
+
+        vector = self._vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode()))
+            vector = self._vectors[word] = rng.standard_normal(self.dim).astype(
+                np.float32
+            )
+        return vector
+
+    def _embed(self, text: str) -> list[float]:
+        words = text.split()
+        if not words:
+            return [0.0] * self.dim
+        vector = np.sum([self._word(word) for word in words], axis=0)
+        return (vector / max(np.linalg.norm(vector), 1e-12)).tolist()
+
+    def __call__(self, query, is_query: bool = False):
+        if isinstance(query, list):
+            return [self._embed(text) for text in query]
+        return self._embed(query)
+
+
+class FakeReranker:
+    """Scores (query, document) pairs by the fraction of query words found."""
+
+    def predict(self, sentences):
+        scores = []
+        for query, document in sentences:
+            words = set(query.split())
+            found = words & set(document.split())
+            scores.append(len(found) / max(len(words), 1))
+        return np.asarray(scores, dtype=np.float32)
+
+
+def get_embedder(name: str, dim: int):
+    if name == "fake":
+        return FakeEmbedder(dim)
+    elif name.startswith("st:"):
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(name[3:])
+        return lambda query, is_query=False: model.encode(query).tolist()
+    raise ValueError(f"Unknown embedder {name}")
+
+
+####################
+# Child process: one backend and corpus size
+####################
+
+
+def timed_calls(func, items, concurrency: int) -> tuple[list[float], float, list]:
+    def call(item):
+        start = time.perf_counter()
+        result = func(item)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(executor.map(call, items))
+    else:
+        timings = [call(item) for item in items]
+    elapsed = time.perf_counter() - start
+
+    return [t for t, _ in timings], elapsed, [r for _, r in timings]
+
+
+def summarize(latencies: list[float], elapsed: float, count: int) -> dict:
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "throughput_per_s": count / elapsed if elapsed else 0.0,
+    }
+
+
+def recall(found: list[list[str]], targets: list[str]) -> float:
+    return statistics.mean(
+        1.0 if target in ids else 0.0 for ids, target in zip(found, targets)
+    )
+
+
+def run_child(args) -> dict:
+    from langchain_core.documents import Document
+
+    import open_webui.apps.retrieval.main as retrieval
+    from open_webui.apps.retrieval import utils
+    from open_webui.apps.retrieval.models.batcher import RerankBatcher
+
+    embedder = get_embedder(args.embedder, args.dim)
+    retrieval.get_embedding_function = lambda *a, **kw: embedder
+    reranker = RerankBatcher(FakeReranker()) if args.reranker == "fake" else None
+
+    chunks, queries, targets = make_corpus(args.size, args.queries, args.seed)
+    collection_name = "benchmark-rag"
+    result = {
+        "backend": args.backend,
+        "size": args.size,
+        "embedder": args.embedder,
+        "reranker": args.reranker,
+        "k": args.k,
+    }
+
+    # Ingestion, one file per save_docs_to_vector_db call
+    files = [
+        list(range(start, min(start + args.file_size, len(chunks))))
+        for start in range(0, len(chunks), args.file_size)
+    ]
+
+    def ingest(idxs):
+        file_id = f"file-{idxs[0]}"
+        docs = [
+            Document(page_content=chunks[idx], metadata={"chunk": idx}) for idx in idxs
+        ]
+        ok = retrieval.save_docs_to_vector_db(
+            docs,
+            collection_name,
+            metadata={
+                "file_id": file_id,
+                "name": file_id,
+                "hash": hashlib.sha256(
+                    " ".join(chunks[i] for i in idxs).encode()
+                ).hexdigest(),
+            },
+            split=False,
+            add=True,
+        )
+        if not ok:
+            raise RuntimeError(f"Failed to ingest {file_id}")
+
+    latencies, elapsed, _ = timed_calls(ingest, files, args.ingest_concurrency)
+    result["ingest"] = {
+        **summarize(latencies, elapsed, len(files)),
+        "chunks_per_s": len(chunks) / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    target_ids = [str(target) for target in targets]
+
+    def chunk_ids(metadatas) -> list[str]:
+        return [str((metadata or {}).get("chunk")) for metadata in metadatas]
+
+    # Vector search
+    def vector(query):
+        return utils.query_doc(
+            collection_name=collection_name,
+            query_embedding=embedder(query),
+            k=args.k,
+        )
+
+    latencies, elapsed, results = timed_calls(vector, queries, args.concurrency)
+    result["vector"] = {
+        **summarize(latencies, elapsed, len(queries)),
+        f"recall_at_{args.k}": recall(
+            [chunk_ids(r.metadatas[0]) for r in results], target_ids
+        ),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    # Hybrid search, the BM25 index is built during ingestion
+    def hybrid(query):
+        return utils.query_doc_with_hybrid_search(
+            collection_name=collection_name,
+            query=query,
+            embedding_function=embedder,
+            k=args.k,
+            reranking_function=reranker,
+            r=0.0,
+        )
+
+    latencies, elapsed, results = timed_calls(hybrid, queries, args.concurrency)
+    result["hybrid"] = {
+        **summarize(latencies, elapsed, len(queries)),
+        f"recall_at_{args.k}": recall(
+            [chunk_ids(r["metadatas"][0]) for r in results], target_ids
+        ),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    # Whole request path of a chat message with the collection attached
+    def rag_context(query):
+        contexts, citations = utils.get_rag_context(
+            files=[{"type": "collection", "id": collection_name}],
+            messages=[{"role": "user", "content": query}],
+            embedding_function=embedder,
+            k=args.k,
+            reranking_function=reranker,
+            r=0.0,
+            hybrid_search=args.hybrid,
+            embedding_engine=retrieval.app.state.config.RAG_EMBEDDING_ENGINE,
+            embedding_model=retrieval.app.state.config.RAG_EMBEDDING_MODEL,
+        )
+        return citations
+
+    latencies, elapsed, results = timed_calls(rag_context, queries, args.concurrency)
+    result["rag_context"] = {
+        **summarize(latencies, elapsed, len(queries)),
+        f"recall_at_{args.k}": recall(
+            [
+                chunk_ids(citations[0]["metadata"]) if citations else []
+                for citations in results
+            ],
+            target_ids,
+        ),
+        "hybrid_search": args.hybrid,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    # Merging the results of many collections
+    rng = np.random.default_rng(args.seed)
+    merge_inputs = [
+        [
+            {
+                "distances": [rng.random(args.k).tolist()],
+                "documents": [[f"doc {c} {i}" for i in range(args.k)]],
+                "metadatas": [[{"chunk": i} for i in range(args.k)]],
+            }
+            for c in range(args.merge_collections)
+        ]
+        for _ in range(args.queries)
+    ]
+    latencies, elapsed, _ = timed_calls(
+        lambda results: utils.merge_and_sort_query_results(results, k=args.k),
+        merge_inputs,
+        1,
+    )
+    result["merge"] = {
+        **summarize(latencies, elapsed, len(merge_inputs)),
+        "collections": args.merge_collections,
+    }
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+####################
+# Parent process
+####################
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_parent(args) -> list[dict]:
+    results = []
+    for backend in args.backends.split(","):
+        for size in [int(size) for size in args.sizes.split(",")]:
+            data_dir = tempfile.mkdtemp(prefix="open-webui-bench-")
+            output = os.path.join(data_dir, "result.json")
+            env = {
+                **os.environ,
+                "DATA_DIR": data_dir,
+                "VECTOR_DB": backend,
+                # Never load a local model, the benchmark embedder replaces it
+                "RAG_EMBEDDING_ENGINE": "ollama",
+                # Measure the work, not the caches
+                "ENABLE_RAG_QUERY_CACHE": "False",
+                "ENABLE_RAG_EMBEDDING_CACHE": "False",
+                "GLOBAL_LOG_LEVEL": os.environ.get("GLOBAL_LOG_LEVEL", "WARNING"),
+            }
+            command = [
+                sys.executable,
+                "-m",
+                "benchmarks.rag",
+                "--child-output",
+                output,
+                "--backend",
+                backend,
+                "--size",
+                str(size),
+                *args.child_args,
+            ]
+
+            print(f"{backend} {size} chunks ...", flush=True)
+            process = subprocess.run(
+                command,
+                env=env,
+                stdout=None if args.verbose else subprocess.DEVNULL,
+                stderr=None if args.verbose else subprocess.PIPE,
+                text=True,
+            )
+            if process.returncode == 0 and os.path.exists(output):
+                with open(output) as f:
+                    results.append(json.load(f))
+            else:
+                error = (process.stderr or "").strip().splitlines()
+                results.append(
+                    {
+                        "backend": backend,
+                        "size": size,
+                        "error": (
+                            error[-1] if error else f"exit code {process.returncode}"
+                        ),
+                    }
+                )
+    return results
+
+
+def print_results(results: list[dict], k: int):
+    for result in results:
+        name = f"{result['backend']} {result['size']}"
+        if "error" in result:
+            print(f"{name:>18}: failed, {result['error']}")
+            continue
+
+        print(
+            f"{name:>18}: ingest {result['ingest']['chunks_per_s']:8.0f} chunks/s  "
+            f"peak RSS {result['peak_rss_mb']:7.1f} MB"
+        )
+        for workload in ["vector", "hybrid", "rag_context", "merge"]:
+            stats = result[workload]
+            recall_value = stats.get(f"recall_at_{k}")
+            print(
+                f"{'':>18}  {workload:<12} p50 {stats['p50_ms']:8.2f} ms  "
+                f"p95 {stats['p95_ms']:8.2f} ms  {stats['throughput_per_s']:8.1f}/s"
+                + (
+                    f"  recall@{k} {recall_value:.3f}"
+                    if recall_value is not None
+                    else ""
+                )
+            )
+
+
+def compare(results: list[dict], baseline: list[dict], k: int):
+    previous = {
+        (result["backend"], result["size"]): result
+        for result in baseline
+        if "error" not in result
+    }
+    print("\nChanges against the baseline:")
+    for result in results:
+        old = previous.get((result["backend"], result["size"]))
+        if old is None or "error" in result:
+            continue
+        for workload in ["ingest", "vector", "hybrid", "rag_context", "merge"]:
+            for metric in ["p50_ms", "p95_ms", f"recall_at_{k}"]:
+                if metric not in result[workload] or metric not in old.get(
+                    workload, {}
+                ):
+                    continue
+                new_value, old_value = result[workload][metric], old[workload][metric]
+                change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+                print(
+                    f"{result['backend']:>10} {result['size']:>8} {workload:<12} "
+                    f"{metric:<12} {old_value:10.3f} -> {new_value:10.3f} ({change:+.1f}%)"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backends", default="numpy,chroma", help="comma separated")
+    parser.add_argument(
+        "--sizes", default="1000,10000", help="comma separated numbers of chunks"
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embedder", default="fake", help="fake or st:<model>")
+    parser.add_argument("--reranker", default="none", choices=["none", "fake"])
+    parser.add_argument(
+        "--hybrid", action="store_true", help="use hybrid search in rag_context"
+    )
+    parser.add_argument("--file-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--ingest-concurrency", type=int, default=1)
+    parser.add_argument("--merge-collections", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument("--verbose", action="store_true")
+    # Used by the parent to run one (backend, size) pair
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_output:
+        with open(args.child_output, "w") as f:
+            json.dump(run_child(args), f)
+        return
+
+    args.child_args = [
+        "--queries", str(args.queries),
+        "--k", str(args.k),
+        "--dim", str(args.dim),
+        "--embedder", args.embedder,
+        "--reranker", args.reranker,
+        "--file-size", str(args.file_size),
+        "--concurrency", str(args.concurrency),
+        "--ingest-concurrency", str(args.ingest_concurrency),
+        "--merge-collections", str(args.merge_collections),
+        "--seed", str(args.seed),
+        *(["--hybrid"] if args.hybrid else []),
+    ]  # fmt: skip
+
+    results = run_parent(args)
+    print_results(results, args.k)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f)["results"], args.k)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "created_at": int(time.time()),
+                        "commit": git_commit(),
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "args": {
+                            key: value
+                            for key, value in vars(args).items()
+                            if key
+                            not in ["child_args", "child_output", "backend", "size"]
+                        },
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Compare the native token splitter with LangChain's text splitters.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.text_splitter --size-mb 4 --chunk-size 1000 --chunk-overlap 100
+
+Every splitter is created the way save_docs_to_vector_db created it before
+splitters were cached, once per document. The tiktoken encoding must be
+available (downloaded or in TIKTOKEN_CACHE_DIR).
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Must be set before open_webui.config is imported
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="open-webui-bench-"))
+
+WORDS = (
+    "the of and to in is was for on that with as by at from retrieval model "
+    "embedding vector document chunk token überprüfung café naïve 東京 数据 😀"
+).split()
+
+
+def make_text(size_mb: float, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    parts = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        sentences = [
+            " ".join(rng.choice(WORDS, rng.integers(5, 25))).capitalize() + "."
+            for _ in range(rng.integers(2, 8))
+        ]
+        paragraph = " ".join(sentences)
+        parts.append(paragraph)
+        size += len(paragraph.encode("utf-8")) + 2
+    return "\n\n".join(parts)
+
+
+def timed(func, repeat: int) -> tuple[float, object]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--encoding", default="cl100k_base")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    from langchain.text_splitter import (
+        RecursiveCharacterTextSplitter,
+        TokenTextSplitter,
+    )
+    from langchain_core.documents import Document
+
+    from open_webui.apps.retrieval.splitter import (
+        TokenSplitter,
+        get_encoding,
+        get_token_char_counts,
+    )
+
+    text = make_text(args.size_mb)
+    docs = [Document(page_content=text, metadata={"source": "bench"})]
+    encoding = get_encoding(args.encoding)
+
+    start = time.perf_counter()
+    get_token_char_counts(args.encoding)
+    table_ms = (time.perf_counter() - start) * 1000
+
+    splitters = {
+        "langchain-character": lambda: RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            add_start_index=True,
+        ).split_documents(docs),
+        "langchain-token": lambda: TokenTextSplitter(
+            encoding_name=args.encoding,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            add_start_index=True,
+        ).split_documents(docs),
+        "native-token": lambda: TokenSplitter(
+            args.encoding, args.chunk_size, args.chunk_overlap
+        ).split_documents(docs),
+    }
+
+    results = []
+    chunks_by_splitter = {}
+    for name, split in splitters.items():
+        seconds, chunks = timed(split, args.repeat)
+        chunks_by_splitter[name] = chunks
+
+        tokens = [len(encoding.encode_ordinary(chunk.page_content)) for chunk in chunks]
+        misplaced = sum(
+            1
+            for chunk in chunks
+            if text[
+                chunk.metadata["start_index"] : chunk.metadata["start_index"]
+                + len(chunk.page_content)
+            ]
+            != chunk.page_content
+        )
+        results.append(
+            {
+                "splitter": name,
+                "size_mb": len(text.encode("utf-8")) / 2**20,
+                "seconds": seconds,
+                "mb_per_s": len(text.encode("utf-8")) / 2**20 / seconds,
+                "chunks": len(chunks),
+                "max_chunk_tokens": max(tokens),
+                "chunks_over_window": sum(t > args.chunk_size for t in tokens),
+                "misplaced_start_index": misplaced,
+            }
+        )
+
+    # Same windows as LangChain, except where it decoded half a character
+    same = sum(
+        a.page_content == b.page_content
+        for a, b in zip(
+            chunks_by_splitter["langchain-token"], chunks_by_splitter["native-token"]
+        )
+    )
+    print(f"token table built in {table_ms:.0f} ms (once per encoding)")
+    print(
+        f"native-token chunks identical to langchain-token: "
+        f"{same}/{len(chunks_by_splitter['langchain-token'])}"
+    )
+    for result in results:
+        print(
+            f"{result['splitter']:>20}: {result['seconds'] * 1000:8.1f} ms  "
+            f"{result['mb_per_s']:7.2f} MB/s  {result['chunks']:6d} chunks  "
+            f"max {result['max_chunk_tokens']:5d} tokens  "
+            f"{result['chunks_over_window']:5d} over {args.chunk_size}  "
+            f"{result['misplaced_start_index']:4d} bad start_index"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
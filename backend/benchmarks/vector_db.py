@@ -0,0 +1,206 @@
+"""
+Compare the embedded NumPy vector store with Chroma on synthetic data.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.vector_db --rows 20000 --dim 384 --queries 200
+
+The numpy-int8 and numpy-binary backends scan quantized vectors and re-score
+the best limit * --rescore-factor candidates, their recall and latency are
+measured against the same exact neighbours as the float32 store.
+
+Everything is written to a temporary DATA_DIR, the configured databases are
+never touched. Chroma is skipped when chromadb is not installed.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+# Must be set before open_webui.config is imported
+DATA_DIR = tempfile.mkdtemp(prefix="open-webui-bench-")
+os.environ["DATA_DIR"] = DATA_DIR
+
+
+def make_dataset(rows: int, dim: int, queries: int, seed: int = 0):
+    # Clustered vectors, closer to real embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(rows // 200, 8), dim))
+    vectors = centers[rng.integers(0, len(centers), rows)]
+    vectors = (vectors + 0.35 * rng.normal(size=(rows, dim))).astype(np.float32)
+    targets = rng.integers(0, rows, queries)
+    query_vectors = vectors[targets] + 0.1 * rng.normal(size=(queries, dim))
+    return vectors, query_vectors.astype(np.float32)
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+
+
+def index_bytes(root: str) -> int:
+    # Bytes scanned by a search: the codes of quantized segments, the vectors
+    # of the others
+    total = 0
+    for path, _, files in os.walk(root):
+        name = "codes.npy" if "codes.npy" in files else "vectors.npy"
+        if name in files:
+            total += os.path.getsize(os.path.join(path, name))
+    return total
+
+
+def run(client, name: str, vectors, queries, k: int, batch_size: int) -> dict:
+    collection_name = f"bench-{uuid.uuid4().hex[:8]}"
+    files = 20
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        client.insert(
+            collection_name=collection_name,
+            items=[
+                {
+                    "id": str(idx),
+                    "text": f"chunk {idx}",
+                    "vector": vectors[idx].tolist(),
+                    "metadata": {"file_id": f"file-{idx % files}"},
+                }
+                for idx in range(offset, min(offset + batch_size, len(vectors)))
+            ],
+        )
+    insert_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(50):
+        start = time.perf_counter()
+        client.has_collection(collection_name=collection_name)
+        latencies.append(time.perf_counter() - start)
+    has_collection_ms = percentile(latencies, 50)
+
+    # Warm up page cache and lazy loading before timing searches
+    client.search(
+        collection_name=collection_name, vectors=[queries[0].tolist()], limit=k
+    )
+
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        result = client.search(
+            collection_name=collection_name, vectors=[query.tolist()], limit=k
+        )
+        latencies.append(time.perf_counter() - start)
+        found.append([int(id) for id in result.ids[0]])
+
+    truth = exact_neighbours(vectors, queries, k)
+    recall = statistics.mean(
+        len(set(ids) & set(expected.tolist())) / k
+        for ids, expected in zip(found, truth)
+    )
+
+    scanned_bytes = index_bytes(client.root) if hasattr(client, "root") else None
+
+    start = time.perf_counter()
+    client.query(collection_name=collection_name, filter={"file_id": "file-3"})
+    filter_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    client.delete(collection_name=collection_name, filter={"file_id": "file-4"})
+    delete_ms = (time.perf_counter() - start) * 1000
+
+    client.delete_collection(collection_name=collection_name)
+
+    return {
+        "backend": name,
+        "rows": len(vectors),
+        "dim": vectors.shape[1],
+        "insert_rows_per_s": len(vectors) / insert_seconds,
+        "has_collection_p50_ms": has_collection_ms,
+        "search_p50_ms": percentile(latencies, 50),
+        "search_p95_ms": percentile(latencies, 95),
+        f"recall_at_{k}": recall,
+        "index_bytes": scanned_bytes,
+        "filter_query_ms": filter_ms,
+        "filter_delete_ms": delete_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument(
+        "--backends",
+        default="numpy,numpy-float16,numpy-int8,numpy-binary,chroma",
+        help="comma separated",
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    from open_webui.apps.retrieval.vector.dbs import numpy_store
+
+    vectors, queries = make_dataset(args.rows, args.dim, args.queries)
+
+    numpy_store.NUMPY_VECTOR_DB_RESCORE_FACTOR = args.rescore_factor
+
+    results = []
+    for backend in args.backends.split(","):
+        numpy_store.NUMPY_VECTOR_DB_DTYPE = "float32"
+        numpy_store.NUMPY_VECTOR_DB_QUANTIZATION = ""
+        if backend == "numpy":
+            client = numpy_store.NumpyClient(root=os.path.join(DATA_DIR, "numpy"))
+        elif backend == "numpy-float16":
+            numpy_store.NUMPY_VECTOR_DB_DTYPE = "float16"
+            client = numpy_store.NumpyClient(root=os.path.join(DATA_DIR, "numpy16"))
+        elif backend in ("numpy-int8", "numpy-binary"):
+            numpy_store.NUMPY_VECTOR_DB_QUANTIZATION = backend.split("-")[1]
+            client = numpy_store.NumpyClient(root=os.path.join(DATA_DIR, backend))
+        elif backend == "chroma":
+            try:
+                from open_webui.apps.retrieval.vector.dbs.chroma import ChromaClient
+            except ImportError:
+                print("chromadb is not installed, skipping chroma")
+                continue
+            client = ChromaClient()
+        else:
+            raise ValueError(f"Unknown backend {backend}")
+
+        results.append(run(client, backend, vectors, queries, args.k, args.batch_size))
+
+    for result in results:
+        print(
+            f"{result['backend']:>14}: "
+            f"insert {result['insert_rows_per_s']:>9.0f} rows/s  "
+            f"search p50 {result['search_p50_ms']:7.2f} ms  "
+            f"p95 {result['search_p95_ms']:7.2f} ms  "
+            f"recall@{args.k} {result[f'recall_at_{args.k}']:.3f}  "
+            f"has_collection {result['has_collection_p50_ms']:.3f} ms  "
+            f"filter {result['filter_query_ms']:.1f} ms"
+            + (
+                f"  index {result['index_bytes'] / 2**20:.1f} MiB"
+                if result["index_bytes"] is not None
+                else ""
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
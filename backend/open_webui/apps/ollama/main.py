@@ -2,7 +2,6 @@ import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from typing import Optional, Union
@@ -17,6 +16,10 @@ from open_webui.config import (
     ENABLE_OLLAMA_API,
     MODEL_FILTER_LIST,
     OLLAMA_BASE_URLS,
+    OLLAMA_CIRCUIT_BREAKER_COOLDOWN,
+    OLLAMA_CIRCUIT_BREAKER_THRESHOLD,
+    OLLAMA_PS_POLL_INTERVAL,
+    OLLAMA_ROUTING_POLICY,
     UPLOAD_DIR,
     AppConfig,
 )
@@ -32,6 +35,8 @@ from pydantic import BaseModel, ConfigDict
 from starlette.background import BackgroundTask
 
 
+from open_webui.utils.http import HTTP_CLIENT_POOL, release_response
+from open_webui.utils.router import UpstreamRouter
 from open_webui.utils.misc import (
     calculate_sha256,
 )
@@ -45,6 +50,10 @@ from open_webui.utils.utils import get_admin_user, get_verified_user
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 
+# Keep-alive connections for the (threaded) embedding requests made during
+# ingestion
+embed_session = requests.Session()
+
 
 app = FastAPI(docs_url="/docs" if ENV == "dev" else None, openapi_url="/openapi.json" if ENV == "dev" else None, redoc_url=None)
 
@@ -65,10 +74,12 @@ app.state.config.ENABLE_OLLAMA_API = ENABLE_OLLAMA_API
 app.state.config.OLLAMA_BASE_URLS = OLLAMA_BASE_URLS
 app.state.MODELS = {}
 
-
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
+ROUTER = UpstreamRouter(
+    "Ollama",
+    OLLAMA_ROUTING_POLICY,
+    failure_threshold=OLLAMA_CIRCUIT_BREAKER_THRESHOLD,
+    cooldown=OLLAMA_CIRCUIT_BREAKER_COOLDOWN,
+)
 
 
 @app.middleware("http")
@@ -108,6 +119,11 @@ async def get_ollama_api_urls(user=Depends(get_admin_user)):
     return {"OLLAMA_BASE_URLS": app.state.config.OLLAMA_BASE_URLS}
 
 
+@app.get("/router/stats")
+async def get_router_stats(user=Depends(get_admin_user)):
+    return ROUTER.stats()
+
+
 class UrlUpdateForm(BaseModel):
     urls: list[str]
 
@@ -123,38 +139,79 @@ async def update_ollama_api_url(form_data: UrlUpdateForm, user=Depends(get_admin
 async def fetch_url(url):
     timeout = aiohttp.ClientTimeout(total=3)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(url) as response:
-                return await response.json()
+        session = HTTP_CLIENT_POOL.get(url)
+        async with session.get(url, timeout=timeout) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
-):
-    if response:
-        response.close()
-    if session:
-        await session.close()
+def choose_url_idx(model: str) -> int:
+    """Index of the Ollama node serving `model` the router sends it to."""
+    url_idxs = {
+        app.state.config.OLLAMA_BASE_URLS[idx]: idx
+        for idx in app.state.MODELS[model]["urls"]
+    }
+    return url_idxs[ROUTER.choose(list(url_idxs), model)]
+
+
+def get_upstream(url: str) -> Optional[str]:
+    """The configured Ollama base URL `url` belongs to."""
+    bases = [
+        base
+        for base in app.state.config.OLLAMA_BASE_URLS
+        if url.startswith(f"{base.rstrip('/')}/")
+    ]
+    return max(bases, key=len) if bases else None
+
+
+async def poll_running_models():
+    """Keeps the router's view of the models loaded on every node up to date."""
+    while True:
+        if app.state.config.ENABLE_OLLAMA_API:
+            urls = app.state.config.OLLAMA_BASE_URLS
+            responses = await asyncio.gather(
+                *[fetch_url(f"{url}/api/ps") for url in urls]
+            )
+            for url, response in zip(urls, responses):
+                if response is None:
+                    ROUTER.record(url, failed=True)
+                else:
+                    ROUTER.set_resident(
+                        url, [model["model"] for model in response.get("models", [])]
+                    )
+        await asyncio.sleep(OLLAMA_PS_POLL_INTERVAL)
 
 
 async def post_streaming_url(
     url: str, payload: Union[str, bytes], stream: bool = True, content_type=None
 ):
+    upstream = get_upstream(url)
+    if upstream:
+        ROUTER.start(upstream)
+
+    def finish(failed: bool):
+        if upstream:
+            ROUTER.finish(upstream, failed)
+
+    async def cleanup():
+        await release_response(r)
+        finish(False)
+
     r = None
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = HTTP_CLIENT_POOL.get(url)
+        start = time.monotonic()
         r = await session.post(
             url,
             data=payload,
             headers={"Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
+        if upstream:
+            ROUTER.observe(upstream, time.monotonic() - start)
         r.raise_for_status()
 
         if stream:
@@ -165,13 +222,11 @@ async def post_streaming_url(
                 r.content,
                 status_code=r.status,
                 headers=headers,
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(cleanup),
             )
         else:
             res = await r.json()
-            await cleanup_response(r, session)
+            await cleanup()
             return res
 
     except Exception as e:
@@ -183,6 +238,10 @@ async def post_streaming_url(
                     error_detail = f"Ollama: {res['error']}"
             except Exception:
                 error_detail = f"Ollama: {e}"
+            await release_response(r)
+
+        # Errors of the request itself (4xx) say nothing about the node
+        finish(r is None or r.status >= 500)
 
         raise HTTPException(
             status_code=r.status if r else 500,
@@ -509,7 +568,7 @@ async def show_model_info(form_data: ModelNameForm, user=Depends(get_verified_us
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.name),
         )
 
-    url_idx = random.choice(app.state.MODELS[form_data.name]["urls"])
+    url_idx = choose_url_idx(form_data.name)
     url = app.state.config.OLLAMA_BASE_URLS[url_idx]
     log.info(f"url: {url}")
 
@@ -588,7 +647,7 @@ def generate_ollama_embeddings(
             model = f"{model}:latest"
 
         if model in app.state.MODELS:
-            url_idx = random.choice(app.state.MODELS[model]["urls"])
+            url_idx = choose_url_idx(model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -645,7 +704,7 @@ def generate_ollama_batch_embeddings(
             model = f"{model}:latest"
 
         if model in app.state.MODELS:
-            url_idx = random.choice(app.state.MODELS[model]["urls"])
+            url_idx = choose_url_idx(model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -655,7 +714,7 @@ def generate_ollama_batch_embeddings(
     url = app.state.config.OLLAMA_BASE_URLS[url_idx]
     log.info(f"url: {url}")
 
-    r = requests.request(
+    r = embed_session.request(
         method="POST",
         url=f"{url}/api/embed",
         headers={"Content-Type": "application/json"},
@@ -714,7 +773,7 @@ async def generate_completion(
             model = f"{model}:latest"
 
         if model in app.state.MODELS:
-            url_idx = random.choice(app.state.MODELS[model]["urls"])
+            url_idx = choose_url_idx(model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -752,7 +811,7 @@ def get_ollama_url(url_idx: Optional[int], model: str):
                 status_code=400,
                 detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
             )
-        url_idx = random.choice(app.state.MODELS[model]["urls"])
+        url_idx = choose_url_idx(model)
     url = app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url
 
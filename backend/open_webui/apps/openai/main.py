@@ -2,6 +2,7 @@ import asyncio
 import hashlib
 import json
 import logging
+import time
 from pathlib import Path
 from typing import Literal, Optional, overload
 
@@ -16,6 +17,9 @@ from open_webui.config import (
     MODEL_FILTER_LIST,
     OPENAI_API_BASE_URLS,
     OPENAI_API_KEYS,
+    OPENAI_CIRCUIT_BREAKER_COOLDOWN,
+    OPENAI_CIRCUIT_BREAKER_THRESHOLD,
+    OPENAI_ROUTING_POLICY,
     AppConfig,
 )
 from open_webui.env import (
@@ -31,6 +35,8 @@ from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from starlette.background import BackgroundTask
 
+from open_webui.utils.http import HTTP_CLIENT_POOL, release_response
+from open_webui.utils.router import UpstreamRouter
 from open_webui.utils.payload import (
     apply_model_params_to_body_openai,
     apply_model_system_prompt_to_body,
@@ -64,6 +70,13 @@ app.state.config.OPENAI_API_KEYS = OPENAI_API_KEYS
 
 app.state.MODELS = {}
 
+ROUTER = UpstreamRouter(
+    "OpenAI",
+    OPENAI_ROUTING_POLICY,
+    failure_threshold=OPENAI_CIRCUIT_BREAKER_THRESHOLD,
+    cooldown=OPENAI_CIRCUIT_BREAKER_COOLDOWN,
+)
+
 
 @app.middleware("http")
 async def check_url(request: Request, call_next):
@@ -102,6 +115,11 @@ async def get_openai_urls(user=Depends(get_admin_user)):
     return {"OPENAI_API_BASE_URLS": app.state.config.OPENAI_API_BASE_URLS}
 
 
+@app.get("/router/stats")
+async def get_router_stats(user=Depends(get_admin_user)):
+    return ROUTER.stats()
+
+
 @app.post("/urls/update")
 async def update_openai_urls(form_data: UrlsUpdateForm, user=Depends(get_admin_user)):
     await get_all_models()
@@ -188,58 +206,60 @@ async def fetch_url(url, key):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
     try:
         headers = {"Authorization": f"Bearer {key}"}
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        session = HTTP_CLIENT_POOL.get(url)
+        async with session.get(url, headers=headers, timeout=timeout) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
-):
-    if response:
-        response.close()
-    if session:
-        await session.close()
+async def finish_request(response: Optional[aiohttp.ClientResponse], url: str):
+    await release_response(response)
+    ROUTER.finish(url, failed=response is None or response.status >= 500)
 
 
 def merge_models_lists(model_lists):
+    """
+    Models served by several endpoints are listed once, with the index of
+    the first endpoint in urlIdx and of all of them in urlIdxs.
+    """
     log.debug(f"merge_models_lists {model_lists}")
-    merged_list = []
+    merged_models = {}
 
     for idx, models in enumerate(model_lists):
         if models is not None and "error" not in models:
-            merged_list.extend(
-                [
-                    {
-                        **model,
-                        "name": model.get("name", model["id"]),
-                        "owned_by": "openai",
-                        "openai": model,
-                        "urlIdx": idx,
-                    }
-                    for model in models
-                    if "api.openai.com"
-                    not in app.state.config.OPENAI_API_BASE_URLS[idx]
-                    or not any(
-                        name in model["id"]
-                        for name in [
-                            "babbage",
-                            "dall-e",
-                            "davinci",
-                            "embedding",
-                            "tts",
-                            "whisper",
-                        ]
-                    )
-                ]
-            )
-
-    return merged_list
+            for model in models:
+                if "api.openai.com" in app.state.config.OPENAI_API_BASE_URLS[
+                    idx
+                ] and any(
+                    name in model["id"]
+                    for name in [
+                        "babbage",
+                        "dall-e",
+                        "davinci",
+                        "embedding",
+                        "tts",
+                        "whisper",
+                    ]
+                ):
+                    continue
+
+                if model["id"] in merged_models:
+                    merged_models[model["id"]]["urlIdxs"].append(idx)
+                    continue
+
+                merged_models[model["id"]] = {
+                    **model,
+                    "name": model.get("name", model["id"]),
+                    "owned_by": "openai",
+                    "openai": model,
+                    "urlIdx": idx,
+                    "urlIdxs": [idx],
+                }
+
+    return list(merged_models.values())
 
 
 def is_openai_api_disabled():
@@ -398,7 +418,6 @@ async def generate_chat_completion(
         payload = apply_model_system_prompt_to_body(params, payload, user)
 
     model = app.state.MODELS[payload.get("model")]
-    idx = model["urlIdx"]
 
     if "pipeline" in model and model.get("pipeline"):
         payload["user"] = {
@@ -408,90 +427,108 @@ async def generate_chat_completion(
             "role": user.role,
         }
 
-    url = app.state.config.OPENAI_API_BASE_URLS[idx]
-    key = app.state.config.OPENAI_API_KEYS[idx]
     is_o1 = payload["model"].lower().startswith("o1-")
 
-    # Change max_completion_tokens to max_tokens (Backward compatible)
-    if "api.openai.com" not in url and not is_o1:
-        if "max_completion_tokens" in payload:
-            # Remove "max_completion_tokens" from the payload
-            payload["max_tokens"] = payload["max_completion_tokens"]
-            del payload["max_completion_tokens"]
-    else:
-        if is_o1 and "max_tokens" in payload:
-            payload["max_completion_tokens"] = payload["max_tokens"]
-            del payload["max_tokens"]
-        if "max_tokens" in payload and "max_completion_tokens" in payload:
-            del payload["max_tokens"]
-
     # Fix: O1 does not support the "system" parameter, Modify "system" to "user"
     if is_o1 and payload["messages"][0]["role"] == "system":
         payload["messages"][0]["role"] = "user"
 
-    # Convert the modified body back to JSON
-    payload = json.dumps(payload)
+    # Endpoints serving the model, tried in the order the router picks them
+    # until one answers without a connection error or a 5xx
+    url_idxs = {
+        app.state.config.OPENAI_API_BASE_URLS[idx]: idx
+        for idx in model.get("urlIdxs", [model["urlIdx"]])
+    }
+
+    while True:
+        url = ROUTER.choose(list(url_idxs), payload["model"])
+        idx = url_idxs.pop(url)
+        key = app.state.config.OPENAI_API_KEYS[idx]
+        body = {**payload}
+
+        # Change max_completion_tokens to max_tokens (Backward compatible)
+        if "api.openai.com" not in url and not is_o1:
+            if "max_completion_tokens" in body:
+                # Remove "max_completion_tokens" from the payload
+                body["max_tokens"] = body["max_completion_tokens"]
+                del body["max_completion_tokens"]
+        else:
+            if is_o1 and "max_tokens" in body:
+                body["max_completion_tokens"] = body["max_tokens"]
+                del body["max_tokens"]
+            if "max_tokens" in body and "max_completion_tokens" in body:
+                del body["max_tokens"]
 
-    log.debug(payload)
+        # Convert the modified body back to JSON
+        body = json.dumps(body)
 
-    headers = {}
-    headers["Authorization"] = f"Bearer {key}"
-    headers["Content-Type"] = "application/json"
-    if "openrouter.ai" in app.state.config.OPENAI_API_BASE_URLS[idx]:
-        headers["HTTP-Referer"] = "https://openwebui.com/"
-        headers["X-Title"] = "Open WebUI"
+        log.debug(body)
 
-    r = None
-    session = None
-    streaming = False
-    response = None
+        headers = {}
+        headers["Authorization"] = f"Bearer {key}"
+        headers["Content-Type"] = "application/json"
+        if "openrouter.ai" in url:
+            headers["HTTP-Referer"] = "https://openwebui.com/"
+            headers["X-Title"] = "Open WebUI"
 
-    try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
-        r = await session.request(
-            method="POST",
-            url=f"{url}/chat/completions",
-            data=payload,
-            headers=headers,
-        )
+        r = None
+        streaming = False
+        response = None
+        ROUTER.start(url)
 
-        # Check if response is SSE
-        if "text/event-stream" in r.headers.get("Content-Type", ""):
-            streaming = True
-            return StreamingResponse(
-                r.content,
-                status_code=r.status,
-                headers=dict(r.headers),
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
-            )
-        else:
+        try:
+            session = HTTP_CLIENT_POOL.get(url)
+            start = time.monotonic()
             try:
-                response = await r.json()
-            except Exception as e:
-                log.error(e)
-                response = await r.text()
+                r = await session.request(
+                    method="POST",
+                    url=f"{url}/chat/completions",
+                    data=body,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+                )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if url_idxs:
+                    log.warning(f"Failing over from {url}: {e!r}")
+                    continue
+                raise
+
+            ROUTER.observe(url, time.monotonic() - start)
+            if r.status >= 500 and url_idxs:
+                log.warning(f"Failing over from {url}: status {r.status}")
+                continue
+
+            # Check if response is SSE
+            if "text/event-stream" in r.headers.get("Content-Type", ""):
+                streaming = True
+                return StreamingResponse(
+                    r.content,
+                    status_code=r.status,
+                    headers=dict(r.headers),
+                    background=BackgroundTask(finish_request, r, url),
+                )
+            else:
+                try:
+                    response = await r.json()
+                except Exception as e:
+                    log.error(e)
+                    response = await r.text()
 
-            r.raise_for_status()
-            return response
-    except Exception as e:
-        log.exception(e)
-        error_detail = "Open WebUI: Server Connection Error"
-        if isinstance(response, dict):
-            if "error" in response:
-                error_detail = f"{response['error']['message'] if 'message' in response['error'] else response['error']}"
-        elif isinstance(response, str):
-            error_detail = response
+                r.raise_for_status()
+                return response
+        except Exception as e:
+            log.exception(e)
+            error_detail = "Open WebUI: Server Connection Error"
+            if isinstance(response, dict):
+                if "error" in response:
+                    error_detail = f"{response['error']['message'] if 'message' in response['error'] else response['error']}"
+            elif isinstance(response, str):
+                error_detail = response
 
-        raise HTTPException(status_code=r.status if r else 500, detail=error_detail)
-    finally:
-        if not streaming and session:
-            if r:
-                r.close()
-            await session.close()
+            raise HTTPException(status_code=r.status if r else 500, detail=error_detail)
+        finally:
+            if not streaming:
+                await finish_request(r, url)
 
 
 @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
@@ -510,11 +547,10 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
     headers["Content-Type"] = "application/json"
 
     r = None
-    session = None
     streaming = False
 
     try:
-        session = aiohttp.ClientSession(trust_env=True)
+        session = HTTP_CLIENT_POOL.get(target_url)
         r = await session.request(
             method=request.method,
             url=target_url,
@@ -531,9 +567,7 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(release_response, response=r),
             )
         else:
             response_data = await r.json()
@@ -551,7 +585,5 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
                 error_detail = f"External: {e}"
         raise HTTPException(status_code=r.status if r else 500, detail=error_detail)
     finally:
-        if not streaming and session:
-            if r:
-                r.close()
-            await session.close()
+        if not streaming:
+            await release_response(r)
@@ -0,0 +1,347 @@
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import Counter
+from typing import Any, Optional
+
+import numpy as np
+
+from open_webui.config import RAG_BM25_INDEX_DIR, RAG_BM25_MAX_SEGMENTS
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.segments import (
+    SegmentCollection,
+    collection_path,
+    matches_filter,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Okapi BM25 parameters, same defaults as rank_bm25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Compact a collection once this fraction of its documents are tombstoned
+MAX_DELETED_RATIO = 0.3
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class BM25Segment:
+    """
+    Immutable on-disk slice of a collection's lexical index.
+
+    Layout of a segment directory:
+        docs.jsonl    one {"id", "text", "metadata"} object per line
+        offsets.npy   int64 byte offsets of each line in docs.jsonl (n + 1 entries)
+        lengths.npy   int32 token count of each document
+        vocab.json    term -> [start, end) slice into postings.npy / tfs.npy
+        postings.npy  int32 document indices, grouped by term
+        tfs.npy       int32 term frequency for each posting
+    The numpy arrays and docs.jsonl are memory-mapped, only the vocabulary is
+    held in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+
+        with open(os.path.join(path, "vocab.json"), "r") as f:
+            self.vocab: dict[str, list[int]] = json.load(f)
+
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.lengths = np.load(os.path.join(path, "lengths.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+
+        self._docs_file = open(os.path.join(path, "docs.jsonl"), "rb")
+        self._docs = (
+            mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if os.path.getsize(os.path.join(path, "docs.jsonl")) > 0
+            else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def close(self):
+        if self._docs is not None:
+            self._docs.close()
+        self._docs_file.close()
+
+    def document(self, idx: int) -> dict:
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return json.loads(self._docs[start:end])
+
+    def documents(self):
+        for idx in range(len(self)):
+            yield idx, self.document(idx)
+
+    def document_frequency(self, term: str) -> int:
+        span = self.vocab.get(term)
+        return span[1] - span[0] if span else 0
+
+    def score(
+        self, terms: dict[str, float], avgdl: float, deleted: set[int]
+    ) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        lengths = None
+
+        for term, idf in terms.items():
+            span = self.vocab.get(term)
+            if not span:
+                continue
+
+            if lengths is None:
+                lengths = np.asarray(self.lengths, dtype=np.float32)
+
+            docs = self.postings[span[0] : span[1]]
+            tf = self.tfs[span[0] : span[1]].astype(np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / avgdl)
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        if deleted:
+            scores[list(deleted)] = 0.0
+        return scores
+
+    @staticmethod
+    def write(path: str, ids: list[str], texts: list[str], metadatas: list[Any]):
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_path)
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+
+        with open(os.path.join(tmp_path, "docs.jsonl"), "wb") as f:
+            for idx, (id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                tokens = tokenize(text)
+                lengths[idx] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((idx, tf))
+
+                line = json.dumps(
+                    {"id": id, "text": text, "metadata": metadata}, default=str
+                ).encode("utf-8")
+                f.write(line + b"\n")
+                offsets[idx + 1] = offsets[idx] + len(line) + 1
+
+        vocab = {}
+        flat_docs = []
+        flat_tfs = []
+        for term, entries in postings.items():
+            vocab[term] = [len(flat_docs), len(flat_docs) + len(entries)]
+            for idx, tf in entries:
+                flat_docs.append(idx)
+                flat_tfs.append(tf)
+
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, "lengths.npy"), lengths)
+        np.save(os.path.join(tmp_path, "postings.npy"), np.array(flat_docs, np.int32))
+        np.save(os.path.join(tmp_path, "tfs.npy"), np.array(flat_tfs, np.int32))
+        with open(os.path.join(tmp_path, "vocab.json"), "w") as f:
+            json.dump(vocab, f)
+
+        os.rename(tmp_path, path)
+
+
+class BM25Index(SegmentCollection):
+    """
+    Persistent, incrementally maintained BM25 index of a single collection.
+
+    New documents are appended as immutable segments and deletions are recorded
+    as tombstones in manifest.json. Once there are too many segments or
+    tombstones, the live documents are rewritten into a single segment.
+    Document frequencies include tombstoned documents until the next compaction.
+    See SegmentCollection for the manifest and how other workers pick up writes.
+    """
+
+    def _open_segment(self, path: str) -> BM25Segment:
+        return BM25Segment(path)
+
+    ####################
+    # Writes
+    ####################
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[Any]):
+        if not ids:
+            return
+
+        with self._lock, self._write_lock():
+            name = f"seg-{uuid.uuid4().hex}"
+            BM25Segment.write(os.path.join(self.path, name), ids, texts, metadatas)
+
+            manifest = self._read_manifest()
+            manifest["segments"].append(name)
+            self._write_manifest(manifest)
+
+            self._load()
+            self._maybe_compact(manifest)
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        if not self.exists() or not (ids or filter):
+            return
+
+        with self._lock, self._write_lock():
+            self._load()
+            manifest = self._read_manifest()
+            ids = set(ids or [])
+
+            for name, segment in self._segments.items():
+                deleted = set(manifest["deleted"].get(name, []))
+                for idx, doc in segment.documents():
+                    if idx in deleted:
+                        continue
+                    if (ids and doc["id"] in ids) or (
+                        filter and matches_filter(doc["metadata"], filter)
+                    ):
+                        deleted.add(idx)
+                if deleted:
+                    manifest["deleted"][name] = sorted(deleted)
+
+            self._write_manifest(manifest)
+            self._load()
+            self._maybe_compact(manifest)
+
+    def _maybe_compact(self, manifest: dict):
+        total = sum(len(segment) for segment in self._segments.values())
+        deleted = sum(len(indices) for indices in manifest["deleted"].values())
+
+        if len(manifest["segments"]) <= RAG_BM25_MAX_SEGMENTS and (
+            total == 0 or deleted / total <= MAX_DELETED_RATIO
+        ):
+            return
+
+        log.info(f"compacting bm25 index {self.path} ({total} docs, {deleted} deleted)")
+
+        ids, texts, metadatas = [], [], []
+        for name, segment in self._segments.items():
+            tombstones = self._deleted.get(name, set())
+            for idx, doc in segment.documents():
+                if idx not in tombstones:
+                    ids.append(doc["id"])
+                    texts.append(doc["text"])
+                    metadatas.append(doc["metadata"])
+
+        old_segments = list(manifest["segments"])
+        new_manifest = {"segments": [], "deleted": {}}
+        if ids:
+            name = f"seg-{uuid.uuid4().hex}"
+            BM25Segment.write(os.path.join(self.path, name), ids, texts, metadatas)
+            new_manifest["segments"].append(name)
+
+        self._write_manifest(new_manifest)
+        self._load()
+
+        for name in old_segments:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    ####################
+    # Reads
+    ####################
+
+    def search(self, query: str, k: int) -> list[tuple[str, str, Any, float]]:
+        with self._lock:
+            self._load()
+
+            live = 0
+            total_length = 0.0
+            for name, segment in self._segments.items():
+                deleted = self._deleted.get(name, set())
+                live += len(segment) - len(deleted)
+                total_length += float(np.sum(segment.lengths))
+                if deleted:
+                    total_length -= float(np.sum(segment.lengths[sorted(deleted)]))
+
+            terms = set(tokenize(query))
+            if live <= 0 or not terms:
+                return []
+            avgdl = max(total_length / live, 1.0)
+
+            idfs = {}
+            for term in terms:
+                df = sum(s.document_frequency(term) for s in self._segments.values())
+                if df:
+                    idfs[term] = math.log(1 + (live - df + 0.5) / (df + 0.5))
+
+            candidates = []
+            for name, segment in self._segments.items():
+                scores = segment.score(idfs, avgdl, self._deleted.get(name, set()))
+                if len(scores) > k:
+                    top = np.argpartition(-scores, k)[:k]
+                else:
+                    top = np.arange(len(scores))
+                candidates.extend(
+                    (float(scores[idx]), name, int(idx))
+                    for idx in top
+                    if scores[idx] > 0
+                )
+
+            candidates.sort(key=lambda x: x[0], reverse=True)
+
+            results = []
+            for score, name, idx in candidates[:k]:
+                doc = self._segments[name].document(idx)
+                results.append((doc["id"], doc["text"], doc["metadata"], score))
+            return results
+
+
+class BM25IndexManager:
+    def __init__(self, root: str = RAG_BM25_INDEX_DIR):
+        self.root = root
+        self._indexes: dict[str, BM25Index] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        return collection_path(self.root, collection_name)
+
+    def get_index(self, collection_name: str) -> BM25Index:
+        with self._lock:
+            if collection_name not in self._indexes:
+                self._indexes[collection_name] = BM25Index(self._path(collection_name))
+            return self._indexes[collection_name]
+
+    def has_index(self, collection_name: str) -> bool:
+        return self.get_index(collection_name).exists()
+
+    def insert(self, collection_name: str, ids, texts, metadatas):
+        self.get_index(collection_name).add(ids, texts, metadatas)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        self.get_index(collection_name).delete(ids=ids, filter=filter)
+
+    def search(self, collection_name: str, query: str, k: int):
+        return self.get_index(collection_name).search(query, k)
+
+    def delete_collection(self, collection_name: str):
+        with self._lock:
+            index = self._indexes.pop(collection_name, None)
+        if index is not None:
+            index.close()
+        shutil.rmtree(self._path(collection_name), ignore_errors=True)
+
+    def reset(self):
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes = {}
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+BM25_INDEX = BM25IndexManager()
@@ -0,0 +1,182 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from open_webui.config import (
+    ENABLE_RAG_QUERY_CACHE,
+    RAG_QUERY_CACHE_DIR,
+    RAG_QUERY_CACHE_SIZE,
+    RAG_QUERY_CACHE_TTL,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Version row bumped when every collection changes at once (reset, new
+# embedding or reranking model)
+ALL_COLLECTIONS = "*"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", query or "").split())
+
+
+class CollectionVersions:
+    """
+    Per-collection version counters in a SQLite database under DATA_DIR, so
+    that a write in one worker invalidates the cached results of every worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS collection_version (
+                    collection_name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, collection_names: list[str]) -> tuple:
+        names = sorted(set(collection_names)) + [ALL_COLLECTIONS]
+        rows = dict(
+            self._connection()
+            .execute(
+                f"SELECT collection_name, version FROM collection_version WHERE collection_name IN ({','.join('?' * len(names))})",
+                names,
+            )
+            .fetchall()
+        )
+        return tuple((name, rows.get(name, 0)) for name in names)
+
+    def bump(self, collection_name: str):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO collection_version (collection_name, version) VALUES (?, 1) "
+                "ON CONFLICT(collection_name) DO UPDATE SET version = version + 1",
+                (collection_name,),
+            )
+
+
+class QueryResultCache:
+    """
+    Bounded in-memory LRU of retrieval results.
+
+    Keys include the version of every collection involved, so a result can
+    only be served while none of its collections changed. Entries also expire
+    after `ttl` seconds as a safety net.
+    """
+
+    def __init__(self, versions: Optional[CollectionVersions], max_size: int, ttl: int):
+        self.versions = versions
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._items: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.versions is not None and self.max_size > 0
+
+    def bump(self, *collection_names: str):
+        if self.versions is None:
+            return
+        for collection_name in collection_names:
+            try:
+                self.versions.bump(collection_name)
+            except Exception as e:
+                log.warning(f"Failed to bump version of {collection_name}: {e}")
+
+    def bump_all(self):
+        self.bump(ALL_COLLECTIONS)
+
+    def get_or_compute(
+        self, kind: str, collection_names: list[str], params: dict, func: Callable
+    ):
+        if not self.enabled:
+            return func()
+
+        try:
+            versions = self.versions.get(collection_names)
+        except Exception as e:
+            log.warning(f"Query cache unavailable: {e}")
+            return func()
+
+        key = hashlib.sha256(
+            json.dumps([kind, versions, params], sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and now - item[0] < self.ttl:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(item[1])
+            self.misses += 1
+
+        result = func()
+
+        # Results are keyed by the versions read before computing them, a
+        # concurrent write bumps the version and orphans this entry.
+        with self._lock:
+            self._items[key] = (now, copy.deepcopy(result))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "items": len(self._items),
+                "max_items": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+
+QUERY_CACHE = QueryResultCache(
+    (
+        CollectionVersions(os.path.join(RAG_QUERY_CACHE_DIR, "versions.db"))
+        if ENABLE_RAG_QUERY_CACHE
+        else None
+    ),
+    max_size=RAG_QUERY_CACHE_SIZE if ENABLE_RAG_QUERY_CACHE else 0,
+    ttl=RAG_QUERY_CACHE_TTL,
+)
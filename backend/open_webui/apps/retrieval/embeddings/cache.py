@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+import numpy as np
+
+from open_webui.config import (
+    ENABLE_RAG_EMBEDDING_CACHE,
+    RAG_EMBEDDING_CACHE_DIR,
+    RAG_EMBEDDING_CACHE_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class EmbeddingCache:
+    """
+    Two tier, content-addressed embedding cache.
+
+    Keys are (engine, model, is_query, sha256(text)). The first tier is a
+    bounded in-memory LRU, the second a SQLite database shared by every worker
+    using the same DATA_DIR. Vectors are stored as float32.
+    """
+
+    def __init__(self, path: Optional[str], max_size: int = 10000):
+        self.path = path
+        self.max_size = max_size
+
+        self._memory: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS embedding (
+                        engine TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        is_query INTEGER NOT NULL,
+                        hash TEXT NOT NULL,
+                        vector BLOB NOT NULL,
+                        PRIMARY KEY (engine, model, is_query, hash)
+                    )
+                    """
+                )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, WAL so that several workers can read while
+        # another one writes.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(engine: str, model: str, is_query: bool, text: str) -> tuple:
+        return (
+            engine,
+            model,
+            int(bool(is_query)),
+            hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        )
+
+    def _remember(self, key: tuple, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: list[tuple]) -> dict[tuple, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.hits += len(found)
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.path:
+            try:
+                conn = self._connection()
+                for key in missing:
+                    row = conn.execute(
+                        "SELECT vector FROM embedding WHERE engine = ? AND model = ? AND is_query = ? AND hash = ?",
+                        key,
+                    ).fetchone()
+                    if row is not None:
+                        found[key] = np.frombuffer(row[0], dtype=np.float32)
+            except Exception as e:
+                log.warning(f"Embedding cache read failed: {e}")
+
+            with self._lock:
+                for key in missing:
+                    if key in found:
+                        self.disk_hits += 1
+                        self._remember(key, found[key])
+
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: dict[tuple, list[float]]):
+        vectors = {
+            key: np.asarray(vector, dtype=np.float32) for key, vector in items.items()
+        }
+
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+
+        if self.path and vectors:
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embedding (engine, model, is_query, hash, vector) VALUES (?, ?, ?, ?, ?)",
+                        [(*key, vector.tobytes()) for key, vector in vectors.items()],
+                    )
+            except Exception as e:
+                log.warning(f"Embedding cache write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.disk_hits + self.misses
+            return {
+                "memory_items": len(self._memory),
+                "max_memory_items": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    (self.hits + self.disk_hits) / requests if requests else 0.0
+                ),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+        if self.path:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM embedding")
+
+
+EMBEDDING_CACHE = EmbeddingCache(
+    (
+        os.path.join(RAG_EMBEDDING_CACHE_DIR, "embeddings.db")
+        if ENABLE_RAG_EMBEDDING_CACHE
+        else None
+    ),
+    max_size=RAG_EMBEDDING_CACHE_SIZE if ENABLE_RAG_EMBEDDING_CACHE else 0,
+)
+
+
+def get_cached_embedding_function(
+    embedding_function, engine: str, model: str, cache: EmbeddingCache = None
+):
+    """
+    Wrap an embedding function so that only texts missing from the cache are
+    sent to the embedding engine. Single strings are forwarded as strings and
+    lists as lists, so the wrapped function keeps the engine's calling convention.
+    """
+    cache = cache or EMBEDDING_CACHE
+
+    def embed(query: Union[str, list[str]], is_query: bool = False):
+        texts = query if isinstance(query, list) else [query]
+        keys = [cache.key(engine, model, is_query, text) for text in texts]
+        found = cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            if isinstance(query, list):
+                vectors = embedding_function(list(missing.values()), is_query=is_query)
+            else:
+                vectors = [embedding_function(query, is_query=is_query)]
+
+            if vectors is None or len(vectors) != len(missing) or None in vectors:
+                raise ValueError("The embedding engine did not return embeddings")
+
+            computed = dict(zip(missing.keys(), vectors))
+            cache.set_many(computed)
+            found = {**found, **computed}
+
+        embeddings = [
+            (
+                found[key].tolist()
+                if isinstance(found[key], np.ndarray)
+                else list(found[key])
+            )
+            for key in keys
+        ]
+        return embeddings if isinstance(query, list) else embeddings[0]
+
+    return embed
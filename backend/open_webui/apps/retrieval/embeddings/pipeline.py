@@ -0,0 +1,98 @@
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator
+
+from open_webui.config import (
+    RAG_EMBEDDING_CONCURRENCY,
+    RAG_EMBEDDING_MAX_RETRIES,
+    RAG_EMBEDDING_RETRY_BACKOFF,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Shared by all ingestions, bounds the number of batches in flight per process
+EMBEDDING_EXECUTOR = ThreadPoolExecutor(
+    max_workers=RAG_EMBEDDING_CONCURRENCY, thread_name_prefix="embedding"
+)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    # itertools.batched is only available from Python 3.12
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def embed_batch_with_retry(
+    embedding_function,
+    texts: list[str],
+    max_retries: int = RAG_EMBEDDING_MAX_RETRIES,
+    backoff: float = RAG_EMBEDDING_RETRY_BACKOFF,
+) -> list[list[float]]:
+    attempt = 0
+    while True:
+        try:
+            embeddings = embedding_function(texts, is_query=False)
+            if embeddings is None or len(embeddings) != len(texts):
+                raise ValueError("The embedding engine did not return embeddings")
+            return embeddings
+        except Exception as e:
+            if attempt >= max_retries:
+                raise e
+
+            # Exponential backoff with jitter so that parallel batches hitting
+            # the same rate limit do not retry in lockstep
+            delay = backoff * (2**attempt) * (0.5 + random.random())
+            log.warning(
+                f"Embedding batch of {len(texts)} failed ({e}), retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            attempt += 1
+
+
+def embed_batches_pipelined(
+    embedding_function,
+    batches: Iterable[tuple[Any, list[str]]],
+    concurrency: int = RAG_EMBEDDING_CONCURRENCY,
+) -> Iterator[tuple[Any, list[list[float]]]]:
+    """
+    Embed (payload, texts) batches pulled lazily from `batches`, keeping up to
+    `concurrency` of them in flight. Yields (payload, embeddings) in order as
+    soon as each batch is done, so only the batches in flight are held in
+    memory and callers can insert while later batches are still embedding.
+    """
+    batches = iter(batches)
+    in_flight = deque()
+
+    def submit():
+        batch = next(batches, None)
+        if batch is not None:
+            payload, texts = batch
+            in_flight.append(
+                (
+                    payload,
+                    EMBEDDING_EXECUTOR.submit(
+                        embed_batch_with_retry, embedding_function, texts
+                    ),
+                )
+            )
+
+    for _ in range(max(concurrency, 1)):
+        submit()
+
+    try:
+        while in_flight:
+            payload, future = in_flight.popleft()
+            embeddings = future.result()
+            submit()
+            yield payload, embeddings
+    finally:
+        # The consumer stopped early or a batch failed, drop what is left
+        for _, future in in_flight:
+            future.cancel()
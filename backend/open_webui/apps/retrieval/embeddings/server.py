@@ -0,0 +1,264 @@
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import threading
+import time
+from hashlib import sha256
+from multiprocessing.connection import Client
+from typing import Optional, Union
+
+import numpy as np
+
+from open_webui.apps.retrieval.embeddings.worker import serve
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.segments import FileLock
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def _is_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill terminates the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class EmbeddingServer:
+    """
+    Runs a SentenceTransformer model in `workers` separate processes shared by
+    every uvicorn worker, and encodes through them.
+
+    The processes listen on local sockets under `path`, named after the
+    model, so the first web worker to need a model starts them and the others
+    connect to the running ones. Each process batches the texts of requests
+    arriving together, up to `max_batch_size`, waiting at most `max_wait`
+    seconds for more. A process that went away is started again on the next
+    request. The web workers using the model are tracked in `users.json`, the
+    processes are stopped when the last of them closes its EmbeddingServer.
+
+    Drop-in replacement for the model in get_embedding_function: only
+    encode() is provided.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        device: str = "cpu",
+        trust_remote_code: bool = False,
+        workers: int = 1,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        path: str = "",
+        start_timeout: float = 600,
+    ):
+        self.model_path = model_path
+        self.device = device
+        self.trust_remote_code = trust_remote_code
+        self.workers = max(workers, 1)
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self.start_timeout = start_timeout
+
+        self.key = sha256(
+            json.dumps([model_path, device, trust_remote_code]).encode()
+        ).hexdigest()[:16]
+        self.path = os.path.join(path, self.key)
+        os.makedirs(self.path, exist_ok=True)
+        self.authkey = self._get_authkey()
+
+        # Connections are not thread-safe, idle ones are kept per process
+        self._connections = [queue.LifoQueue() for _ in range(self.workers)]
+        self._processes: dict[int, multiprocessing.Process] = {}
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+        self.start()
+
+    def _get_authkey(self) -> bytes:
+        authkey_path = os.path.join(self.path, "authkey")
+        with FileLock(os.path.join(self.path, ".lock")):
+            if not os.path.exists(authkey_path):
+                fd = os.open(authkey_path, os.O_WRONLY | os.O_CREAT, 0o600)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(secrets.token_bytes(32))
+            with open(authkey_path, "rb") as f:
+                return f.read()
+
+    def _update_users(self, add: bool) -> list[int]:
+        """
+        Add or remove this web worker from the users of the model, and return
+        the other ones. Workers that exited without closing are dropped.
+        Must be called with the file lock held.
+        """
+        users_path = os.path.join(self.path, "users.json")
+        try:
+            with open(users_path, "r") as f:
+                users = json.load(f)
+        except (FileNotFoundError, ValueError):
+            users = []
+
+        users = [pid for pid in users if pid != os.getpid() and _is_alive(pid)]
+
+        tmp_path = f"{users_path}.{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(users + [os.getpid()] if add else users, f)
+        os.replace(tmp_path, users_path)
+        return users
+
+    def _address(self, idx: int) -> str:
+        if hasattr(socket, "AF_UNIX"):
+            return os.path.join(self.path, f"worker-{idx}.sock")
+        return rf"\\.\pipe\open-webui-embeddings-{self.key}-{idx}"
+
+    def _connect(self, idx: int):
+        return Client(self._address(idx), authkey=self.authkey)
+
+    def _ping(self, idx: int) -> bool:
+        try:
+            with self._connect(idx) as conn:
+                conn.send(("ping",))
+                return conn.recv()[0] == "ok"
+        except Exception:
+            return False
+
+    def start(self):
+        """Start the processes of the model that are not running yet."""
+        with self._lock, FileLock(os.path.join(self.path, ".lock")):
+            self._update_users(add=True)
+
+            started = {}
+            for idx in range(self.workers):
+                if self._ping(idx):
+                    continue
+
+                # Spawn rather than fork, the server process runs threads
+                process = multiprocessing.get_context("spawn").Process(
+                    target=serve,
+                    args=(
+                        self.model_path,
+                        self.device,
+                        self.trust_remote_code,
+                        self._address(idx),
+                        self.authkey,
+                        self.max_batch_size,
+                        self.max_wait,
+                    ),
+                    name=f"embedding-server-{idx}",
+                    daemon=True,
+                )
+                process.start()
+                started[idx] = process
+                log.info(
+                    f"Started embedding server {idx} for {self.model_path} (pid {process.pid})"
+                )
+
+            # Other web workers wait on the lock until the model is loaded
+            deadline = time.monotonic() + self.start_timeout
+            for idx, process in started.items():
+                while not self._ping(idx):
+                    if not process.is_alive():
+                        raise RuntimeError(
+                            f"Embedding server for {self.model_path} exited with code {process.exitcode}"
+                        )
+                    if time.monotonic() > deadline:
+                        process.kill()
+                        raise RuntimeError(
+                            f"Embedding server for {self.model_path} did not start within {self.start_timeout}s"
+                        )
+                    time.sleep(0.1)
+                self._processes[idx] = process
+
+    def _request(self, message: tuple):
+        idx = next(self._next) % self.workers
+        connections = self._connections[idx]
+
+        for attempt in range(2):
+            try:
+                conn = connections.get_nowait()
+            except queue.Empty:
+                conn = None
+
+            try:
+                if conn is None:
+                    conn = self._connect(idx)
+                conn.send(message)
+                status, result = conn.recv()
+            except (EOFError, OSError) as e:
+                if conn is not None:
+                    conn.close()
+                if attempt:
+                    raise e
+                # Drop the other idle connections to the same process too
+                while not connections.empty():
+                    connections.get_nowait().close()
+                log.warning(f"Embedding server {idx} unavailable ({e}), restarting it")
+                self.start()
+                continue
+
+            connections.put(conn)
+            if status == "error":
+                raise RuntimeError(f"Embedding server error: {result}")
+            return result
+
+    def encode(
+        self,
+        sentences: Union[str, list[str]],
+        batch_size: Optional[int] = None,
+        **kwargs,
+    ) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size)[0]
+
+        # Large inputs go in several requests so that queries of other users
+        # are not stuck behind a whole document
+        batch_size = batch_size or self.max_batch_size
+        embeddings = [
+            self._request(("encode", list(sentences[i : i + batch_size])))
+            for i in range(0, len(sentences), batch_size)
+        ]
+        return np.concatenate(embeddings) if embeddings else np.empty((0, 0))
+
+    def close(self):
+        """
+        Drop the connections of this web worker, and stop the processes of
+        the model, whichever web worker started them, unless other web
+        workers still use it.
+        """
+        for connections in self._connections:
+            while not connections.empty():
+                connections.get_nowait().close()
+
+        with self._lock, FileLock(os.path.join(self.path, ".lock")):
+            users = self._update_users(add=False)
+            if users:
+                log.info(
+                    f"Embedding servers for {self.model_path} are still used by {len(users)} workers"
+                )
+                self._processes = {}
+                return
+
+            for idx in range(self.workers):
+                try:
+                    with self._connect(idx) as conn:
+                        conn.send(("shutdown",))
+                        conn.recv()
+                except Exception:
+                    pass
+
+        for process in self._processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self._processes = {}
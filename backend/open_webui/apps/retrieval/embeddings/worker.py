@@ -0,0 +1,114 @@
+# Runs in the embedding server processes, keep the imports light: the
+# processes are spawned and import this module on their own.
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Listener
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+def _collect(requests: queue.Queue, first, max_batch_size: int, max_wait: float):
+    batch = [first]
+    size = len(first[0])
+    deadline = time.monotonic() + max_wait
+
+    while size < max_batch_size:
+        try:
+            timeout = deadline - time.monotonic()
+            item = (
+                requests.get(timeout=timeout) if timeout > 0 else requests.get_nowait()
+            )
+        except queue.Empty:
+            break
+        batch.append(item)
+        size += len(item[0])
+    return batch
+
+
+def _encode_loop(model, requests: queue.Queue, max_batch_size: int, max_wait: float):
+    # A single thread owns the model, requests that queued up while it was
+    # busy are encoded together
+    while True:
+        batch = _collect(requests, requests.get(), max_batch_size, max_wait)
+        try:
+            embeddings = model.encode(
+                [text for texts, _ in batch for text in texts],
+                batch_size=max_batch_size,
+                convert_to_numpy=True,
+            )
+            splits = np.cumsum([len(texts) for texts, _ in batch])
+            for (_, future), result in zip(batch, np.split(embeddings, splits[:-1])):
+                future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+def _handle(conn, requests: queue.Queue):
+    # One request at a time per connection, clients open one per caller
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if message[0] == "encode":
+                future = Future()
+                requests.put((message[1], future))
+                try:
+                    conn.send(("ok", future.result()))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+            elif message[0] == "ping":
+                conn.send(("ok", os.getpid()))
+            elif message[0] == "shutdown":
+                conn.send(("ok", None))
+                os._exit(0)
+
+
+def serve(
+    model_path: str,
+    device: str,
+    trust_remote_code: bool,
+    address: str,
+    authkey: bytes,
+    max_batch_size: int,
+    max_wait: float,
+):
+    """Load the model, then answer encode requests on `address` until shut down."""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(
+        model_path, device=device, trust_remote_code=trust_remote_code
+    )
+
+    requests = queue.Queue()
+    threading.Thread(
+        target=_encode_loop,
+        args=(model, requests, max_batch_size, max_wait),
+        name="embedding-encoder",
+        daemon=True,
+    ).start()
+
+    # Only bound once the model is loaded, accepting connections means ready.
+    # The caller made sure nothing is serving on a leftover socket file.
+    if not address.startswith("\\\\") and os.path.exists(address):
+        os.unlink(address)
+
+    with Listener(address, authkey=authkey) as listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                log.warning(f"Rejected embedding server connection: {e}")
+                continue
+            threading.Thread(target=_handle, args=(conn, requests), daemon=True).start()
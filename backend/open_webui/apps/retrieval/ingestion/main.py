@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import threading
+import uuid
+from typing import Optional
+
+from open_webui.apps.retrieval.main import ProcessFileForm, ingest_file
+from open_webui.apps.socket.main import emit_to_user
+from open_webui.apps.webui.models.ingestion_jobs import (
+    IngestionJobModel,
+    IngestionJobs,
+)
+from open_webui.apps.webui.models.knowledge import Knowledges, KnowledgeUpdateForm
+from open_webui.config import (
+    RAG_INGESTION_JOB_TIMEOUT,
+    RAG_INGESTION_MAX_ATTEMPTS,
+    RAG_INGESTION_WORKERS,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class IngestionQueue:
+    """
+    Durable file ingestion queue.
+
+    Jobs live in the ingestion_job table, so they survive restarts and can be
+    picked up by the workers of any process sharing the database. Each worker
+    thread claims one job at a time and runs it through ingest_file, status
+    changes are stored and pushed to the owner's socket sessions as
+    "ingestion-events".
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        poll_interval: float = 2.0,
+        job_timeout: int = 300,
+        max_attempts: int = 3,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+
+        self.id = str(uuid.uuid4())
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._running: set[str] = set()
+        self._lock = threading.Lock()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        if self._threads:
+            return
+
+        self.loop = loop
+        self._stopped.clear()
+
+        try:
+            requeued = IngestionJobs.requeue_stale_jobs(
+                self.job_timeout, self.max_attempts
+            )
+            if requeued:
+                log.info(f"Requeued {requeued} interrupted ingestion jobs")
+        except Exception as e:
+            log.exception(e)
+
+        for idx in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"ingestion-{idx}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(
+            target=self._heartbeat, name="ingestion-heartbeat", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+
+        log.info(f"Started {self.workers} ingestion workers")
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def enqueue(
+        self, user_id: str, file_id: str, collection_name: Optional[str] = None
+    ) -> Optional[IngestionJobModel]:
+        job = IngestionJobs.insert_new_job(user_id, file_id, collection_name)
+        if job:
+            self._emit(job)
+            self._wakeup.set()
+        return job
+
+    def _work(self):
+        worker_id = f"{self.id}:{threading.current_thread().name}"
+        while not self._stopped.is_set():
+            try:
+                job = IngestionJobs.claim_next_job(worker_id)
+            except Exception as e:
+                log.exception(e)
+                job = None
+
+            if job is None:
+                # Sleep until a job is enqueued locally, or poll for jobs
+                # enqueued by other processes
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def _run(self, job: IngestionJobModel):
+        with self._lock:
+            self._running.add(job.id)
+
+        def on_status(status: str):
+            self._set_status(job, status)
+
+        try:
+            # Knowledge jobs reuse the extracted content, there is nothing to
+            # extract
+            on_status("embedding" if job.collection_name else "extracting")
+            ingest_file(
+                ProcessFileForm(
+                    file_id=job.file_id, collection_name=job.collection_name
+                ),
+                on_status=on_status,
+                # Files already in the knowledge base come from the update route
+                replace=self._in_knowledge(job),
+            )
+            if job.collection_name:
+                self._add_to_knowledge(job)
+            self._set_status(job, "indexed")
+        except Exception as e:
+            log.exception(e)
+            error = str(e.detail) if hasattr(e, "detail") else str(e)
+            self._set_status(job, "failed", error)
+        finally:
+            with self._lock:
+                self._running.discard(job.id)
+
+    def _in_knowledge(self, job: IngestionJobModel) -> bool:
+        if not job.collection_name:
+            return False
+        knowledge = Knowledges.get_knowledge_by_id(id=job.collection_name)
+        return knowledge is not None and job.file_id in (knowledge.data or {}).get(
+            "file_ids", []
+        )
+
+    def _add_to_knowledge(self, job: IngestionJobModel):
+        # Knowledge bases only list files whose content made it into the
+        # collection
+        with self._lock:
+            knowledge = Knowledges.get_knowledge_by_id(id=job.collection_name)
+            if knowledge is None:
+                return
+
+            data = knowledge.data or {}
+            file_ids = data.get("file_ids", [])
+            if job.file_id not in file_ids:
+                file_ids.append(job.file_id)
+                data["file_ids"] = file_ids
+                Knowledges.update_knowledge_by_id(
+                    id=knowledge.id, form_data=KnowledgeUpdateForm(data=data)
+                )
+
+    def _heartbeat(self):
+        # Keep long running jobs fresh, and recover jobs of dead workers
+        interval = max(self.job_timeout / 3, 1)
+        while not self._stopped.wait(interval):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                IngestionJobs.touch_jobs_by_ids(running)
+                IngestionJobs.requeue_stale_jobs(self.job_timeout, self.max_attempts)
+            except Exception as e:
+                log.exception(e)
+
+    def _set_status(
+        self, job: IngestionJobModel, status: str, error: Optional[str] = None
+    ):
+        if job.status == status and error is None:
+            return
+
+        updated = IngestionJobs.update_job_status_by_id(job.id, status, error)
+        job.status = status
+        job.error = error
+        self._emit(updated or job)
+
+    def _emit(self, job: IngestionJobModel):
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(
+            emit_to_user(
+                job.user_id,
+                "ingestion-events",
+                {
+                    "id": job.id,
+                    "file_id": job.file_id,
+                    "collection_name": job.collection_name,
+                    "status": job.status,
+                    "error": job.error,
+                },
+            ),
+            self.loop,
+        )
+
+
+INGESTION_QUEUE = IngestionQueue(
+    workers=RAG_INGESTION_WORKERS,
+    job_timeout=RAG_INGESTION_JOB_TIMEOUT,
+    max_attempts=RAG_INGESTION_MAX_ATTEMPTS,
+)
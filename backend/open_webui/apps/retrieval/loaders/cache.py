@@ -0,0 +1,168 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Iterable, Iterator, Optional
+
+from langchain_core.documents import Document
+
+from open_webui.config import (
+    ENABLE_RAG_EXTRACTION_CACHE,
+    RAG_EXTRACTION_CACHE_DIR,
+    RAG_EXTRACTION_CACHE_MAX_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class ExtractionCache:
+    """
+    Documents extracted from files, stored as gzipped JSON lines under
+    `path` and keyed by the sha256 of the file bytes and the extraction
+    settings, so the same file uploaded again is not extracted again.
+
+    Entries are only written once extraction went through the whole file.
+    The least recently used entries are removed once the cache grows past
+    `max_size` bytes, and the entries of a file when it is deleted, see
+    delete_file.
+    """
+
+    # Stands for the path of the file being loaded in the cached metadata,
+    # every upload of the same file has a path of its own
+    SOURCE = "__source__"
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    @classmethod
+    def key(cls, file_path: str, **settings) -> str:
+        # Prefixed with the hash of the file, so that all the extractions of a
+        # file can be found again from its bytes
+        settings_hash = hashlib.sha256(
+            json.dumps(settings, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"{cls.file_hash(file_path)}-{settings_hash}"
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.jsonl.gz")
+
+    def get(self, key: str, file_path: str) -> Optional[Iterator[Document]]:
+        entry_path = self._entry_path(key)
+        if not os.path.exists(entry_path):
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            return None
+
+        def load():
+            with gzip.open(entry_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    doc = json.loads(line)
+                    metadata = doc["metadata"]
+                    if metadata.get("source") == self.SOURCE:
+                        metadata["source"] = file_path
+                    yield Document(page_content=doc["page_content"], metadata=metadata)
+
+        return load()
+
+    def wrap(
+        self, key: str, file_path: str, docs: Iterable[Document]
+    ) -> Iterator[Document]:
+        """Yields `docs`, storing them under `key` once they are all extracted."""
+        tmp_path = f"{self._entry_path(key)}.tmp-{uuid.uuid4().hex}"
+        completed = False
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+                for doc in docs:
+                    metadata = dict(doc.metadata)
+                    if metadata.get("source") == file_path:
+                        metadata["source"] = self.SOURCE
+                    f.write(
+                        json.dumps(
+                            {"page_content": doc.page_content, "metadata": metadata},
+                            default=str,
+                        )
+                        + "\n"
+                    )
+                    yield doc
+            os.replace(tmp_path, self._entry_path(key))
+            completed = True
+        finally:
+            if not completed and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if completed:
+            self.prune()
+
+    def prune(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".jsonl.gz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+            total -= size
+
+    def delete_file(self, file_path: str):
+        """Remove the extractions of the file at `file_path`, for any settings."""
+        prefix = f"{self.file_hash(file_path)}-"
+        for name in os.listdir(self.path):
+            if name.startswith(prefix) and name.endswith(".jsonl.gz"):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if not name.endswith(".jsonl.gz"):
+                continue
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+
+EXTRACTION_CACHE = (
+    ExtractionCache(RAG_EXTRACTION_CACHE_DIR, max_size=RAG_EXTRACTION_CACHE_MAX_SIZE)
+    if ENABLE_RAG_EXTRACTION_CACHE
+    else None
+)
+
+
+def delete_file_extractions(file_path: str):
+    # Called when a file is deleted, `file_path` is its local copy
+    if EXTRACTION_CACHE is None or not os.path.isfile(file_path):
+        return
+    try:
+        EXTRACTION_CACHE.delete_file(file_path)
+    except Exception as e:
+        log.exception(e)
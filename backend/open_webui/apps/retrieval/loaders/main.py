@@ -1,13 +1,22 @@
+import hashlib
+import json
 import requests
 import logging
+import math
+import multiprocessing
+import tempfile
+import threading
 import ftfy
 
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
+
 from langchain_community.document_loaders import (
     BSHTMLLoader,
     CSVLoader,
     Docx2txtLoader,
     OutlookMessageLoader,
-    PyPDFLoader,
     TextLoader,
     UnstructuredEPubLoader,
     UnstructuredExcelLoader,
@@ -18,6 +27,17 @@ from langchain_community.document_loaders import (
     YoutubeLoader,
 )
 from langchain_core.documents import Document
+from requests.adapters import HTTPAdapter
+
+from open_webui.apps.retrieval.loaders.cache import EXTRACTION_CACHE
+from open_webui.apps.retrieval.loaders.pdf import extract_pages, iter_pages
+from open_webui.config import (
+    RAG_DOCUMENT_SPOOL_MAX_MEMORY,
+    RAG_PDF_EXTRACT_WORKERS,
+    RAG_PDF_PARALLEL_MIN_PAGES,
+    TIKA_MAX_CONNECTIONS,
+    TIKA_TIMEOUT,
+)
 from open_webui.env import SRC_LOG_LEVELS
 
 log = logging.getLogger(__name__)
@@ -77,6 +97,16 @@ known_source_ext = [
 ]
 
 
+# Keeps connections to the Tika server open between files
+TIKA_SESSION = requests.Session()
+TIKA_SESSION.mount(
+    "http://", HTTPAdapter(pool_connections=1, pool_maxsize=TIKA_MAX_CONNECTIONS)
+)
+TIKA_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=1, pool_maxsize=TIKA_MAX_CONNECTIONS)
+)
+
+
 class TikaLoader:
     def __init__(self, url, file_path, mime_type=None):
         self.url = url
@@ -84,9 +114,6 @@ class TikaLoader:
         self.mime_type = mime_type
 
     def load(self) -> list[Document]:
-        with open(self.file_path, "rb") as f:
-            data = f.read()
-
         if self.mime_type is not None:
             headers = {"Content-Type": self.mime_type}
         else:
@@ -97,7 +124,11 @@ class TikaLoader:
             endpoint += "/"
         endpoint += "tika/text"
 
-        r = requests.put(endpoint, data=data, headers=headers)
+        # The file is streamed from disk rather than read into memory first
+        with open(self.file_path, "rb") as f:
+            r = TIKA_SESSION.put(
+                endpoint, data=f, headers=headers, timeout=TIKA_TIMEOUT
+            )
 
         if r.ok:
             raw_metadata = r.json()
@@ -112,6 +143,97 @@ class TikaLoader:
         else:
             raise Exception(f"Error calling Tika: {r.reason}")
 
+    def lazy_load(self) -> Iterator[Document]:
+        yield from self.load()
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool() -> Optional[ProcessPoolExecutor]:
+    global _pdf_pool
+    if RAG_PDF_EXTRACT_WORKERS <= 0:
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # Spawn rather than fork, the server process runs threads
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=RAG_PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_pool
+
+
+class PDFLoader:
+    """
+    Same documents as PyPDFLoader, one per page, but the pages of large PDFs
+    are extracted by the PDF process pool: ranges of pages are extracted (and
+    OCRed with extract_images) in parallel and yielded in order.
+    """
+
+    def __init__(self, file_path: str, extract_images: bool = False):
+        self.file_path = file_path
+        self.extract_images = extract_images
+
+    def _documents(self, pages) -> Iterator[Document]:
+        for page_number, text in pages:
+            yield Document(
+                page_content=text,
+                metadata={"source": self.file_path, "page": page_number},
+            )
+
+    def lazy_load(self) -> Iterator[Document]:
+        import pypdf
+
+        page_count = len(pypdf.PdfReader(self.file_path).pages)
+        pool = get_pdf_pool()
+
+        if pool is None or page_count < max(RAG_PDF_PARALLEL_MIN_PAGES, 2):
+            yield from self._documents(
+                iter_pages(self.file_path, 0, page_count, self.extract_images)
+            )
+            return
+
+        # A few ranges per process evens out pages that take longer to OCR
+        size = math.ceil(page_count / (RAG_PDF_EXTRACT_WORKERS * 4))
+        try:
+            futures = [
+                pool.submit(
+                    extract_pages,
+                    self.file_path,
+                    start,
+                    start + size,
+                    self.extract_images,
+                )
+                for start in range(0, page_count, size)
+            ]
+        except BrokenProcessPool:
+            futures = None
+
+        done = 0
+        try:
+            for future in futures or []:
+                pages = future.result()
+                yield from self._documents(pages)
+                done += len(pages)
+        except BrokenProcessPool:
+            futures = None
+        finally:
+            for future in futures or []:
+                future.cancel()
+
+        if futures is None:
+            global _pdf_pool
+            log.warning("PDF extraction pool broke, recreating it")
+            with _pdf_pool_lock:
+                if _pdf_pool is pool:
+                    _pdf_pool = None
+            # Carry on in this thread from the first page not yielded yet
+            yield from self._documents(
+                iter_pages(self.file_path, done, page_count, self.extract_images)
+            )
+
 
 class Loader:
     def __init__(self, engine: str = "", **kwargs):
@@ -121,15 +243,42 @@ class Loader:
     def load(
         self, filename: str, file_content_type: str, file_path: str
     ) -> list[Document]:
-        loader = self._get_loader(filename, file_content_type, file_path)
-        docs = loader.load()
+        return list(self.lazy_load(filename, file_content_type, file_path))
+
+    def lazy_load(
+        self, filename: str, file_content_type: str, file_path: str
+    ) -> Iterator[Document]:
+        if EXTRACTION_CACHE is None:
+            yield from self._lazy_load(filename, file_content_type, file_path)
+            return
+
+        key = EXTRACTION_CACHE.key(
+            file_path,
+            engine=self.engine,
+            file_ext=filename.split(".")[-1].lower(),
+            file_content_type=file_content_type,
+            **self.kwargs,
+        )
+        docs = EXTRACTION_CACHE.get(key, file_path)
+        if docs is not None:
+            log.info(f"Using the cached extraction of {filename}")
+            yield from docs
+            return
 
-        return [
-            Document(
+        yield from EXTRACTION_CACHE.wrap(
+            key, file_path, self._lazy_load(filename, file_content_type, file_path)
+        )
+
+    def _lazy_load(
+        self, filename: str, file_content_type: str, file_path: str
+    ) -> Iterator[Document]:
+        # Loaders that support it (PDF pages, CSV rows, ...) yield one document
+        # at a time instead of materializing the whole file
+        loader = self._get_loader(filename, file_content_type, file_path)
+        for doc in loader.lazy_load():
+            yield Document(
                 page_content=ftfy.fix_text(doc.page_content), metadata=doc.metadata
             )
-            for doc in docs
-        ]
 
     def _get_loader(self, filename: str, file_content_type: str, file_path: str):
         file_ext = filename.split(".")[-1].lower()
@@ -147,7 +296,7 @@ class Loader:
                 )
         else:
             if file_ext == "pdf":
-                loader = PyPDFLoader(
+                loader = PDFLoader(
                     file_path, extract_images=self.kwargs.get("PDF_EXTRACT_IMAGES")
                 )
             elif file_ext == "csv":
@@ -188,3 +337,89 @@ class Loader:
                 loader = TextLoader(file_path, autodetect_encoding=True)
 
         return loader
+
+
+class DocumentSpool:
+    """
+    Write-once buffer of loaded documents, spilled to a temporary file once it
+    grows past `max_memory` bytes.
+
+    Documents are added as they are loaded while the sha256 of their joined
+    content is computed incrementally (the same value as
+    calculate_sha256_string(" ".join(contents))), then read back lazily for
+    splitting and embedding. Up to `max_content_length` characters of the
+    joined content are kept for the file record.
+    """
+
+    def __init__(
+        self,
+        max_content_length: int = 0,
+        max_memory: int = RAG_DOCUMENT_SPOOL_MAX_MEMORY,
+    ):
+        self.max_content_length = max_content_length
+
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=max_memory, mode="w+", encoding="utf-8"
+        )
+        self._sha256 = hashlib.sha256()
+        self._content: list[str] = []
+        self._content_length = 0
+
+        self.count = 0
+        self.length = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, doc: Document):
+        text = doc.page_content or ""
+        if self.count:
+            text = " " + text
+        self._sha256.update(text.encode("utf-8"))
+        self.length += len(text)
+
+        if (
+            not self.max_content_length
+            or self._content_length < self.max_content_length
+        ):
+            if self.max_content_length:
+                text = text[: self.max_content_length - self._content_length]
+            self._content.append(text)
+            self._content_length += len(text)
+
+        self._file.write(
+            json.dumps(
+                {"page_content": doc.page_content, "metadata": doc.metadata},
+                default=str,
+            )
+            + "\n"
+        )
+        self.count += 1
+
+    def extend(self, docs):
+        for doc in docs:
+            self.add(doc)
+        return self
+
+    @property
+    def hash(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content)
+
+    @property
+    def truncated(self) -> bool:
+        return self._content_length < self.length
+
+    def __iter__(self) -> Iterator[Document]:
+        self._file.seek(0)
+        for line in self._file:
+            yield Document(**json.loads(line))
+
+    def close(self):
+        self._file.close()
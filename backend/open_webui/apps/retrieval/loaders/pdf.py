@@ -0,0 +1,49 @@
+# Runs in the PDF extraction process pool, keep the imports light: the
+# pool's processes are spawned and import this module on their own.
+
+import io
+from typing import Iterator
+
+
+def _iter_pages_with_images(
+    file_path: str, reader, start: int, end: int
+) -> Iterator[tuple[int, str]]:
+    # Images are OCRed by PyPDFParser, run on a PDF of just the page range so
+    # that only its public API is used
+    import pypdf
+    from langchain_community.document_loaders.blob_loaders import Blob
+    from langchain_community.document_loaders.parsers.pdf import PyPDFParser
+
+    writer = pypdf.PdfWriter()
+    for page_number in range(start, end):
+        writer.add_page(reader.pages[page_number])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    parser = PyPDFParser(extract_images=True)
+    for doc in parser.lazy_parse(Blob.from_data(buffer.getvalue(), path=file_path)):
+        yield start + doc.metadata["page"], doc.page_content
+
+
+def iter_pages(
+    file_path: str, start: int, end: int, extract_images: bool = False
+) -> Iterator[tuple[int, str]]:
+    """Yield the (page number, text) of pages [start, end), like PyPDFLoader."""
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    end = min(end, len(reader.pages))
+
+    if extract_images and start < end:
+        yield from _iter_pages_with_images(file_path, reader, start, end)
+        return
+
+    for page_number in range(start, end):
+        page = reader.pages[page_number]
+        yield page_number, page.extract_text(extraction_mode="plain")
+
+
+def extract_pages(
+    file_path: str, start: int, end: int, extract_images: bool = False
+) -> list[tuple[int, str]]:
+    return list(iter_pages(file_path, start, end, extract_images))
@@ -1,31 +1,48 @@
 # TODO: Merge this with the webui_app and make it a single app
 
+import itertools
 import json
 import logging
 import mimetypes
 import os
 import shutil
+import time
 
 import uuid
+from concurrent.futures import as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Iterator, Optional, Sequence, Union
+from typing import Callable, Iterable, Iterator, Optional, Sequence, Union
 
 from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import tiktoken
 
 
 from open_webui.storage.provider import Storage
 from open_webui.apps.webui.models.knowledge import Knowledges
 from open_webui.apps.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.apps.retrieval.bm25.main import BM25_INDEX
+from open_webui.apps.retrieval.cache import QUERY_CACHE
+from open_webui.apps.retrieval.embeddings.cache import EMBEDDING_CACHE
+from open_webui.apps.retrieval.embeddings.server import EmbeddingServer
+from open_webui.apps.retrieval.embeddings.pipeline import (
+    batched,
+    embed_batches_pipelined,
+)
 
 # Document loaders
-from open_webui.apps.retrieval.loaders.main import Loader
+from open_webui.apps.retrieval.loaders.main import DocumentSpool, Loader
+from open_webui.apps.retrieval.splitter import get_text_splitter
+from open_webui.apps.retrieval.models.batcher import RerankBatcher
 
 # Web search engines
 from open_webui.apps.retrieval.web.main import SearchResult
+from open_webui.apps.retrieval.web.cache import (
+    SEARCH_EXECUTOR,
+    SEARCH_RESULT_CACHE,
+    WEB_COLLECTIONS,
+)
 from open_webui.apps.retrieval.web.utils import get_web_loader
 from open_webui.apps.retrieval.web.brave import search_brave
 from open_webui.apps.retrieval.web.duckduckgo import search_duckduckgo
@@ -40,6 +57,7 @@ from open_webui.apps.retrieval.web.tavily import search_tavily
 
 
 from open_webui.apps.retrieval.utils import (
+    format_embedding_config,
     get_embedding_function,
     get_model_path,
     query_collection,
@@ -49,6 +67,7 @@ from open_webui.apps.retrieval.utils import (
     get_query_embeddings,
 )
 
+from open_webui.apps.webui.models.collection_files import CollectionFiles
 from open_webui.apps.webui.models.files import Files
 from open_webui.config import (
     BRAVE_SEARCH_API_KEY,
@@ -71,20 +90,32 @@ from open_webui.config import (
     RAG_EMBEDDING_MODEL_AUTO_UPDATE,
     RAG_EMBEDDING_MODEL_TRUST_REMOTE_CODE,
     RAG_EMBEDDING_BATCH_SIZE,
+    ENABLE_RAG_EMBEDDING_SERVER,
+    RAG_EMBEDDING_SERVER_BATCH_WAIT_MS,
+    RAG_EMBEDDING_SERVER_DIR,
+    RAG_EMBEDDING_SERVER_MAX_BATCH_SIZE,
+    RAG_EMBEDDING_SERVER_START_TIMEOUT,
+    RAG_EMBEDDING_SERVER_WORKERS,
+    RAG_EMBEDDING_CONCURRENCY,
     RAG_FILE_MAX_COUNT,
     RAG_FILE_MAX_SIZE,
+    RAG_FILE_CONTENT_MAX_LENGTH,
     RAG_OPENAI_API_BASE_URL,
     RAG_OPENAI_API_KEY,
     RAG_RELEVANCE_THRESHOLD,
     RAG_RERANKING_MODEL,
     RAG_RERANKING_MODEL_AUTO_UPDATE,
     RAG_RERANKING_MODEL_TRUST_REMOTE_CODE,
+    RAG_RERANKING_BATCH_WAIT_MS,
+    RAG_RERANKING_MAX_BATCH_SIZE,
+    RAG_COLBERT_CACHE_SIZE,
     DEFAULT_RAG_TEMPLATE,
     RAG_TEMPLATE,
     RAG_TOP_K,
     RAG_WEB_SEARCH_CONCURRENT_REQUESTS,
     RAG_WEB_SEARCH_DOMAIN_FILTER_LIST,
     RAG_WEB_SEARCH_ENGINE,
+    RAG_WEB_SEARCH_RACE_ENGINE,
     RAG_WEB_SEARCH_RESULT_COUNT,
     SEARCHAPI_API_KEY,
     SEARCHAPI_ENGINE,
@@ -96,6 +127,7 @@ from open_webui.config import (
     TAVILY_API_KEY,
     TIKA_SERVER_URL,
     UPLOAD_DIR,
+    VECTOR_DB,
     YOUTUBE_LOADER_LANGUAGE,
     AppConfig,
 )
@@ -109,7 +141,6 @@ from open_webui.utils.misc import (
 )
 from open_webui.utils.utils import get_admin_user, get_verified_user
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter, TokenTextSplitter
 from langchain_community.document_loaders import (
     YoutubeLoader,
 )
@@ -119,6 +150,10 @@ from langchain_core.documents import Document
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
+# Chunks are added to the BM25 index in segments of this size while a large
+# document is being embedded
+BM25_INSERT_BATCH_SIZE = 2000
+
 app = FastAPI(docs_url="/docs" if ENV == "dev" else None, openapi_url="/openapi.json" if ENV == "dev" else None, redoc_url=None)
 
 app.state.config = AppConfig()
@@ -180,14 +215,29 @@ def update_embedding_model(
     embedding_model: str,
     auto_update: bool = False,
 ):
+    if isinstance(getattr(app.state, "sentence_transformer_ef", None), EmbeddingServer):
+        app.state.sentence_transformer_ef.close()
+
     if embedding_model and app.state.config.RAG_EMBEDDING_ENGINE == "":
-        from sentence_transformers import SentenceTransformer
+        if ENABLE_RAG_EMBEDDING_SERVER:
+            app.state.sentence_transformer_ef = EmbeddingServer(
+                get_model_path(embedding_model, auto_update),
+                device=DEVICE_TYPE,
+                trust_remote_code=RAG_EMBEDDING_MODEL_TRUST_REMOTE_CODE,
+                workers=RAG_EMBEDDING_SERVER_WORKERS,
+                max_batch_size=RAG_EMBEDDING_SERVER_MAX_BATCH_SIZE,
+                max_wait=RAG_EMBEDDING_SERVER_BATCH_WAIT_MS / 1000,
+                path=RAG_EMBEDDING_SERVER_DIR,
+                start_timeout=RAG_EMBEDDING_SERVER_START_TIMEOUT,
+            )
+        else:
+            from sentence_transformers import SentenceTransformer
 
-        app.state.sentence_transformer_ef = SentenceTransformer(
-            get_model_path(embedding_model, auto_update),
-            device=DEVICE_TYPE,
-            trust_remote_code=RAG_EMBEDDING_MODEL_TRUST_REMOTE_CODE,
-        )
+            app.state.sentence_transformer_ef = SentenceTransformer(
+                get_model_path(embedding_model, auto_update),
+                device=DEVICE_TYPE,
+                trust_remote_code=RAG_EMBEDDING_MODEL_TRUST_REMOTE_CODE,
+            )
     else:
         app.state.sentence_transformer_ef = None
 
@@ -196,6 +246,9 @@ def update_reranking_model(
     reranking_model: str,
     auto_update: bool = False,
 ):
+    if isinstance(getattr(app.state, "sentence_transformer_rf", None), RerankBatcher):
+        app.state.sentence_transformer_rf.close()
+
     if reranking_model:
         if any(model in reranking_model for model in ["jinaai/jina-colbert-v2"]):
             try:
@@ -204,6 +257,7 @@ def update_reranking_model(
                 app.state.sentence_transformer_rf = ColBERT(
                     get_model_path(reranking_model, auto_update),
                     env="docker" if DOCKER else None,
+                    cache_size=RAG_COLBERT_CACHE_SIZE,
                 )
             except Exception as e:
                 log.error(f"ColBERT: {e}")
@@ -225,6 +279,13 @@ def update_reranking_model(
     else:
         app.state.sentence_transformer_rf = None
 
+    if app.state.sentence_transformer_rf is not None:
+        app.state.sentence_transformer_rf = RerankBatcher(
+            app.state.sentence_transformer_rf,
+            max_batch_size=RAG_RERANKING_MAX_BATCH_SIZE,
+            max_wait=RAG_RERANKING_BATCH_WAIT_MS / 1000,
+        )
+
 
 update_embedding_model(
     app.state.config.RAG_EMBEDDING_MODEL,
@@ -295,6 +356,44 @@ async def get_embedding_config(user=Depends(get_admin_user)):
     }
 
 
+@app.get("/embedding/cache")
+async def get_embedding_cache_stats(user=Depends(get_admin_user)):
+    return {"status": True, **EMBEDDING_CACHE.stats()}
+
+
+@app.post("/embedding/cache/reset")
+async def reset_embedding_cache(user=Depends(get_admin_user)):
+    EMBEDDING_CACHE.reset()
+    return {"status": True}
+
+
+@app.get("/query/cache")
+async def get_query_cache_stats(user=Depends(get_admin_user)):
+    return {"status": True, **QUERY_CACHE.stats()}
+
+
+@app.post("/query/cache/reset")
+async def reset_query_cache(user=Depends(get_admin_user)):
+    QUERY_CACHE.clear()
+    return {"status": True}
+
+
+@app.get("/vector/stats")
+async def get_vector_db_stats(user=Depends(get_admin_user)):
+    return {"status": True, "engine": VECTOR_DB, **VECTOR_DB_CLIENT.stats()}
+
+
+@app.get("/web/search/cache")
+async def get_web_search_cache_stats(user=Depends(get_admin_user)):
+    return {"status": True, **SEARCH_RESULT_CACHE.stats()}
+
+
+@app.post("/web/search/cache/reset")
+async def reset_web_search_cache(user=Depends(get_admin_user)):
+    SEARCH_RESULT_CACHE.clear()
+    return {"status": True}
+
+
 @app.get("/reranking")
 async def get_reraanking_config(user=Depends(get_admin_user)):
     return {
@@ -333,6 +432,9 @@ async def update_embedding_config(
             app.state.config.RAG_EMBEDDING_BATCH_SIZE = form_data.embedding_batch_size
 
         update_embedding_model(app.state.config.RAG_EMBEDDING_MODEL)
+        QUERY_CACHE.bump_all()
+        # Web collections are rebuilt with the new model on their next refresh
+        WEB_COLLECTIONS.clear()
 
         app.state.EMBEDDING_FUNCTION = get_embedding_function(
             app.state.config.RAG_EMBEDDING_ENGINE,
@@ -376,6 +478,7 @@ async def update_reranking_config(
         app.state.config.RAG_RERANKING_MODEL = form_data.reranking_model
 
         update_reranking_model(app.state.config.RAG_RERANKING_MODEL, True)
+        QUERY_CACHE.bump_all()
 
         return {
             "status": True,
@@ -637,90 +740,197 @@ async def update_query_settings(
 ####################################
 
 
+def delete_chunks(
+    collection_name: str,
+    ids: Optional[list[str]] = None,
+    filter: Optional[dict] = None,
+):
+    VECTOR_DB_CLIENT.delete(collection_name=collection_name, ids=ids, filter=filter)
+    BM25_INDEX.delete(collection_name, ids=ids, filter=filter)
+    QUERY_CACHE.bump(collection_name)
+
+    if filter and "file_id" in filter:
+        CollectionFiles.delete_by_file_id(collection_name, filter["file_id"])
+    elif filter and "hash" in filter:
+        CollectionFiles.delete_by_hash(collection_name, filter["hash"])
+
+
+def delete_collection(collection_name: str):
+    # The BM25 index and collection_file rows go even when the vector DB has
+    # no such collection
+    try:
+        VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+    finally:
+        BM25_INDEX.delete_collection(collection_name)
+        CollectionFiles.delete_by_collection(collection_name)
+        QUERY_CACHE.bump(collection_name)
+
+
+def index_collection(collection_name: str) -> bool:
+    """
+    Make sure the collection_file index covers the collection, and return
+    whether the collection has any indexed content. Collections created before
+    the index existed are indexed from the metadata of their chunks, once.
+    """
+    if CollectionFiles.has_collection(collection_name):
+        return True
+    if not VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
+        return False
+
+    result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+    entries = {}
+    for chunk_metadata in result.metadatas[0] if result is not None else []:
+        file_id = (chunk_metadata or {}).get("file_id")
+        hash = (chunk_metadata or {}).get("hash")
+        if file_id is None and hash is None:
+            continue
+
+        entry = entries.setdefault(
+            ("file_id", file_id) if file_id is not None else ("hash", hash),
+            {"file_id": file_id, "hash": hash, "chunk_count": 0},
+        )
+        entry["chunk_count"] += 1
+
+    if entries:
+        log.info(
+            f"Indexing {len(entries)} files of existing collection {collection_name}"
+        )
+        CollectionFiles.insert_many(collection_name, list(entries.values()))
+    return bool(entries)
+
+
 def save_docs_to_vector_db(
-    docs,
+    docs: Iterable[Document],
     collection_name,
     metadata: Optional[dict] = None,
     overwrite: bool = False,
     split: bool = True,
     add: bool = False,
+    replace_filter: Optional[dict] = None,
+    stats: Optional[dict] = None,
 ) -> bool:
-    log.info(f"save_docs_to_vector_db {docs} {collection_name}")
+    """
+    With replace_filter, the chunks matching it are an earlier version of the
+    same document: chunks whose text did not change are kept as they are,
+    only new chunks are embedded and removed ones deleted. The number of
+    added, reused and removed chunks is written to `stats` when given.
+    """
+    log.info(f"save_docs_to_vector_db {collection_name}")
 
-    # Check if entries with the same hash (metadata.hash) already exist
-    if metadata and "hash" in metadata:
+    embedding_config = format_embedding_config(
+        app.state.config.RAG_EMBEDDING_ENGINE,
+        app.state.config.RAG_EMBEDDING_MODEL,
+    )
+
+    # chunk_hash -> (id, metadata) of the stored chunks that can be reused
+    reusable_chunks = {}
+    replaced_ids = set()
+    stored_vectors = {}
+
+    if replace_filter:
         result = VECTOR_DB_CLIENT.query(
-            collection_name=collection_name,
-            filter={"hash": metadata["hash"]},
+            collection_name=collection_name, filter=replace_filter
         )
 
         if result is not None:
-            existing_doc_ids = result.ids[0]
-            if existing_doc_ids:
-                log.info(f"Document with hash {metadata['hash']} already exists")
-                raise ValueError(ERROR_MESSAGES.DUPLICATE_CONTENT)
+            candidates = []
+            for id, text, chunk_metadata in zip(
+                result.ids[0], result.documents[0], result.metadatas[0]
+            ):
+                replaced_ids.add(id)
+
+                # Vectors of another embedding model can not be reused
+                chunk_metadata = chunk_metadata or {}
+                if chunk_metadata.get("embedding_config") != embedding_config:
+                    continue
+                candidates.append((id, text, chunk_metadata))
+
+            # Reused chunks are written back with the metadata of the new
+            # version, so they need their stored vectors
+            if candidates:
+                stored_vectors = VECTOR_DB_CLIENT.get_vectors(
+                    collection_name=collection_name,
+                    ids=[id for id, _, _ in candidates],
+                )
 
-    if split:
-        if app.state.config.TEXT_SPLITTER in ["", "character"]:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=app.state.config.CHUNK_SIZE,
-                chunk_overlap=app.state.config.CHUNK_OVERLAP,
-                add_start_index=True,
-            )
-        elif app.state.config.TEXT_SPLITTER == "token":
-            log.info(
-                f"Using token text splitter: {app.state.config.TIKTOKEN_ENCODING_NAME}"
-            )
+            for id, text, chunk_metadata in candidates:
+                if id not in stored_vectors:
+                    continue
+                chunk_hash = chunk_metadata.get(
+                    "chunk_hash"
+                ) or calculate_sha256_string(text or "")
+                reusable_chunks.setdefault(chunk_hash, []).append((id, chunk_metadata))
 
-            tiktoken.get_encoding(str(app.state.config.TIKTOKEN_ENCODING_NAME))
-            text_splitter = TokenTextSplitter(
-                encoding_name=str(app.state.config.TIKTOKEN_ENCODING_NAME),
-                chunk_size=app.state.config.CHUNK_SIZE,
-                chunk_overlap=app.state.config.CHUNK_OVERLAP,
-                add_start_index=True,
-            )
-        else:
+    # Check if entries with the same hash (metadata.hash) already exist, other
+    # than the earlier version being replaced
+    if metadata and "hash" in metadata:
+        if index_collection(collection_name) and CollectionFiles.has_hash(
+            collection_name,
+            metadata["hash"],
+            exclude_file_id=(replace_filter or {}).get("file_id"),
+        ):
+            log.info(f"Document with hash {metadata['hash']} already exists")
+            raise ValueError(ERROR_MESSAGES.DUPLICATE_CONTENT)
+
+    if split:
+        if app.state.config.TEXT_SPLITTER not in ["", "character", "token"]:
             raise ValueError(ERROR_MESSAGES.DEFAULT("Invalid text splitter"))
 
-        docs = text_splitter.split_documents(docs)
+        text_splitter = get_text_splitter(
+            app.state.config.TEXT_SPLITTER,
+            app.state.config.CHUNK_SIZE,
+            app.state.config.CHUNK_OVERLAP,
+            str(app.state.config.TIKTOKEN_ENCODING_NAME),
+        )
+
+        # Documents are split one at a time as they are pulled by the embedder
+        chunks = (
+            chunk for doc in docs for chunk in text_splitter.split_documents([doc])
+        )
+    else:
+        chunks = iter(docs)
 
-    if len(docs) == 0:
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        if replaced_ids:
+            # The document was emptied, do not leave its old chunks behind
+            delete_chunks(collection_name, filter=replace_filter)
         raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+    chunks = itertools.chain([first_chunk], chunks)
 
-    texts = [doc.page_content for doc in docs]
-    metadatas = [
-        {
+    def get_metadata(doc: Document) -> dict:
+        doc_metadata = {
             **doc.metadata,
             **(metadata if metadata else {}),
-            "embedding_config": json.dumps(
-                {
-                    "engine": app.state.config.RAG_EMBEDDING_ENGINE,
-                    "model": app.state.config.RAG_EMBEDDING_MODEL,
-                }
-            ),
+            "embedding_config": embedding_config,
+            "chunk_hash": calculate_sha256_string(doc.page_content),
         }
-        for doc in docs
-    ]
 
-    # ChromaDB does not like datetime formats
-    # for meta-data so convert them to string.
-    for metadata in metadatas:
-        for key, value in metadata.items():
+        # ChromaDB does not like datetime formats
+        # for meta-data so convert them to string.
+        for key, value in doc_metadata.items():
             if isinstance(value, datetime):
-                metadata[key] = str(value)
+                doc_metadata[key] = str(value)
+        return doc_metadata
 
     try:
+        # Legacy collections without a BM25 index get one built lazily from the
+        # vector DB on their first hybrid query, so only extend existing ones.
+        update_bm25_index = True
+
         if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
             log.info(f"collection {collection_name} already exists")
 
             if overwrite:
-                VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                delete_collection(collection_name)
                 log.info(f"deleting existing collection {collection_name}")
-            elif add is False:
+            elif add is False and not replace_filter:
                 log.info(
                     f"collection {collection_name} already exists, overwrite is False and add is False"
                 )
                 return True
+            else:
+                update_bm25_index = BM25_INDEX.has_index(collection_name)
 
         log.info(f"adding to collection {collection_name}")
         embedding_function = get_embedding_function(
@@ -732,24 +942,133 @@ def save_docs_to_vector_db(
             app.state.config.RAG_EMBEDDING_BATCH_SIZE,
         )
 
-        embeddings = embedding_function(
-            list(map(lambda x: x.replace("\n", " "), texts)), is_query=False
-        )
+        if app.state.config.RAG_EMBEDDING_ENGINE in ["ollama", "openai"]:
+            batch_size = app.state.config.RAG_EMBEDDING_BATCH_SIZE
+            concurrency = RAG_EMBEDDING_CONCURRENCY
+        elif app.state.config.RAG_EMBEDDING_ENGINE == "":
+            # The local model batches internally and gains nothing from
+            # concurrent calls, batches only bound the memory held at once
+            batch_size = 256
+            concurrency = 1
+        else:
+            batch_size = 256
+            concurrency = RAG_EMBEDDING_CONCURRENCY
+
+        reused_ids = []
+        # Reused chunks whose metadata (hash, name, start_index, ...) changed
+        updated_items = []
+
+        def get_new_chunks():
+            for chunk in chunks:
+                chunk_hash = calculate_sha256_string(chunk.page_content)
+                if reusable_chunks.get(chunk_hash):
+                    id, stored_metadata = reusable_chunks[chunk_hash].pop()
+                    reused_ids.append(id)
+
+                    chunk_metadata = get_metadata(chunk)
+                    if chunk_metadata != stored_metadata:
+                        updated_items.append(
+                            {
+                                "id": id,
+                                "text": chunk.page_content,
+                                "vector": stored_vectors[id],
+                                "metadata": chunk_metadata,
+                            }
+                        )
+                    continue
+                yield chunk
+
+        def get_batches():
+            for batch in batched(get_new_chunks(), max(int(batch_size or 1), 1)):
+                yield batch, [doc.page_content.replace("\n", " ") for doc in batch]
+
+        # Chunks are pulled from the loader and splitter only as fast as the
+        # embedder consumes them, and each batch is inserted as soon as it is
+        # embedded while the next ones are still in flight
+        ids = []
+        bm25_items = []
+
+        def flush_bm25_items():
+            if update_bm25_index and bm25_items:
+                BM25_INDEX.insert(
+                    collection_name,
+                    ids=[item["id"] for item in bm25_items],
+                    texts=[item["text"] for item in bm25_items],
+                    metadatas=[item["metadata"] for item in bm25_items],
+                )
+            bm25_items.clear()
 
-        items = [
-            {
-                "id": str(uuid.uuid4()),
-                "text": text,
-                "vector": embeddings[idx],
-                "metadata": metadatas[idx],
-            }
-            for idx, text in enumerate(texts)
-        ]
-
-        VECTOR_DB_CLIENT.insert(
-            collection_name=collection_name,
-            items=items,
-        )
+        try:
+            for batch, embeddings in embed_batches_pipelined(
+                embedding_function, get_batches(), concurrency=concurrency
+            ):
+                items = [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "text": doc.page_content,
+                        "vector": embedding,
+                        "metadata": get_metadata(doc),
+                    }
+                    for doc, embedding in zip(batch, embeddings)
+                ]
+
+                VECTOR_DB_CLIENT.insert(
+                    collection_name=collection_name,
+                    items=items,
+                )
+                ids.extend(item["id"] for item in items)
+
+                bm25_items.extend(items)
+                if len(bm25_items) >= BM25_INSERT_BATCH_SIZE:
+                    flush_bm25_items()
+
+            flush_bm25_items()
+
+            for batch in batched(updated_items, BM25_INSERT_BATCH_SIZE):
+                VECTOR_DB_CLIENT.upsert(
+                    collection_name=collection_name, items=list(batch)
+                )
+                if update_bm25_index:
+                    BM25_INDEX.delete(
+                        collection_name, ids=[item["id"] for item in batch]
+                    )
+                    bm25_items.extend(batch)
+                    flush_bm25_items()
+
+            # Stored chunks that are not part of the new version
+            removed_ids = list(replaced_ids - set(reused_ids))
+            if removed_ids:
+                delete_chunks(collection_name, removed_ids)
+        except Exception as e:
+            # Do not leave a partially indexed document behind, the previous
+            # version is still complete at this point
+            if ids:
+                delete_chunks(collection_name, ids)
+            raise e
+        finally:
+            QUERY_CACHE.bump(collection_name)
+
+        if metadata and (metadata.get("file_id") or metadata.get("hash")):
+            CollectionFiles.upsert(
+                collection_name,
+                file_id=metadata.get("file_id"),
+                hash=metadata.get("hash"),
+                chunk_count=len(ids) + len(reused_ids),
+                increment=not replace_filter,
+            )
+
+        if replace_filter:
+            log.info(
+                f"{collection_name}: added {len(ids)} chunks, reused {len(reused_ids)}, removed {len(removed_ids)}"
+            )
+        if stats is not None:
+            stats.update(
+                {
+                    "added": len(ids),
+                    "reused": len(reused_ids),
+                    "removed": len(removed_ids),
+                }
+            )
 
         return True
     except Exception as e:
@@ -768,6 +1087,21 @@ def process_file(
     form_data: ProcessFileForm,
     user=Depends(get_verified_user),
 ):
+    return ingest_file(form_data)
+
+
+def ingest_file(
+    form_data: ProcessFileForm,
+    on_status: Optional[Callable[[str], None]] = None,
+    replace: bool = False,
+):
+    # on_status is called with "extracting" and "embedding" as the file moves
+    # through the pipeline, see apps/retrieval/ingestion/main.py. With replace,
+    # the chunks already stored for the file are updated in place, otherwise
+    # the duplicate content and existing collection checks apply.
+    on_status = on_status or (lambda status: None)
+    spool = None
+
     try:
         file = Files.get_file_by_id(form_data.file_id)
 
@@ -777,13 +1111,11 @@ def process_file(
             collection_name = f"file-{file.id}"
 
         if form_data.content:
-            # Update the content in the file
+            # Update the content in the file, it replaces the stored chunks of
+            # the file and only the chunks that changed are re-embedded by
+            # save_docs_to_vector_db
             # Usage: /files/{file_id}/data/content/update
-
-            VECTOR_DB_CLIENT.delete(
-                collection_name=f"file-{file.id}",
-                filter={"file_id": file.id},
-            )
+            replace = True
 
             docs = [
                 Document(
@@ -798,6 +1130,7 @@ def process_file(
             ]
 
             text_content = form_data.content
+            hash = calculate_sha256_string(text_content)
         elif form_data.collection_name:
             # Check if the file has already been processed and save the content
             # Usage: /knowledge/{id}/file/add, /knowledge/{id}/file/update
@@ -828,9 +1161,11 @@ def process_file(
                 ]
 
             text_content = file.data.get("content", "")
+            hash = file.hash or calculate_sha256_string(text_content)
         else:
             # Process the file and save the content
             # Usage: /files/
+            on_status("extracting")
             file_path = file.path
             if file_path:
                 file_path = Storage.get_file(file_path)
@@ -839,7 +1174,7 @@ def process_file(
                     TIKA_SERVER_URL=app.state.config.TIKA_SERVER_URL,
                     PDF_EXTRACT_IMAGES=app.state.config.PDF_EXTRACT_IMAGES,
                 )
-                docs = loader.load(
+                docs = loader.lazy_load(
                     file.filename, file.meta.get("content_type"), file_path
                 )
             else:
@@ -854,7 +1189,19 @@ def process_file(
                         },
                     )
                 ]
-            text_content = " ".join([doc.page_content for doc in docs])
+
+            # Spool the extracted documents instead of holding them in memory,
+            # they are read back lazily by the splitter and embedder
+            spool = DocumentSpool(max_content_length=RAG_FILE_CONTENT_MAX_LENGTH)
+            spool.extend(docs)
+            docs = spool
+
+            text_content = spool.content
+            hash = spool.hash
+            if spool.truncated:
+                log.info(
+                    f"Storing the first {len(text_content)} of {spool.length} characters of {file.id}"
+                )
 
         log.debug(f"text_content: {text_content}")
         Files.update_file_data_by_id(
@@ -862,10 +1209,11 @@ def process_file(
             {"content": text_content},
         )
 
-        hash = calculate_sha256_string(text_content)
         Files.update_file_hash_by_id(file.id, hash)
 
         try:
+            on_status("embedding")
+            chunks = {}
             result = save_docs_to_vector_db(
                 docs=docs,
                 collection_name=collection_name,
@@ -875,6 +1223,8 @@ def process_file(
                     "hash": hash,
                 },
                 add=(True if form_data.collection_name else False),
+                replace_filter={"file_id": file.id} if replace else None,
+                stats=chunks,
             )
 
             if result:
@@ -890,6 +1240,7 @@ def process_file(
                     "collection_name": collection_name,
                     "filename": file.meta.get("name", file.filename),
                     "content": text_content,
+                    "chunks": chunks,
                 }
         except Exception as e:
             raise e
@@ -905,6 +1256,9 @@ def process_file(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=str(e),
             )
+    finally:
+        if spool is not None:
+            spool.close()
 
 
 class ProcessTextForm(BaseModel):
@@ -985,6 +1339,63 @@ def process_youtube_video(form_data: ProcessUrlForm, user=Depends(get_verified_u
         )
 
 
+def save_web_docs_to_vector_db(docs: list[Document], collection_name: str) -> dict:
+    """
+    Refresh a collection built from web pages. Pages are compared by the hash
+    of their content with the previous refresh (see WEB_COLLECTIONS): only new
+    and changed pages are embedded, pages that are gone are deleted, the
+    vectors of unchanged pages are kept.
+    """
+    pages = {}
+    for doc in docs:
+        pages.setdefault(doc.metadata.get("source"), []).append(doc)
+
+    if not pages:
+        raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+
+    hashes = {
+        url: calculate_sha256_string(" ".join(doc.page_content for doc in url_docs))
+        for url, url_docs in pages.items()
+    }
+
+    stored = {}
+    if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
+        stored = WEB_COLLECTIONS.get_urls(collection_name)
+
+    changed = [url for url in pages if stored.get(url) != hashes[url]]
+    removed = [url for url in stored if url not in pages or url in changed]
+
+    for url in removed:
+        delete_chunks(collection_name, filter={"source": url})
+
+    if changed:
+        fetched_at = int(time.time())
+        for url in changed:
+            for doc in pages[url]:
+                doc.metadata["content_hash"] = hashes[url]
+                doc.metadata["fetched_at"] = fetched_at
+
+        # Collections without freshness records predate them, rebuild those
+        if not save_docs_to_vector_db(
+            [doc for url in changed for doc in pages[url]],
+            collection_name,
+            overwrite=not stored,
+            add=True,
+        ):
+            WEB_COLLECTIONS.delete(collection_name)
+            raise ValueError(ERROR_MESSAGES.DEFAULT("Failed to save web pages"))
+
+    WEB_COLLECTIONS.set_urls(collection_name, hashes)
+
+    stats = {
+        "added": len(changed),
+        "reused": len(pages) - len(changed),
+        "removed": len(set(removed) - set(changed)),
+    }
+    log.info(f"Refreshed web collection {collection_name}: {stats}")
+    return stats
+
+
 @app.post("/process/web")
 def process_web(form_data: ProcessUrlForm, user=Depends(get_verified_user)):
     try:
@@ -1000,7 +1411,14 @@ def process_web(form_data: ProcessUrlForm, user=Depends(get_verified_user)):
         docs = loader.load()
         content = " ".join([doc.page_content for doc in docs])
         log.debug(f"text_content: {content}")
-        save_docs_to_vector_db(docs, collection_name, overwrite=True)
+
+        # The page itself comes from the web page cache, the vectors of a
+        # recently processed URL are reused as is
+        if not (
+            WEB_COLLECTIONS.is_fresh(collection_name)
+            and VECTOR_DB_CLIENT.has_collection(collection_name=collection_name)
+        ):
+            save_web_docs_to_vector_db(docs, collection_name)
 
         return {
             "status": True,
@@ -1024,6 +1442,57 @@ def process_web(form_data: ProcessUrlForm, user=Depends(get_verified_user)):
 
 
 def search_web(engine: str, query: str) -> list[SearchResult]:
+    """
+    Search the web with `engine`, serving repeated searches from
+    SEARCH_RESULT_CACHE. When RAG_WEB_SEARCH_RACE_ENGINE is set, it is queried
+    at the same time and the first engine to return results wins.
+    """
+
+    def get_key(engine):
+        return SEARCH_RESULT_CACHE.key(
+            engine,
+            query,
+            app.state.config.RAG_WEB_SEARCH_RESULT_COUNT,
+            app.state.config.RAG_WEB_SEARCH_DOMAIN_FILTER_LIST,
+        )
+
+    def search(engine):
+        return SEARCH_RESULT_CACHE.get_or_compute(
+            get_key(engine), lambda: search_web_engine(engine, query)
+        )
+
+    race_engine = RAG_WEB_SEARCH_RACE_ENGINE
+    if not race_engine or race_engine == engine:
+        return search(engine)
+
+    # Do not pay for a race when either engine already has the answer
+    for name in [engine, race_engine]:
+        results = SEARCH_RESULT_CACHE.get(get_key(name))
+        if results is not None:
+            return results
+
+    futures = {
+        SEARCH_EXECUTOR.submit(search, name): name for name in [engine, race_engine]
+    }
+    errors = []
+    for future in as_completed(futures):
+        try:
+            results = future.result()
+        except Exception as e:
+            log.warning(f"Web search with {futures[future]} failed: {e}")
+            errors.append(e)
+            continue
+
+        if results:
+            log.debug(f"Web search race won by {futures[future]}")
+            return results
+
+    if errors:
+        raise errors[0]
+    return []
+
+
+def search_web_engine(engine: str, query: str) -> list[SearchResult]:
     """Search the web using a search engine and return the results as a list of SearchResult objects.
     Will look for a search engine API key in environment variables in the following order:
     - SEARXNG_QUERY_URL
@@ -1140,6 +1609,20 @@ def search_web(engine: str, query: str) -> list[SearchResult]:
 
 @app.post("/process/web/search")
 def process_web_search(form_data: SearchForm, user=Depends(get_verified_user)):
+    collection_name = form_data.collection_name
+    if collection_name == "":
+        collection_name = calculate_sha256_string(form_data.query)[:63]
+
+    # The same query was searched recently, reuse its collection
+    if WEB_COLLECTIONS.is_fresh(collection_name) and VECTOR_DB_CLIENT.has_collection(
+        collection_name=collection_name
+    ):
+        return {
+            "status": True,
+            "collection_name": collection_name,
+            "filenames": list(WEB_COLLECTIONS.get_urls(collection_name)),
+        }
+
     try:
         logging.info(
             f"trying to web search with {app.state.config.RAG_WEB_SEARCH_ENGINE, form_data.query}"
@@ -1157,16 +1640,16 @@ def process_web_search(form_data: SearchForm, user=Depends(get_verified_user)):
         )
 
     try:
-        collection_name = form_data.collection_name
-        if collection_name == "":
-            collection_name = calculate_sha256_string(form_data.query)[:63]
-
         urls = [result.link for result in web_results]
 
-        loader = get_web_loader(urls)
+        loader = get_web_loader(
+            urls,
+            verify_ssl=app.state.config.ENABLE_RAG_WEB_LOADER_SSL_VERIFICATION,
+            requests_per_second=app.state.config.RAG_WEB_SEARCH_CONCURRENT_REQUESTS,
+        )
         docs = loader.load()
 
-        save_docs_to_vector_db(docs, collection_name, overwrite=True)
+        save_web_docs_to_vector_db(docs, collection_name)
 
         return {
             "status": True,
@@ -1200,19 +1683,33 @@ def query_doc_handler(
             return query_doc_with_hybrid_search(
                 collection_name=form_data.collection_name,
                 query=form_data.query,
-                embedding_function=lambda query: get_query_embeddings(query, app.state.config.RAG_EMBEDDING_ENGINE, app.state.config.EMBEDDING_FUNCTION, is_query=True),
+                embedding_function=lambda query: get_query_embeddings(
+                    query,
+                    app.state.config.RAG_EMBEDDING_ENGINE,
+                    app.state.EMBEDDING_FUNCTION,
+                    is_query=True,
+                ),
                 k=form_data.k if form_data.k else app.state.config.TOP_K,
                 reranking_function=app.state.sentence_transformer_rf,
                 r=(
                     form_data.r if form_data.r else app.state.config.RELEVANCE_THRESHOLD
                 ),
+                embedding_config=format_embedding_config(
+                    app.state.config.RAG_EMBEDDING_ENGINE,
+                    app.state.config.RAG_EMBEDDING_MODEL,
+                ),
             )
         else:
             # Generate embedding only for non-hybrid search
             # The is_query parameter allows the EMBEDDING_FUNCTION to be customized for NVIDIAEmbeddings            
             return query_doc(
                 collection_name=form_data.collection_name,
-                query=get_query_embeddings(form_data.query, app.state.config.RAG_EMBEDDING_ENGINE, app.state.config.EMBEDDING_FUNCTION, is_query=True),                  
+                query_embedding=get_query_embeddings(
+                    form_data.query,
+                    app.state.config.RAG_EMBEDDING_ENGINE,
+                    app.state.EMBEDDING_FUNCTION,
+                    is_query=True,
+                ),
                 k=form_data.k if form_data.k else app.state.config.TOP_K,
             )
     except Exception as e:
@@ -1241,19 +1738,33 @@ def query_collection_handler(
             return query_collection_with_hybrid_search(
                 collection_names=form_data.collection_names,
                 query=form_data.query,
-                embedding_function=lambda query: get_query_embeddings(query, app.state.config.RAG_EMBEDDING_ENGINE, app.state.config.EMBEDDING_FUNCTION, is_query=True),                
+                embedding_function=lambda query: get_query_embeddings(
+                    query,
+                    app.state.config.RAG_EMBEDDING_ENGINE,
+                    app.state.EMBEDDING_FUNCTION,
+                    is_query=True,
+                ),
                 k=form_data.k if form_data.k else app.state.config.TOP_K,
                 reranking_function=app.state.sentence_transformer_rf,
                 r=(
                     form_data.r if form_data.r else app.state.config.RELEVANCE_THRESHOLD
                 ),
+                embedding_config=format_embedding_config(
+                    app.state.config.RAG_EMBEDDING_ENGINE,
+                    app.state.config.RAG_EMBEDDING_MODEL,
+                ),
             )
         else:
             # Generate embedding only for non-hybrid search
             # The is_query parameter allows the EMBEDDING_FUNCTION to be customized for NVIDIAEmbeddings            
             return query_collection(
                 collection_names=form_data.collection_names,
-                query=get_query_embeddings(form_data.query, app.state.config.RAG_EMBEDDING_ENGINE, app.state.config.EMBEDDING_FUNCTION, is_query=True),                
+                query_vectors=get_query_embeddings(
+                    form_data.query,
+                    app.state.config.RAG_EMBEDDING_ENGINE,
+                    app.state.EMBEDDING_FUNCTION,
+                    is_query=True,
+                ),
                 k=form_data.k if form_data.k else app.state.config.TOP_K,
             )
 
@@ -1280,14 +1791,14 @@ class DeleteForm(BaseModel):
 @app.post("/delete")
 def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin_user)):
     try:
-        if VECTOR_DB_CLIENT.has_collection(collection_name=form_data.collection_name):
+        if index_collection(form_data.collection_name):
             file = Files.get_file_by_id(form_data.file_id)
             hash = file.hash
 
-            VECTOR_DB_CLIENT.delete(
-                collection_name=form_data.collection_name,
-                metadata={"hash": hash},
-            )
+            # Nothing to delete from the vector DB when the index has no chunk
+            # with this hash
+            if CollectionFiles.has_hash(form_data.collection_name, hash):
+                delete_chunks(form_data.collection_name, filter={"hash": hash})
             return {"status": True}
         else:
             return {"status": False}
@@ -1299,6 +1810,9 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
 @app.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user)):
     VECTOR_DB_CLIENT.reset()
+    BM25_INDEX.reset()
+    CollectionFiles.delete_all()
+    QUERY_CACHE.bump_all()
     Knowledges.delete_all_knowledge()
 
 
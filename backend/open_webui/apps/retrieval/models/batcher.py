@@ -0,0 +1,104 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class RerankBatcher:
+    """
+    Coalesces concurrent predict() calls on a reranking model into batches.
+
+    A single thread owns the model. Every caller enqueues its (query, document)
+    pairs and blocks on a future; whatever has queued up while the model was
+    busy is scored in one call, up to max_batch_size pairs. Models exposing
+    predict_batch (ColBERT) get one list of pairs per request, as their
+    scores are normalized per query, other models (CrossEncoder) get the
+    concatenated pairs.
+    """
+
+    def __init__(self, model, max_batch_size: int = 256, max_wait: float = 0.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="rerank-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def predict(self, sentences):
+        sentences = list(sentences)
+        if not sentences:
+            return np.array([], dtype=np.float32)
+
+        future = Future()
+        self._queue.put((sentences, future))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            try:
+                timeout = deadline - time.monotonic()
+                item = (
+                    self._queue.get(timeout=timeout)
+                    if timeout > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+
+            if item is None:
+                # Closing, finish this batch first
+                self._queue.put(None)
+                break
+
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = self._collect(item)
+            try:
+                if hasattr(self.model, "predict_batch"):
+                    results = self.model.predict_batch(
+                        [sentences for sentences, _ in batch]
+                    )
+                else:
+                    scores = np.asarray(
+                        self.model.predict(
+                            [pair for sentences, _ in batch for pair in sentences]
+                        )
+                    )
+                    splits = np.cumsum([len(sentences) for sentences, _ in batch])
+                    results = np.split(scores, splits[:-1])
+
+                if len(batch) > 1:
+                    log.debug(f"reranked {len(batch)} requests in one batch")
+
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
@@ -1,4 +1,8 @@
+import hashlib
 import os
+import threading
+from collections import OrderedDict
+
 import torch
 import numpy as np
 from colbert.infra import ColBERTConfig
@@ -27,7 +31,12 @@ class ColBERT:
             name,
             colbert_config=ColBERTConfig(model_name=name),
         ).to(self.device)
-        pass
+
+        # Token embeddings of already encoded chunks, keyed by the sha256 of
+        # the chunk text and stored unpadded on the CPU
+        self.cache_size = kwargs.get("cache_size", 10000)
+        self._doc_cache: OrderedDict[str, torch.Tensor] = OrderedDict()
+        self._doc_cache_lock = threading.Lock()
 
     def calculate_similarity_scores(self, query_embeddings, document_embeddings):
 
@@ -62,20 +71,62 @@ class ColBERT:
 
         return normalized_scores.detach().cpu().numpy().astype(np.float32)
 
-    def predict(self, sentences):
-
-        query = sentences[0][0]
-        docs = [i[1] for i in sentences]
-
-        # Embedding the documents
-        embedded_docs = self.ckpt.docFromText(docs, bsize=32)[0]
-        # Embedding the queries
-        embedded_queries = self.ckpt.queryFromText([query], bsize=32)
-        embedded_query = embedded_queries[0]
-
-        # Calculate retrieval scores for the query against all documents
-        scores = self.calculate_similarity_scores(
-            embedded_query.unsqueeze(0), embedded_docs
-        )
+    def embed_documents(self, docs: list[str]) -> list[torch.Tensor]:
+        keys = [hashlib.sha256(doc.encode("utf-8")).hexdigest() for doc in docs]
+
+        embeddings = {}
+        with self._doc_cache_lock:
+            for key in keys:
+                if key in self._doc_cache:
+                    self._doc_cache.move_to_end(key)
+                    embeddings[key] = self._doc_cache[key]
+
+        missing = {}
+        for key, doc in zip(keys, docs):
+            if key not in embeddings:
+                missing[key] = doc
+
+        if missing:
+            embedded_docs = self.ckpt.docFromText(list(missing.values()), bsize=32)[0]
+            for key, embedded_doc in zip(missing.keys(), embedded_docs):
+                # Drop the zero padding, it is added back when scoring
+                tokens = embedded_doc.abs().sum(dim=-1).nonzero()
+                length = int(tokens.max()) + 1 if len(tokens) else 1
+                embeddings[key] = embedded_doc[:length].detach().cpu()
+
+            with self._doc_cache_lock:
+                for key in missing.keys():
+                    self._doc_cache[key] = embeddings[key]
+                    self._doc_cache.move_to_end(key)
+                while len(self._doc_cache) > self.cache_size:
+                    self._doc_cache.popitem(last=False)
+
+        return [embeddings[key] for key in keys]
+
+    def predict_batch(self, requests: list[list[tuple[str, str]]]) -> list[np.ndarray]:
+        # Score several (query, docs) requests with one query encoding pass
+        # and one document encoding pass for the uncached chunks
+        queries = [sentences[0][0] for sentences in requests]
+        docs = [[i[1] for i in sentences] for sentences in requests]
+
+        embedded_docs = self.embed_documents([doc for group in docs for doc in group])
+        embedded_queries = self.ckpt.queryFromText(queries, bsize=32)
+
+        results = []
+        offset = 0
+        for idx, group in enumerate(docs):
+            group_docs = embedded_docs[offset : offset + len(group)]
+            offset += len(group)
+
+            padded_docs = torch.nn.utils.rnn.pad_sequence(group_docs, batch_first=True)
+
+            # Calculate retrieval scores for the query against all documents
+            results.append(
+                self.calculate_similarity_scores(
+                    embedded_queries[idx].unsqueeze(0), padded_docs
+                )
+            )
+        return results
 
-        return scores
+    def predict(self, sentences):
+        return self.predict_batch([sentences])[0]
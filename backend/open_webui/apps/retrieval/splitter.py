@@ -0,0 +1,119 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+@lru_cache(maxsize=8)
+def get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(encoding_name)
+
+
+@lru_cache(maxsize=8)
+def get_token_char_counts(encoding_name: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per token id, the number of characters its bytes start and whether its
+    first byte continues a character started by the previous token, so that
+    the character offsets of a whole document are a cumulative sum.
+    """
+    encoding = get_encoding(encoding_name)
+    counts = np.zeros(encoding.max_token_value + 1, dtype=np.int64)
+    continues = np.zeros(encoding.max_token_value + 1, dtype=np.int64)
+    for token in range(encoding.max_token_value + 1):
+        try:
+            token_bytes = encoding.decode_single_token_bytes(token)
+        except KeyError:
+            continue
+        counts[token] = sum(1 for byte in token_bytes if not 0x80 <= byte < 0xC0)
+        continues[token] = bool(token_bytes) and 0x80 <= token_bytes[0] < 0xC0
+    return counts, continues
+
+
+class TokenSplitter:
+    """
+    Splits text into windows of `chunk_size` tokens overlapping by
+    `chunk_overlap` tokens, like LangChain's TokenTextSplitter.
+
+    A document is tokenized once and its chunks are sliced out of the
+    original text by character offsets computed for all tokens at once,
+    instead of decoding every chunk and searching for it in the text.
+    Chunks split inside a multi-byte character keep the whole character.
+    """
+
+    def __init__(self, encoding_name: str, chunk_size: int, chunk_overlap: int):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+
+        self.encoding_name = encoding_name
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_offsets(self, text: str) -> list[tuple[int, int]]:
+        """Returns the (start, end) character offsets of the chunks of `text`."""
+        encoding = get_encoding(self.encoding_name)
+        tokens = np.asarray(encoding.encode_ordinary(text), dtype=np.int64)
+        if len(tokens) == 0:
+            return []
+
+        counts, continues = get_token_char_counts(self.encoding_name)
+        token_counts = counts[tokens]
+        offsets = np.empty(len(tokens) + 1, dtype=np.int64)
+        offsets[0] = 0
+        np.cumsum(token_counts, out=offsets[1:])
+        offsets[:-1] -= continues[tokens]
+        offsets = np.maximum(offsets, 0)
+        offsets[-1] = len(text)
+
+        step = self.chunk_size - self.chunk_overlap
+        starts = np.arange(0, max(len(tokens) - self.chunk_overlap, 1), step)
+        ends = np.minimum(starts + self.chunk_size, len(tokens))
+        # The last window already reaching the end of the text is the last chunk
+        last = int(np.argmax(ends == len(tokens)))
+        return list(
+            zip(
+                offsets[starts[: last + 1]].tolist(), offsets[ends[: last + 1]].tolist()
+            )
+        )
+
+    def split_text(self, text: str) -> list[str]:
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def split_documents(self, documents: list[Document]) -> list[Document]:
+        chunks = []
+        for doc in documents:
+            for start, end in self.split_offsets(doc.page_content):
+                chunks.append(
+                    Document(
+                        page_content=doc.page_content[start:end],
+                        metadata={**doc.metadata, "start_index": start},
+                    )
+                )
+        return chunks
+
+
+@lru_cache(maxsize=16)
+def get_text_splitter(
+    text_splitter: str, chunk_size: int, chunk_overlap: int, encoding_name: str
+):
+    """Splitters hold no state between calls, one is kept per configuration."""
+    if text_splitter in ["", "character"]:
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            add_start_index=True,
+        )
+    elif text_splitter == "token":
+        log.info(f"Using token text splitter: {encoding_name}")
+        return TokenSplitter(encoding_name, chunk_size, chunk_overlap)
+    raise ValueError(f"Invalid text splitter {text_splitter}")
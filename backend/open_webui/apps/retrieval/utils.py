@@ -1,13 +1,17 @@
+import hashlib
+import heapq
+import json
 import logging
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Union
 
+import numpy as np
 import requests
 
 from huggingface_hub import snapshot_download
 from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 from langchain_nvidia_ai_endpoints import ChatNVIDIA, NVIDIAEmbeddings
 
@@ -18,15 +22,30 @@ from open_webui.apps.ollama.main import (
     generate_ollama_batch_embeddings,
 )
 from open_webui.apps.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.apps.retrieval.bm25.main import BM25_INDEX
+from open_webui.apps.retrieval.cache import QUERY_CACHE, normalize_query
+from open_webui.apps.retrieval.embeddings.cache import get_cached_embedding_function
 from open_webui.utils.misc import get_last_user_message
 
 from open_webui.env import SRC_LOG_LEVELS
-from open_webui.config import DEFAULT_RAG_TEMPLATE
+from open_webui.config import (
+    DEFAULT_RAG_TEMPLATE,
+    ENABLE_RAG_EMBEDDING_CACHE,
+    RAG_RETRIEVAL_MAX_WORKERS,
+)
 
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
+# Keep-alive connections to the embedding API, shared by the embedding workers
+EMBEDDING_SESSION = requests.Session()
+
+# Shared by every request, bounds the number of concurrent vector DB searches
+RETRIEVAL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=RAG_RETRIEVAL_MAX_WORKERS, thread_name_prefix="retrieval"
+)
+
 
 from typing import Any
 
@@ -59,12 +78,51 @@ class VectorSearchRetriever(BaseRetriever):
         for idx in range(len(ids)):
             results.append(
                 Document(
+                    id=ids[idx],
                     metadata=metadatas[idx],
                     page_content=documents[idx],
                 )
             )
         return results
 
+
+class BM25IndexRetriever(BaseRetriever):
+    collection_name: Any
+    top_k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        return [
+            Document(id=id, metadata=metadata, page_content=text)
+            for id, text, metadata, _ in BM25_INDEX.search(
+                self.collection_name, query, self.top_k
+            )
+        ]
+
+
+def ensure_bm25_index(collection_name: str):
+    # Collections created before the persistent BM25 index existed are
+    # indexed once from the vector DB, later writes keep it up to date.
+    if BM25_INDEX.has_index(collection_name):
+        return
+
+    result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+    if result is None or not result.ids or not result.ids[0]:
+        raise ValueError(f"Collection {collection_name} is empty")
+
+    log.info(f"building bm25 index for collection {collection_name}")
+    BM25_INDEX.insert(
+        collection_name,
+        ids=result.ids[0],
+        texts=result.documents[0],
+        metadatas=result.metadatas[0],
+    )
+
+
 # This function allows a customized embedding_function that accomadates NVIDIAEmbeddings
 def get_query_embeddings(query: str, embedding_engine: str = "", embedding_function=None, is_query: bool = False) -> list[float]:
     """Generates embeddings for a query based on the configured embedding engine."""
@@ -80,10 +138,20 @@ def query_doc(
     k: int,
 ):
     try:
-        result = VECTOR_DB_CLIENT.search(
-            collection_name=collection_name,
-            vectors=[query_embedding],
-            limit=k,
+        result = QUERY_CACHE.get_or_compute(
+            "vector",
+            [collection_name],
+            {
+                "embedding": hashlib.sha256(
+                    np.asarray(query_embedding, dtype=np.float32).tobytes()
+                ).hexdigest(),
+                "k": k,
+            },
+            lambda: VECTOR_DB_CLIENT.search(
+                collection_name=collection_name,
+                vectors=[query_embedding],
+                limit=k,
+            ),
         )
 
         log.info(f"query_doc:result {result}")
@@ -93,6 +161,12 @@ def query_doc(
         raise e
 
 
+def format_embedding_config(engine: str, model: str) -> str:
+    # Stored in the metadata of every chunk, identifies the model its vector
+    # comes from
+    return json.dumps({"engine": engine, "model": model})
+
+
 def query_doc_with_hybrid_search(
     collection_name: str,
     query: str,
@@ -100,15 +174,15 @@ def query_doc_with_hybrid_search(
     k: int,
     reranking_function,
     r: float,
+    embedding_config: Optional[str] = None,
 ) -> dict:
-    try:
-        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+    def search() -> dict:
+        ensure_bm25_index(collection_name)
 
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=result.documents[0],
-            metadatas=result.metadatas[0],
+        bm25_retriever = BM25IndexRetriever(
+            collection_name=collection_name,
+            top_k=k,
         )
-        bm25_retriever.k = k
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
@@ -120,6 +194,8 @@ def query_doc_with_hybrid_search(
             retrievers=[bm25_retriever, vector_search_retriever], weights=[0.5, 0.5]
         )
         compressor = RerankCompressor(
+            collection_name=collection_name,
+            embedding_config=embedding_config,
             embedding_function=embedding_function,
             top_n=k,
             reranking_function=reranking_function,
@@ -131,12 +207,27 @@ def query_doc_with_hybrid_search(
         )
 
         result = compression_retriever.invoke(query)
-        result = {
+        return {
             "distances": [[d.metadata.get("score") for d in result]],
             "documents": [[d.page_content for d in result]],
             "metadatas": [[d.metadata for d in result]],
         }
 
+    try:
+        # The embedding and reranking models are not part of the key, changing
+        # them bumps the version of every collection
+        result = QUERY_CACHE.get_or_compute(
+            "hybrid",
+            [collection_name],
+            {
+                "query": normalize_query(query),
+                "k": k,
+                "r": r,
+                "reranking": reranking_function is not None,
+            },
+            search,
+        )
+
         log.info(f"query_doc_with_hybrid_search:result {result}")
         return result
     except Exception as e:
@@ -146,68 +237,68 @@ def query_doc_with_hybrid_search(
 def merge_and_sort_query_results(
     query_results: list[dict], k: int, reverse: bool = False
 ) -> list[dict]:
-    # Initialize lists to store combined data
-    combined_distances = []
-    combined_documents = []
-    combined_metadatas = []
-
-    for data in query_results:
-        combined_distances.extend(data["distances"][0])
-        combined_documents.extend(data["documents"][0])
-        combined_metadatas.extend(data["metadatas"][0])
-
-    # Create a list of tuples (distance, document, metadata)
-    combined = list(zip(combined_distances, combined_documents, combined_metadatas))
-
-    # Sort the list based on distances
-    combined.sort(key=lambda x: x[0], reverse=reverse)
-
-    # We don't have anything :-(
-    if not combined:
-        sorted_distances = []
-        sorted_documents = []
-        sorted_metadatas = []
-    else:
-        # Unzip the sorted list
-        sorted_distances, sorted_documents, sorted_metadatas = zip(*combined)
+    # Lazily chain (distance, document, metadata) across all results
+    combined = (
+        item
+        for data in query_results
+        for item in zip(
+            data["distances"][0], data["documents"][0], data["metadatas"][0]
+        )
+    )
 
-        # Slicing the lists to include only k elements
-        sorted_distances = list(sorted_distances)[:k]
-        sorted_documents = list(sorted_documents)[:k]
-        sorted_metadatas = list(sorted_metadatas)[:k]
+    # Only the k best entries are needed, keep a bounded heap instead of
+    # sorting every candidate of every collection
+    select = heapq.nlargest if reverse else heapq.nsmallest
+    top = select(k, combined, key=lambda x: x[0])
 
     # Create the output dictionary
     result = {
-        "distances": [sorted_distances],
-        "documents": [sorted_documents],
-        "metadatas": [sorted_metadatas],
+        "distances": [[distance for distance, _, _ in top]],
+        "documents": [[document for _, document, _ in top]],
+        "metadatas": [[metadata for _, _, metadata in top]],
     }
 
     return result
 
 
+def map_collections(collection_names, func) -> dict:
+    """
+    Run func(collection_name) for every collection on the retrieval thread pool
+    and return {collection_name: result or raised exception}.
+    """
+    futures = {
+        collection_name: RETRIEVAL_EXECUTOR.submit(func, collection_name)
+        for collection_name in dict.fromkeys(collection_names)
+        if collection_name
+    }
+
+    results = {}
+    for collection_name, future in futures.items():
+        try:
+            results[collection_name] = future.result()
+        except Exception as e:
+            results[collection_name] = e
+    return results
+
+
 def query_collection(
     collection_names: list[str],
-    query_vectors: list[float],    
+    query_vectors: list[float],
     k: int,
 ) -> dict:
-
-    results = []    
-
-    for collection_name in collection_names:
-        if collection_name:
-            try:
-                result = query_doc(
-                    collection_name=collection_name,
-                    k=k,
-                    query_embedding=query_vectors,
-                )
-                if result is not None:
-                    results.append(result.model_dump())
-            except Exception as e:
-                log.exception(f"Error when querying the collection: {e}")
-        else:
-            pass
+    results = []
+    for collection_name, result in map_collections(
+        collection_names,
+        lambda collection_name: query_doc(
+            collection_name=collection_name,
+            k=k,
+            query_embedding=query_vectors,
+        ),
+    ).items():
+        if isinstance(result, Exception):
+            log.exception(f"Error when querying the collection: {result}")
+        elif result is not None:
+            results.append(result.model_dump())
 
     return merge_and_sort_query_results(results, k=k)
 
@@ -219,25 +310,29 @@ def query_collection_with_hybrid_search(
     k: int,
     reranking_function,
     r: float,
+    embedding_config: Optional[str] = None,
 ) -> dict:
     results = []
     error = False
-    for collection_name in collection_names:
-        try:
-            result = query_doc_with_hybrid_search(
-                collection_name=collection_name,
-                query=query,
-                embedding_function=embedding_function,
-                k=k,
-                reranking_function=reranking_function,
-                r=r,
-            )
-            results.append(result)
-        except Exception as e:
+    for collection_name, result in map_collections(
+        collection_names,
+        lambda collection_name: query_doc_with_hybrid_search(
+            collection_name=collection_name,
+            query=query,
+            embedding_function=embedding_function,
+            k=k,
+            reranking_function=reranking_function,
+            r=r,
+            embedding_config=embedding_config,
+        ),
+    ).items():
+        if isinstance(result, Exception):
             log.exception(
-                "Error when querying the collection with " f"hybrid_search: {e}"
+                "Error when querying the collection with " f"hybrid_search: {result}"
             )
             error = True
+        else:
+            results.append(result)
 
     if error:
         raise Exception(
@@ -294,9 +389,9 @@ def get_embedding_function(
     embedding_batch_size,
 ):
     if embedding_engine == "":
-        return lambda query: embedding_function.encode(query).tolist()
+        func = lambda query, is_query=False: embedding_function.encode(query).tolist()
     elif embedding_engine in ["ollama", "openai"]:
-        func = lambda query: generate_embeddings(
+        batch_func = lambda query: generate_embeddings(
             engine=embedding_engine,
             model=embedding_model,
             text=query,
@@ -313,12 +408,12 @@ def get_embedding_function(
             else:
                 return func(query)
 
-        return lambda query: generate_multiple(query, func)
+        func = lambda query, is_query=False: generate_multiple(query, batch_func)
 
     elif embedding_engine == "nvidia":
         log.info(f"Using embedding_engine: {embedding_engine}")
         # Use NVIDIAEmbedding directly through the generate_embeddings function
-        return lambda texts, is_query=False: generate_embeddings(
+        func = lambda texts, is_query=False: generate_embeddings(
                 engine="nvidia",
                 model=embedding_model,
                 text=texts,
@@ -327,6 +422,9 @@ def get_embedding_function(
     else:
         raise ValueError(f"Unsupported embedding engine: {embedding_engine}")
 
+    if ENABLE_RAG_EMBEDDING_CACHE:
+        return get_cached_embedding_function(func, embedding_engine, embedding_model)
+    return func
 
 
 def get_rag_context(
@@ -338,12 +436,14 @@ def get_rag_context(
     r,
     hybrid_search,
     embedding_engine,
+    embedding_model: Optional[str] = None,
 ):
     log.debug(f"files: {files} {messages} {embedding_function} {reranking_function}")
     query = get_last_user_message(messages)
 
     extracted_collections = []
-    relevant_contexts = []
+    # (file, context, collection_names) in the order of the files
+    entries = []
 
     for file in files:
         if file.get("context") == "full":
@@ -351,9 +451,8 @@ def get_rag_context(
                 "documents": [[file.get("file").get("data", {}).get("content")]],
                 "metadatas": [[{"file_id": file.get("id"), "name": file.get("name")}]],
             }
+            entries.append((file, context, None))
         else:
-            context = None
-
             collection_names = []
             if file.get("type") == "collection":
                 if file.get("legacy"):
@@ -373,38 +472,100 @@ def get_rag_context(
                 log.debug(f"skipping {file} as it has already been extracted")
                 continue
 
+            if file.get("type") == "text":
+                entries.append((file, file["content"], None))
+            else:
+                entries.append((file, None, collection_names))
+
+            extracted_collections.extend(collection_names)
+
+    # Every collection of every file is searched concurrently, with the query
+    # embedded once for the whole request.
+    all_collection_names = [name for _, _, names in entries if names for name in names]
+
+    hybrid_results = {}
+    vector_results = {}
+    if all_collection_names:
+        try:
+            query_embedding = get_query_embeddings(
+                query, embedding_engine, embedding_function, is_query=True
+            )
+
+            if hybrid_search:
+                hybrid_embedding_function = lambda text: (
+                    query_embedding if text == query else embedding_function(text)
+                )
+                hybrid_results = map_collections(
+                    all_collection_names,
+                    lambda collection_name: query_doc_with_hybrid_search(
+                        collection_name=collection_name,
+                        query=query,
+                        embedding_function=hybrid_embedding_function,
+                        k=k,
+                        reranking_function=reranking_function,
+                        r=r,
+                        embedding_config=(
+                            format_embedding_config(embedding_engine, embedding_model)
+                            if embedding_model is not None
+                            else None
+                        ),
+                    ),
+                )
+
+            # Files for which hybrid search failed fall back to vector search
+            vector_collection_names = [
+                name
+                for _, _, names in entries
+                if names
+                and (
+                    not hybrid_search
+                    or any(
+                        isinstance(hybrid_results[name], Exception) for name in names
+                    )
+                )
+                for name in names
+            ]
+            vector_results = map_collections(
+                vector_collection_names,
+                lambda collection_name: query_doc(
+                    collection_name=collection_name,
+                    query_embedding=query_embedding,
+                    k=k,
+                ),
+            )
+        except Exception as e:
+            log.exception(e)
+
+    relevant_contexts = []
+    for file, context, collection_names in entries:
+        if collection_names:
             try:
-                context = None
-                if file.get("type") == "text":
-                    context = file["content"]
+                results = [hybrid_results.get(name) for name in collection_names]
+                if hybrid_search and all(
+                    result is not None and not isinstance(result, Exception)
+                    for result in results
+                ):
+                    context = merge_and_sort_query_results(results, k=k, reverse=True)
                 else:
                     if hybrid_search:
-                        try:
-                            context = query_collection_with_hybrid_search(
-                                collection_names=collection_names,
-                                query=query,
-                                embedding_function=embedding_function,
-                                k=k,
-                                reranking_function=reranking_function,
-                                r=r,
-                            )
-                        except Exception as e:
-                            log.debug(
-                                "Error when using hybrid search, using"
-                                " non hybrid search as fallback."
-                            )
-
-                    if (not hybrid_search) or (context is None):
-                        context = query_collection(
-                            collection_names=collection_names,
-                            query_vectors=get_query_embeddings(query, embedding_engine, embedding_function, is_query=True),                            
-                            k=k,
+                        log.debug(
+                            "Error when using hybrid search, using"
+                            " non hybrid search as fallback."
                         )
+
+                    results = []
+                    for name in collection_names:
+                        result = vector_results.get(name)
+                        if isinstance(result, Exception):
+                            log.exception(
+                                f"Error when querying the collection: {result}"
+                            )
+                        elif result is not None:
+                            results.append(result.model_dump())
+                    context = merge_and_sort_query_results(results, k=k)
             except Exception as e:
                 log.exception(e)
 
-            extracted_collections.extend(collection_names)
-
         if context:
             if "data" in file:
                 del file["data"]
@@ -491,7 +652,7 @@ def generate_openai_batch_embeddings(
     model: str, texts: list[str], key: str, url: str = "https://api.openai.com/v1"
 ) -> Optional[list[list[float]]]:
     try:
-        r = requests.post(
+        r = EMBEDDING_SESSION.post(
             f"{url}/embeddings",
             headers={
                 "Content-Type": "application/json",
@@ -570,17 +731,62 @@ class RerankCompressor(BaseDocumentCompressor):
     top_n: int
     reranking_function: Any
     r_score: float
+    collection_name: Optional[str] = None
+    embedding_config: Optional[str] = None
 
     class Config:
         extra = "forbid"
         arbitrary_types_allowed = True
 
+    def get_document_embeddings(
+        self, documents: Sequence[Document], dimension: int
+    ) -> list:
+        # Candidates come from the vector DB (or the BM25 index, which shares
+        # its ids), so their vectors are read back instead of re-embedded.
+        # Only chunks stored with the current embedding model are reused, see
+        # format_embedding_config, the dimension check guards against bad data.
+        stored = {}
+        if self.collection_name and self.embedding_config:
+            ids = [
+                doc.id
+                for doc in documents
+                if doc.id
+                and (doc.metadata or {}).get("embedding_config")
+                == self.embedding_config
+            ]
+            if ids:
+                stored = {
+                    id: vector
+                    for id, vector in VECTOR_DB_CLIENT.get_vectors(
+                        collection_name=self.collection_name, ids=ids
+                    ).items()
+                    if len(vector) == dimension
+                }
+
+        missing = [doc for doc in documents if doc.id not in stored]
+        if missing:
+            # Same normalization as at ingestion, so the embedding cache hits
+            embeddings = self.embedding_function(
+                [doc.page_content.replace("\n", " ") for doc in missing]
+            )
+            stored = {
+                **stored,
+                **{id(doc): embedding for doc, embedding in zip(missing, embeddings)},
+            }
+
+        return [
+            stored[doc.id] if doc.id in stored else stored[id(doc)] for doc in documents
+        ]
+
     def compress_documents(
         self,
         documents: Sequence[Document],
         query: str,
         callbacks: Optional[Callbacks] = None,
     ) -> Sequence[Document]:
+        if not documents:
+            return []
+
         reranking = self.reranking_function is not None
 
         if reranking:
@@ -588,13 +794,21 @@ class RerankCompressor(BaseDocumentCompressor):
                 [(query, doc.page_content) for doc in documents]
             )
         else:
-            from sentence_transformers import util
+            query_embedding = np.asarray(
+                self.embedding_function(query), dtype=np.float32
+            )
+            document_embeddings = np.asarray(
+                self.get_document_embeddings(documents, len(query_embedding)),
+                dtype=np.float32,
+            )
 
-            query_embedding = self.embedding_function(query)
-            document_embedding = self.embedding_function(
-                [doc.page_content for doc in documents]
+            scores = (document_embeddings @ query_embedding) / (
+                np.maximum(
+                    np.linalg.norm(document_embeddings, axis=1)
+                    * np.linalg.norm(query_embedding),
+                    1e-12,
+                )
             )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
 
         docs_with_scores = list(zip(documents, scores.tolist()))
         if self.r_score:
@@ -1,14 +1,41 @@
-from open_webui.config import VECTOR_DB
+from open_webui.apps.retrieval.cache import QUERY_CACHE
+from open_webui.apps.retrieval.vector.main import VectorDBClient
+from open_webui.config import (
+    VECTOR_DB,
+    VECTOR_DB_COLLECTION_CACHE_TTL,
+    VECTOR_DB_INSERT_BATCH_SIZE,
+)
+
+# Items per insert request when VECTOR_DB_INSERT_BATCH_SIZE is not set. Chroma
+# batches by its own max batch size, the embedded NumPy store writes one
+# segment per insert.
+DEFAULT_INSERT_BATCH_SIZES = {"milvus": 1000, "qdrant": 256}
 
 if VECTOR_DB == "milvus":
     from open_webui.apps.retrieval.vector.dbs.milvus import MilvusClient
 
-    VECTOR_DB_CLIENT = MilvusClient()
+    client = MilvusClient()
 elif VECTOR_DB == "qdrant":
     from open_webui.apps.retrieval.vector.dbs.qdrant import QdrantClient
 
-    VECTOR_DB_CLIENT = QdrantClient()
+    client = QdrantClient()
+elif VECTOR_DB == "numpy":
+    from open_webui.apps.retrieval.vector.dbs.numpy_store import NumpyClient
+
+    client = NumpyClient()
 else:
     from open_webui.apps.retrieval.vector.dbs.chroma import ChromaClient
 
-    VECTOR_DB_CLIENT = ChromaClient()
+    client = ChromaClient()
+
+VECTOR_DB_CLIENT = VectorDBClient(
+    client,
+    collection_cache_ttl=VECTOR_DB_COLLECTION_CACHE_TTL,
+    insert_batch_size=(
+        VECTOR_DB_INSERT_BATCH_SIZE
+        if VECTOR_DB_INSERT_BATCH_SIZE is not None
+        else DEFAULT_INSERT_BATCH_SIZES.get(VECTOR_DB, 0)
+    ),
+    # has_collection results are invalidated through the collection versions
+    query_cache=QUERY_CACHE,
+)
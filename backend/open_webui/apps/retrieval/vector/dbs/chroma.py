@@ -37,9 +37,13 @@ class ChromaClient:
             )
 
     def has_collection(self, collection_name: str) -> bool:
-        # Check if the collection exists based on the collection name.
-        collections = self.client.list_collections()
-        return collection_name in [collection.name for collection in collections]
+        # Check if the collection exists based on the collection name, without
+        # listing every collection.
+        try:
+            self.client.get_collection(name=collection_name)
+            return True
+        except Exception:
+            return False
 
     def delete_collection(self, collection_name: str):
         # Delete the collection based on the collection name.
@@ -107,6 +111,18 @@ class ChromaClient:
             )
         return None
 
+    def get_vectors(self, collection_name: str, ids: list[str]) -> dict[str, list]:
+        # Get the stored vectors of the given ids, missing ids are left out.
+        try:
+            collection = self.client.get_collection(name=collection_name)
+            result = collection.get(ids=ids, include=["embeddings"])
+            return {
+                id: list(embedding)
+                for id, embedding in zip(result["ids"], result["embeddings"])
+            }
+        except Exception:
+            return {}
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         collection = self.client.get_or_create_collection(
@@ -163,7 +163,6 @@ class MilvusClient:
         try:
             # Loop until there are no more items to fetch or the desired limit is reached
             while remaining > 0:
-                print("remaining", remaining)
                 current_fetch = min(
                     max_limit, remaining
                 )  # Determine how many items to fetch in this iteration
@@ -190,7 +189,6 @@ class MilvusClient:
                 if results_count < current_fetch:
                     break
 
-            print(all_results)
             return self._result_to_get_result([all_results])
         except Exception as e:
             print(e)
@@ -205,6 +203,19 @@ class MilvusClient:
         )
         return self._result_to_get_result([result])
 
+    def get_vectors(self, collection_name: str, ids: list[str]) -> dict[str, list]:
+        # Get the stored vectors of the given ids, missing ids are left out.
+        collection_name = collection_name.replace("-", "_")
+        try:
+            result = self.client.get(
+                collection_name=f"{self.collection_prefix}_{collection_name}",
+                ids=ids,
+                output_fields=["vector"],
+            )
+            return {item["id"]: list(item["vector"]) for item in result}
+        except Exception:
+            return {}
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         collection_name = collection_name.replace("-", "_")
@@ -0,0 +1,721 @@
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import threading
+import uuid
+from typing import Any, Optional
+
+import numpy as np
+
+from open_webui.apps.retrieval.vector.main import VectorItem, SearchResult, GetResult
+from open_webui.config import (
+    NUMPY_VECTOR_DB_DTYPE,
+    NUMPY_VECTOR_DB_IVF_NPROBE,
+    NUMPY_VECTOR_DB_IVF_THRESHOLD,
+    NUMPY_VECTOR_DB_PATH,
+    NUMPY_VECTOR_DB_QUANTIZATION,
+    NUMPY_VECTOR_DB_RESCORE_FACTOR,
+)
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.segments import (
+    SegmentCollection,
+    collection_path,
+    matches_filter,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+# Segments are merged once a size tier holds this many of them
+MERGE_FACTOR = 4
+
+# Rewrite a collection once this fraction of its rows are tombstoned
+MAX_DELETED_RATIO = 0.3
+
+# Rows scored per matrix product, bounds the float32 copy of float16 data
+BLOCK_SIZE = 65536
+
+
+# Number of set bits of every byte value, for hamming distances
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _quantize(vectors: np.ndarray, quantization: str) -> np.ndarray:
+    # Normalized vectors lie in [-1, 1], a fixed scale keeps codes comparable
+    # across segments
+    if quantization == "int8":
+        return np.clip(np.rint(vectors * 127), -127, 127).astype(np.int8)
+    elif quantization == "binary":
+        return np.packbits(vectors > 0, axis=1)
+    raise ValueError(f"Unknown quantization {quantization}")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = 8) -> np.ndarray:
+    # Spherical k-means on a sample, vectors are already normalized
+    rng = np.random.default_rng(0)
+    sample_size = min(len(vectors), k * 64)
+    sample = np.asarray(
+        vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))],
+        dtype=np.float32,
+    )
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for idx in range(k):
+            members = sample[assignment == idx]
+            if len(members):
+                centroids[idx] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+
+    return centroids
+
+
+class NumpySegment:
+    """
+    Immutable on-disk slice of a collection.
+
+    Layout of a segment directory:
+        vectors.npy     (n, dim) normalized vectors, float32 or float16
+        codes.npy       quantized segments only, (n, dim) int8 or
+                        (n, ceil(dim / 8)) packed sign bits
+        docs.jsonl      one {"id", "text", "metadata"} object per line
+        offsets.npy     int64 byte offsets of each line in docs.jsonl (n + 1)
+        centroids.npy   IVF only, (nlist, dim) float32 list centroids
+        lists.npy       IVF only, int64 row boundaries of each list (nlist + 1)
+    Rows of IVF segments are stored grouped by list, so probing a list scans a
+    contiguous slice of the memory-mapped matrix. Quantized segments scan
+    codes.npy instead and only read the rows of vectors.npy they re-score.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+
+        self.codes = None
+        self.quantization = None
+        if os.path.exists(os.path.join(path, "codes.npy")):
+            self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+            self.quantization = "int8" if self.codes.dtype == np.int8 else "binary"
+
+        self.centroids = None
+        self.lists = None
+        if os.path.exists(os.path.join(path, "centroids.npy")):
+            self.centroids = np.load(os.path.join(path, "centroids.npy"))
+            self.lists = np.load(os.path.join(path, "lists.npy"))
+
+        self._docs_file = open(os.path.join(path, "docs.jsonl"), "rb")
+        self._docs = (
+            mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if os.path.getsize(os.path.join(path, "docs.jsonl")) > 0
+            else None
+        )
+
+        # ids and metadata are parsed once on first use, segments never change
+        self._ids: Optional[list[str]] = None
+        self._metadatas: Optional[list[Any]] = None
+        self._id_index: Optional[dict[str, int]] = None
+
+        # Searches running outside the collection lock pin the segments they
+        # read, a merge closes them once the last pin is released
+        self._pins = 0
+        self._closing = False
+        self._pin_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def pin(self):
+        with self._pin_lock:
+            self._pins += 1
+
+    def unpin(self):
+        with self._pin_lock:
+            self._pins -= 1
+            if self._closing and self._pins == 0:
+                self._close()
+
+    def close(self):
+        with self._pin_lock:
+            self._closing = True
+            if self._pins == 0:
+                self._close()
+
+    def _close(self):
+        if self._docs is not None:
+            self._docs.close()
+        self._docs_file.close()
+
+    def document(self, idx: int) -> dict:
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return json.loads(self._docs[start:end])
+
+    def _parse(self):
+        if self._ids is None:
+            docs = [self.document(idx) for idx in range(len(self))]
+            self._ids = [doc["id"] for doc in docs]
+            self._metadatas = [doc["metadata"] for doc in docs]
+
+    @property
+    def ids(self) -> list[str]:
+        self._parse()
+        return self._ids
+
+    @property
+    def metadatas(self) -> list[Any]:
+        self._parse()
+        return self._metadatas
+
+    @property
+    def id_index(self) -> dict[str, int]:
+        if self._id_index is None:
+            self._id_index = {id: idx for idx, id in enumerate(self.ids)}
+        return self._id_index
+
+    def _score_rows(self, start: int, end: int, queries: np.ndarray) -> np.ndarray:
+        # (len(queries), end - start) cosine similarities, blockwise so that
+        # float16 segments are never fully converted to float32
+        scores = np.empty((len(queries), end - start), dtype=np.float32)
+        for block in range(start, end, BLOCK_SIZE):
+            block_end = min(block + BLOCK_SIZE, end)
+            matrix = np.asarray(self.vectors[block:block_end], dtype=np.float32)
+            scores[:, block - start : block_end - start] = queries @ matrix.T
+        return scores
+
+    def _score_codes(self, start: int, end: int, query: np.ndarray) -> np.ndarray:
+        # Approximate similarities from the quantized codes, only their order
+        # matters as candidates are re-scored
+        scores = np.empty(end - start, dtype=np.float32)
+        if self.quantization == "binary":
+            query_code = _quantize(query[None, :], "binary")[0]
+        for block in range(start, end, BLOCK_SIZE):
+            block_end = min(block + BLOCK_SIZE, end)
+            codes = self.codes[block:block_end]
+            if self.quantization == "binary":
+                # Fewer differing sign bits is more similar
+                scores[block - start : block_end - start] = -POPCOUNT[
+                    np.bitwise_xor(codes, query_code)
+                ].sum(axis=1, dtype=np.int32)
+            else:
+                scores[block - start : block_end - start] = (
+                    np.asarray(codes, dtype=np.float32) @ query
+                )
+        return scores
+
+    def _score(self, start: int, end: int, query: np.ndarray) -> np.ndarray:
+        if self.codes is not None:
+            return self._score_codes(start, end, query)
+        return self._score_rows(start, end, query[None, :])[0]
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        deleted: set[int],
+        nprobe: int,
+        rescore_factor: int = 1,
+    ) -> list[list[tuple[float, int]]]:
+        """Return the best (similarity, row) pairs of the segment for each query."""
+        # Quantized segments keep more candidates for the exact re-scoring
+        candidates = k * max(rescore_factor, 1) if self.codes is not None else k
+
+        results = []
+        for query in queries:
+            if self.centroids is not None:
+                probes = np.argsort(-(self.centroids @ query))[:nprobe]
+                ranges = [
+                    (int(self.lists[probe]), int(self.lists[probe + 1]))
+                    for probe in probes
+                    if self.lists[probe + 1] > self.lists[probe]
+                ]
+                if not ranges:
+                    results.append([])
+                    continue
+                rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+                scores = np.concatenate(
+                    [self._score(start, end, query) for start, end in ranges]
+                )
+            else:
+                rows = np.arange(len(self))
+                scores = self._score(0, len(self), query)
+
+            if deleted:
+                scores[np.isin(rows, list(deleted))] = -np.inf
+
+            if len(scores) > candidates:
+                top = np.argpartition(-scores, candidates)[:candidates]
+            else:
+                top = np.arange(len(scores))
+
+            if self.codes is not None:
+                top = top[np.isfinite(scores[top])]
+                # Exact similarities of the candidates, read in row order
+                order = np.argsort(rows[top])
+                top, candidate_rows = top[order], rows[top[order]]
+                scores = scores.copy()
+                scores[top] = (
+                    np.asarray(self.vectors[candidate_rows], dtype=np.float32) @ query
+                )
+                if len(top) > k:
+                    top = top[np.argpartition(-scores[top], k)[:k]]
+
+            results.append(
+                [
+                    (float(scores[idx]), int(rows[idx]))
+                    for idx in top
+                    if np.isfinite(scores[idx])
+                ]
+            )
+        return results
+
+    @staticmethod
+    def write(
+        path: str,
+        ids: list[str],
+        texts: list[str],
+        vectors: np.ndarray,
+        metadatas: list[Any],
+        dtype: str,
+        ivf_threshold: int,
+        quantization: str = "",
+    ):
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_path)
+
+        vectors = _normalize(vectors)
+        order = np.arange(len(ids))
+
+        if ivf_threshold and len(ids) >= ivf_threshold:
+            nlist = int(min(max(math.sqrt(len(ids)), 16), 4096, len(ids)))
+            centroids = _kmeans(vectors, nlist)
+
+            assignment = np.empty(len(ids), dtype=np.int64)
+            for block in range(0, len(ids), BLOCK_SIZE):
+                assignment[block : block + BLOCK_SIZE] = np.argmax(
+                    vectors[block : block + BLOCK_SIZE] @ centroids.T, axis=1
+                )
+
+            order = np.argsort(assignment, kind="stable")
+            lists = np.zeros(nlist + 1, dtype=np.int64)
+            lists[1:] = np.cumsum(np.bincount(assignment, minlength=nlist))
+
+            np.save(os.path.join(tmp_path, "centroids.npy"), centroids)
+            np.save(os.path.join(tmp_path, "lists.npy"), lists)
+
+        np.save(os.path.join(tmp_path, "vectors.npy"), vectors[order].astype(dtype))
+        if quantization:
+            np.save(
+                os.path.join(tmp_path, "codes.npy"),
+                _quantize(vectors[order], quantization),
+            )
+
+        offsets = [0]
+        with open(os.path.join(tmp_path, "docs.jsonl"), "wb") as f:
+            for idx in order:
+                line = (
+                    json.dumps(
+                        {
+                            "id": ids[idx],
+                            "text": texts[idx],
+                            "metadata": metadatas[idx],
+                        },
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                ).encode("utf-8")
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+        np.save(
+            os.path.join(tmp_path, "offsets.npy"), np.asarray(offsets, dtype=np.int64)
+        )
+
+        os.replace(tmp_path, path)
+
+
+class NumpyCollection(SegmentCollection):
+    """
+    A collection stored as a set of immutable segments.
+
+    Inserts append a segment, deletes record tombstones in manifest.json.
+    Segments of similar size are merged (size-tiered, MERGE_FACTOR at a time)
+    and the whole collection is rewritten once too many rows are tombstoned,
+    which is also when large segments get an IVF index. See SegmentCollection
+    for the manifest and how other workers pick up writes.
+    """
+
+    def _open_segment(self, path: str) -> NumpySegment:
+        return NumpySegment(path)
+
+    def _empty_manifest(self) -> dict:
+        return {"dimension": None, "segments": [], "deleted": {}}
+
+    def _live_rows(self, segment_names: Optional[list[str]] = None):
+        for name in segment_names or list(self._segments.keys()):
+            segment = self._segments[name]
+            deleted = self._deleted.get(name, set())
+            for idx in range(len(segment)):
+                if idx not in deleted:
+                    yield name, segment, idx
+
+    ####################
+    # Writes
+    ####################
+
+    def add(self, items: list[VectorItem]):
+        if not items:
+            return
+
+        vectors = np.asarray([item["vector"] for item in items], dtype=np.float32)
+
+        with self._lock, self._write_lock():
+            manifest = self._read_manifest()
+            if manifest["dimension"] is None:
+                manifest["dimension"] = int(vectors.shape[1])
+            elif manifest["dimension"] != vectors.shape[1]:
+                raise ValueError(
+                    f"Vector dimension {vectors.shape[1]} does not match "
+                    f"the collection dimension {manifest['dimension']}"
+                )
+
+            name = f"seg-{uuid.uuid4().hex}"
+            NumpySegment.write(
+                os.path.join(self.path, name),
+                ids=[item["id"] for item in items],
+                texts=[item["text"] for item in items],
+                vectors=vectors,
+                metadatas=[item["metadata"] for item in items],
+                dtype=NUMPY_VECTOR_DB_DTYPE,
+                ivf_threshold=NUMPY_VECTOR_DB_IVF_THRESHOLD,
+                quantization=NUMPY_VECTOR_DB_QUANTIZATION,
+            )
+
+            manifest["segments"].append(name)
+            self._write_manifest(manifest)
+
+            self._load()
+            self._maybe_merge(manifest)
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        if not self.exists() or not (ids or filter):
+            return
+
+        with self._lock, self._write_lock():
+            self._load()
+            manifest = self._read_manifest()
+            ids = set(ids or [])
+
+            changed = False
+            for name, segment in self._segments.items():
+                deleted = set(manifest["deleted"].get(name, []))
+                for idx, (id, metadata) in enumerate(
+                    zip(segment.ids, segment.metadatas)
+                ):
+                    if idx in deleted:
+                        continue
+                    if (ids and id in ids) or (
+                        filter and matches_filter(metadata, filter)
+                    ):
+                        deleted.add(idx)
+                        changed = True
+                if deleted:
+                    manifest["deleted"][name] = sorted(deleted)
+
+            if not changed:
+                return
+
+            self._write_manifest(manifest)
+            self._load()
+            self._maybe_merge(manifest)
+
+    def _rewrite(self, manifest: dict, names: list[str]):
+        ids, texts, vectors, metadatas = [], [], [], []
+        for name in names:
+            segment = self._segments[name]
+            deleted = self._deleted.get(name, set())
+            live = [idx for idx in range(len(segment)) if idx not in deleted]
+            if not live:
+                continue
+
+            for idx in live:
+                doc = segment.document(idx)
+                ids.append(doc["id"])
+                texts.append(doc["text"])
+                metadatas.append(doc["metadata"])
+            vectors.append(np.asarray(segment.vectors[live], dtype=np.float32))
+
+        segments = [name for name in manifest["segments"] if name not in names]
+        if ids:
+            name = f"seg-{uuid.uuid4().hex}"
+            NumpySegment.write(
+                os.path.join(self.path, name),
+                ids=ids,
+                texts=texts,
+                vectors=np.concatenate(vectors),
+                metadatas=metadatas,
+                dtype=NUMPY_VECTOR_DB_DTYPE,
+                ivf_threshold=NUMPY_VECTOR_DB_IVF_THRESHOLD,
+                quantization=NUMPY_VECTOR_DB_QUANTIZATION,
+            )
+            segments.append(name)
+
+        self._write_manifest(
+            {
+                "dimension": manifest["dimension"],
+                "segments": segments,
+                "deleted": {
+                    name: indices
+                    for name, indices in manifest["deleted"].items()
+                    if name in segments
+                },
+            }
+        )
+        self._load()
+
+        for name in names:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _maybe_merge(self, manifest: dict):
+        total = sum(len(segment) for segment in self._segments.values())
+        deleted = sum(len(indices) for indices in manifest["deleted"].values())
+
+        if total and deleted / total > MAX_DELETED_RATIO:
+            log.info(f"rewriting {self.path} ({total} rows, {deleted} deleted)")
+            self._rewrite(manifest, list(manifest["segments"]))
+            return
+
+        # Size-tiered merging keeps the number of segments logarithmic in the
+        # collection size while rewriting each row only a few times
+        tiers: dict[int, list[str]] = {}
+        for name in manifest["segments"]:
+            size = max(len(self._segments[name]), 1)
+            tiers.setdefault(int(math.log(size, MERGE_FACTOR)), []).append(name)
+
+        for names in tiers.values():
+            if len(names) >= MERGE_FACTOR:
+                self._rewrite(manifest, names)
+                return
+
+    ####################
+    # Reads
+    ####################
+
+    def search(
+        self, vectors: list[list[float | int]], limit: int
+    ) -> list[list[tuple[float, dict]]]:
+        """Return the best (similarity, document) pairs for each vector."""
+        # Only the snapshot of the segments is taken under the lock, scoring
+        # runs concurrently with other searches and writes. The segments stay
+        # pinned until their documents are read, a merge meanwhile does not
+        # close them.
+        with self._lock:
+            self._load()
+            segments = dict(self._segments)
+            # _load replaces the tombstone sets rather than mutating them
+            deleted = self._deleted
+            for segment in segments.values():
+                segment.pin()
+
+        try:
+            queries = _normalize(vectors)
+            candidates = [[] for _ in range(len(queries))]
+            for name, segment in segments.items():
+                for query_idx, matches in enumerate(
+                    segment.search(
+                        queries,
+                        limit,
+                        deleted.get(name, set()),
+                        NUMPY_VECTOR_DB_IVF_NPROBE,
+                        NUMPY_VECTOR_DB_RESCORE_FACTOR,
+                    )
+                ):
+                    candidates[query_idx].extend(
+                        (score, name, idx) for score, idx in matches
+                    )
+
+            return [
+                [
+                    (score, segments[name].document(idx))
+                    for score, name, idx in sorted(
+                        matches, key=lambda x: x[0], reverse=True
+                    )[:limit]
+                ]
+                for matches in candidates
+            ]
+        finally:
+            for segment in segments.values():
+                segment.unpin()
+
+    def get_vectors(self, ids: list[str]) -> dict[str, list]:
+        with self._lock:
+            self._load()
+
+            ids = set(ids)
+            vectors = {}
+            for name, segment in self._segments.items():
+                deleted = self._deleted.get(name, set())
+                for id in ids.intersection(segment.id_index):
+                    idx = segment.id_index[id]
+                    if idx not in deleted:
+                        vectors[id] = np.asarray(
+                            segment.vectors[idx], dtype=np.float32
+                        ).tolist()
+            return vectors
+
+    def query(
+        self, filter: Optional[dict] = None, limit: Optional[int] = None
+    ) -> list[dict]:
+        with self._lock:
+            self._load()
+
+            docs = []
+            for name, segment, idx in self._live_rows():
+                if filter and not matches_filter(segment.metadatas[idx], filter):
+                    continue
+                docs.append(segment.document(idx))
+                if limit and len(docs) >= limit:
+                    break
+            return docs
+
+
+class NumpyClient:
+    """
+    Embedded vector store, every collection is a directory of memory-mapped
+    NumPy segments searched with brute force (or IVF for large segments)
+    cosine similarity. Distances are returned as 1 - cosine similarity, like
+    Chroma's cosine space.
+
+    With NUMPY_VECTOR_DB_QUANTIZATION set, new segments also store int8 or
+    binary codes that are scanned first, and the returned distances come from
+    re-scoring the best candidates with the full vectors.
+    """
+
+    def __init__(self, root: str = NUMPY_VECTOR_DB_PATH):
+        self.root = root
+        self._collections: dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        return collection_path(self.root, collection_name)
+
+    def _collection(self, collection_name: str) -> NumpyCollection:
+        with self._lock:
+            if collection_name not in self._collections:
+                self._collections[collection_name] = NumpyCollection(
+                    self._path(collection_name)
+                )
+            return self._collections[collection_name]
+
+    def has_collection(self, collection_name: str) -> bool:
+        # Check if the collection exists based on the collection name.
+        return self._collection(collection_name).exists()
+
+    def delete_collection(self, collection_name: str):
+        # Delete the collection based on the collection name.
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+        if collection is not None:
+            collection.close()
+        shutil.rmtree(self._path(collection_name), ignore_errors=True)
+
+    def search(
+        self, collection_name: str, vectors: list[list[float | int]], limit: int
+    ) -> Optional[SearchResult]:
+        # Search for the nearest neighbor items based on the vectors and return 'limit' number of results.
+        try:
+            collection = self._collection(collection_name)
+            if not collection.exists():
+                return None
+
+            ids, distances, documents, metadatas = [], [], [], []
+            for matches in collection.search(vectors, limit):
+                ids.append([doc["id"] for _, doc in matches])
+                distances.append([1.0 - score for score, _ in matches])
+                documents.append([doc["text"] for _, doc in matches])
+                metadatas.append([doc["metadata"] for _, doc in matches])
+
+            return SearchResult(
+                **{
+                    "ids": ids,
+                    "distances": distances,
+                    "documents": documents,
+                    "metadatas": metadatas,
+                }
+            )
+        except Exception as e:
+            log.exception(e)
+            return None
+
+    def _get_result(self, docs: list[dict]) -> GetResult:
+        return GetResult(
+            **{
+                "ids": [[doc["id"] for doc in docs]],
+                "documents": [[doc["text"] for doc in docs]],
+                "metadatas": [[doc["metadata"] for doc in docs]],
+            }
+        )
+
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        # Query the items from the collection based on the filter.
+        collection = self._collection(collection_name)
+        if not collection.exists():
+            return None
+        return self._get_result(collection.query(filter=filter, limit=limit))
+
+    def get(self, collection_name: str) -> Optional[GetResult]:
+        # Get all the items in the collection.
+        collection = self._collection(collection_name)
+        if not collection.exists():
+            return None
+        return self._get_result(collection.query())
+
+    def get_vectors(self, collection_name: str, ids: list[str]) -> dict[str, list]:
+        # Get the stored vectors of the given ids, missing ids are left out.
+        collection = self._collection(collection_name)
+        if not collection.exists():
+            return {}
+        return collection.get_vectors(ids)
+
+    def insert(self, collection_name: str, items: list[VectorItem]):
+        # Insert the items into the collection, if the collection does not exist, it will be created.
+        self._collection(collection_name).add(items)
+
+    def upsert(self, collection_name: str, items: list[VectorItem]):
+        # Update the items in the collection, if the items are not present, insert them. If the collection does not exist, it will be created.
+        collection = self._collection(collection_name)
+        collection.delete(ids=[item["id"] for item in items])
+        collection.add(items)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        # Delete the items from the collection based on the ids.
+        self._collection(collection_name).delete(ids=ids, filter=filter)
+
+    def reset(self):
+        # Resets the database. This will delete all collections and item entries.
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+            self._collections = {}
+        shutil.rmtree(self.root, ignore_errors=True)
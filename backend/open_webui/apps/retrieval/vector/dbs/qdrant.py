@@ -79,17 +79,31 @@ class QdrantClient:
         if limit is None:
             limit = NO_LIMIT  # otherwise qdrant would set limit to 10!
 
-        query_response = self.client.query_points(
+        # One request for all the vectors
+        responses = self.client.query_batch_points(
             collection_name=f"{self.collection_prefix}_{collection_name}",
-            query=vectors[0],
-            limit=limit,
+            requests=[
+                models.QueryRequest(query=vector, limit=limit, with_payload=True)
+                for vector in vectors
+            ],
         )
-        get_result = self._result_to_get_result(query_response.points)
+
+        ids = []
+        documents = []
+        metadatas = []
+        distances = []
+        for response in responses:
+            get_result = self._result_to_get_result(response.points)
+            ids.extend(get_result.ids)
+            documents.extend(get_result.documents)
+            metadatas.extend(get_result.metadatas)
+            distances.append([point.score for point in response.points])
+
         return SearchResult(
-            ids=get_result.ids,
-            documents=get_result.documents,
-            metadatas=get_result.metadatas,
-            distances=[[point.score for point in query_response.points]],
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            distances=distances,
         )
 
     def query(self, collection_name: str, filter: dict, limit: Optional[int] = None):
@@ -126,6 +140,18 @@ class QdrantClient:
         )
         return self._result_to_get_result(points.points)
 
+    def get_vectors(self, collection_name: str, ids: list[str]) -> dict[str, list]:
+        # Get the stored vectors of the given ids, missing ids are left out.
+        try:
+            points = self.client.retrieve(
+                f"{self.collection_prefix}_{collection_name}",
+                ids=ids,
+                with_vectors=True,
+            )
+            return {str(point.id): list(point.vector) for point in points}
+        except Exception:
+            return {}
+
     def insert(self, collection_name: str, items: list[VectorItem]):
         # Insert the items into the collection, if the collection does not exist, it will be created.
         self._create_collection_if_not_exists(collection_name, len(items[0]["vector"]))
@@ -145,17 +171,14 @@ class QdrantClient:
         filter: Optional[dict] = None,
     ):
         # Delete the items from the collection based on the ids.
-        field_conditions = []
-
         if ids:
-            for id_value in ids:
-                field_conditions.append(
-                    models.FieldCondition(
-                        key="metadata.id",
-                        match=models.MatchValue(value=id_value),
-                    ),
-                ),
-        elif filter:
+            return self.client.delete(
+                collection_name=f"{self.collection_prefix}_{collection_name}",
+                points_selector=models.PointIdsList(points=ids),
+            )
+
+        field_conditions = []
+        if filter:
             for key, value in filter.items():
                 field_conditions.append(
                     models.FieldCondition(
@@ -1,6 +1,15 @@
+import logging
+import threading
+import time
+
 from pydantic import BaseModel
 from typing import Optional, List, Any
 
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
 
 class VectorItem(BaseModel):
     id: str
@@ -17,3 +26,192 @@ class GetResult(BaseModel):
 
 class SearchResult(GetResult):
     distances: Optional[List[List[float | int]]]
+
+
+class VectorDBClient:
+    """
+    Wraps the client of the configured vector DB with the behaviour shared by
+    all backends:
+
+    - positive has_collection results are cached for `collection_cache_ttl`
+      seconds, as long as the collection's version in the shared version
+      store of `query_cache` is unchanged. Deleting a collection or resetting
+      the DB bumps the version, so every worker drops its entry. Without a
+      version store nothing is cached;
+    - inserts and upserts are split into batches of `insert_batch_size` items
+      (0 leaves batching to the backend);
+    - the count, errors and latency of every operation are recorded, see
+      stats().
+    """
+
+    OPERATIONS = [
+        "has_collection",
+        "delete_collection",
+        "search",
+        "query",
+        "get",
+        "get_vectors",
+        "insert",
+        "upsert",
+        "delete",
+        "reset",
+    ]
+
+    def __init__(
+        self,
+        client,
+        collection_cache_ttl: float = 60,
+        insert_batch_size: int = 0,
+        query_cache=None,
+    ):
+        self.client = client
+        self.insert_batch_size = insert_batch_size
+        self.query_cache = query_cache
+        self.collection_cache_ttl = (
+            collection_cache_ttl
+            if query_cache is not None and query_cache.versions is not None
+            else 0
+        )
+
+        # collection_name -> (checked_at, version)
+        self._collections: dict[str, tuple[float, tuple]] = {}
+        self._stats = {
+            operation: {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+            for operation in self.OPERATIONS
+        }
+        self._lock = threading.Lock()
+
+    def _call(self, operation: str, *args, **kwargs):
+        start = time.perf_counter()
+        error = False
+        try:
+            return getattr(self.client, operation)(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                stats = self._stats[operation]
+                stats["count"] += 1
+                stats["errors"] += int(error)
+                stats["total_ms"] += elapsed
+                stats["max_ms"] = max(stats["max_ms"], elapsed)
+
+    def _batches(self, items: list) -> list[list]:
+        if self.insert_batch_size <= 0:
+            return [items]
+        return [
+            items[offset : offset + self.insert_batch_size]
+            for offset in range(0, len(items), self.insert_batch_size)
+        ]
+
+    def _version(self, collection_name: str) -> Optional[tuple]:
+        try:
+            return self.query_cache.versions.get([collection_name])
+        except Exception as e:
+            log.warning(f"Collection versions unavailable: {e}")
+            return None
+
+    def _set_collection(
+        self, collection_name: str, exists: bool, version: Optional[tuple] = None
+    ):
+        with self._lock:
+            if exists and version is not None and self.collection_cache_ttl > 0:
+                self._collections[collection_name] = (time.monotonic(), version)
+            else:
+                self._collections.pop(collection_name, None)
+
+    def has_collection(self, collection_name: str) -> bool:
+        if self.collection_cache_ttl <= 0:
+            return self._call("has_collection", collection_name=collection_name)
+
+        # The version is read before asking the backend, so a delete racing
+        # with the check bumps it past the entry stored below
+        version = self._version(collection_name)
+        with self._lock:
+            entry = self._collections.get(collection_name)
+        if (
+            entry is not None
+            and version is not None
+            and entry[1] == version
+            and time.monotonic() - entry[0] < self.collection_cache_ttl
+        ):
+            return True
+
+        # Missing collections are not cached, another process may create them
+        exists = self._call("has_collection", collection_name=collection_name)
+        self._set_collection(collection_name, exists, version)
+        return exists
+
+    def delete_collection(self, collection_name: str):
+        try:
+            return self._call("delete_collection", collection_name=collection_name)
+        finally:
+            self._set_collection(collection_name, False)
+            if self.query_cache is not None:
+                self.query_cache.bump(collection_name)
+
+    def search(
+        self, collection_name: str, vectors: list[list[float | int]], limit: int
+    ) -> Optional[SearchResult]:
+        # Every backend searches all vectors in a single request
+        return self._call(
+            "search", collection_name=collection_name, vectors=vectors, limit=limit
+        )
+
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        return self._call(
+            "query", collection_name=collection_name, filter=filter, limit=limit
+        )
+
+    def get(self, collection_name: str) -> Optional[GetResult]:
+        return self._call("get", collection_name=collection_name)
+
+    def get_vectors(self, collection_name: str, ids: list[str]) -> dict[str, list]:
+        return self._call("get_vectors", collection_name=collection_name, ids=ids)
+
+    def insert(self, collection_name: str, items: list[VectorItem]):
+        for batch in self._batches(items):
+            self._call("insert", collection_name=collection_name, items=batch)
+
+    def upsert(self, collection_name: str, items: list[VectorItem]):
+        for batch in self._batches(items):
+            self._call("upsert", collection_name=collection_name, items=batch)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        return self._call(
+            "delete", collection_name=collection_name, ids=ids, filter=filter
+        )
+
+    def reset(self):
+        try:
+            return self._call("reset")
+        finally:
+            with self._lock:
+                self._collections.clear()
+            if self.query_cache is not None:
+                self.query_cache.bump_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                operation: {
+                    **stats,
+                    "avg_ms": (
+                        stats["total_ms"] / stats["count"] if stats["count"] else 0.0
+                    ),
+                }
+                for operation, stats in self._stats.items()
+            }
+
+    def __getattr__(self, name):
+        # Backend specific methods are not wrapped
+        return getattr(self.client, name)
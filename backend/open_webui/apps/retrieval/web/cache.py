@@ -0,0 +1,253 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from open_webui.apps.retrieval.cache import normalize_query
+from open_webui.config import (
+    RAG_WEB_COLLECTION_TTL,
+    RAG_WEB_PAGE_CACHE_DIR,
+    RAG_WEB_SEARCH_CACHE_SIZE,
+    RAG_WEB_SEARCH_CACHE_TTL,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Runs the engines of a race, the losing search finishes in the background
+SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="web-search")
+
+
+class SearchResultCache:
+    """
+    Bounded in-memory LRU of search engine results, kept for `ttl` seconds.
+
+    Identical searches running at the same time are coalesced: the first
+    caller queries the engine, the others wait for its result. Failed
+    searches are not cached.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._items: OrderedDict[str, tuple[float, list]] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    @staticmethod
+    def key(
+        engine: str, query: str, count: int, filter_list: Optional[list[str]]
+    ) -> str:
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    engine,
+                    normalize_query(query).lower(),
+                    count,
+                    sorted(filter_list or []),
+                ]
+            ).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[list]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] >= self.ttl:
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return list(item[1])
+
+    def get_or_compute(self, key: str, func: Callable[[], list]) -> list:
+        if not self.enabled:
+            return func()
+
+        results = self.get(key)
+        if results is not None:
+            return results
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+
+        if not owner:
+            return list(future.result())
+
+        try:
+            results = func()
+            with self._lock:
+                self._items[key] = (time.monotonic(), results)
+                self._items.move_to_end(key)
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+            future.set_result(results)
+            return list(results)
+        except Exception as e:
+            future.set_exception(e)
+            raise e
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "items": len(self._items),
+                "max_items": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+
+class WebCollections:
+    """
+    Freshness of the collections built from web pages: when each collection
+    was last refreshed, and the URLs it holds with the hash of their content.
+    """
+
+    def __init__(self, path: str, ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS web_collection (
+                    collection_name TEXT PRIMARY KEY,
+                    refreshed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS web_collection_url (
+                    collection_name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (collection_name, url)
+                )
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def is_fresh(self, collection_name: str) -> bool:
+        if self.ttl <= 0:
+            return False
+
+        row = (
+            self._connection()
+            .execute(
+                "SELECT refreshed_at FROM web_collection WHERE collection_name = ?",
+                (collection_name,),
+            )
+            .fetchone()
+        )
+        return row is not None and time.time() - row[0] < self.ttl
+
+    def get_urls(self, collection_name: str) -> dict[str, str]:
+        """Returns url -> content hash of the pages stored in the collection."""
+        return dict(
+            self._connection()
+            .execute(
+                "SELECT url, content_hash FROM web_collection_url WHERE collection_name = ? ORDER BY position",
+                (collection_name,),
+            )
+            .fetchall()
+        )
+
+    def set_urls(self, collection_name: str, urls: dict[str, str]):
+        """Records a refresh of the collection, keeping the fetch time of unchanged pages."""
+        now = time.time()
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO web_collection (collection_name, refreshed_at) VALUES (?, ?)",
+                (collection_name, now),
+            )
+            conn.execute(
+                f"DELETE FROM web_collection_url WHERE collection_name = ? AND url NOT IN ({','.join('?' * len(urls))})",
+                [collection_name, *urls],
+            )
+            conn.executemany(
+                "INSERT INTO web_collection_url (collection_name, url, position, content_hash, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(collection_name, url) DO UPDATE SET "
+                "position = excluded.position, content_hash = excluded.content_hash, "
+                "fetched_at = CASE WHEN content_hash = excluded.content_hash "
+                "THEN fetched_at ELSE excluded.fetched_at END",
+                [
+                    (collection_name, url, position, content_hash, now)
+                    for position, (url, content_hash) in enumerate(urls.items())
+                ],
+            )
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM web_collection")
+            conn.execute("DELETE FROM web_collection_url")
+
+    def delete(self, collection_name: str):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM web_collection WHERE collection_name = ?",
+                (collection_name,),
+            )
+            conn.execute(
+                "DELETE FROM web_collection_url WHERE collection_name = ?",
+                (collection_name,),
+            )
+
+
+WEB_COLLECTIONS = WebCollections(
+    os.path.join(RAG_WEB_PAGE_CACHE_DIR, "collections.db"), ttl=RAG_WEB_COLLECTION_TTL
+)
+
+SEARCH_RESULT_CACHE = SearchResultCache(
+    max_size=RAG_WEB_SEARCH_CACHE_SIZE, ttl=RAG_WEB_SEARCH_CACHE_TTL
+)
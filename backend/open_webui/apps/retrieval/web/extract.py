@@ -0,0 +1,20 @@
+# Runs in the web page extraction process pool, keep the imports light: the
+# pool's processes are spawned and import this module on their own.
+
+from bs4 import BeautifulSoup
+
+
+def extract_page(html: str, url: str) -> tuple[str, dict]:
+    """Extract the text and metadata of a page, like SafeWebBaseLoader."""
+    soup = BeautifulSoup(html, "html.parser")
+    text = soup.get_text()
+
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html := soup.find("html"):
+        metadata["language"] = html.get("lang", "No language found.")
+
+    return text, metadata
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Sequence
+
+import aiohttp
+from langchain_community.utils.user_agent import get_user_agent
+from langchain_core.documents import Document
+
+from open_webui.apps.retrieval.web.extract import extract_page
+from open_webui.config import (
+    ENABLE_RAG_WEB_PAGE_CACHE,
+    RAG_WEB_EXTRACT_WORKERS,
+    RAG_WEB_FETCH_PER_HOST_LIMIT,
+    RAG_WEB_FETCH_TIMEOUT,
+    RAG_WEB_PAGE_CACHE_DIR,
+    RAG_WEB_PAGE_CACHE_MAX_AGE,
+    RAG_WEB_PAGE_CACHE_TTL,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class WebPageCache:
+    """
+    Extracted page text in a SQLite database, keyed by URL and stored with
+    the ETag / Last-Modified validators of the response.
+
+    Entries are served as is for `ttl` seconds. After that, entries with a
+    validator are revalidated with a conditional request and kept for up to
+    `max_age` seconds, entries without one are fetched again.
+    """
+
+    def __init__(self, path: str, ttl: int, max_age: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max(max_age, ttl)
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS web_page (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+        self.prune()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[dict]:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT etag, last_modified, fetched_at, text, metadata FROM web_page WHERE url = ?",
+                (url,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        etag, last_modified, fetched_at, text, metadata = row
+        age = time.time() - fetched_at
+        if age >= self.max_age or (age >= self.ttl and not (etag or last_modified)):
+            return None
+
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": age < self.ttl,
+            "text": text,
+            "metadata": json.loads(metadata),
+        }
+
+    def set(
+        self,
+        url: str,
+        text: str,
+        metadata: dict,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO web_page (url, etag, last_modified, fetched_at, text, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, time.time(), text, json.dumps(metadata)),
+            )
+
+    def touch(self, url: str):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE web_page SET fetched_at = ? WHERE url = ?", (time.time(), url)
+            )
+
+    def prune(self):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM web_page WHERE fetched_at < ? OR "
+                "(fetched_at < ? AND etag IS NULL AND last_modified IS NULL)",
+                (now - self.max_age, now - self.ttl),
+            )
+
+
+class WebFetcher:
+    """
+    Fetches web pages concurrently with aiohttp.
+
+    At most `concurrency` pages are fetched at once, and at most
+    `per_host_limit` from the same host. Every page, extraction included, has
+    to be done within `timeout` seconds of its fetch starting or it is
+    skipped. HTML to text
+    extraction runs in a pool of `extract_workers` processes so that parsing
+    large pages does not hold the GIL of the server process.
+    """
+
+    def __init__(
+        self,
+        per_host_limit: int = 2,
+        timeout: float = 10,
+        extract_workers: int = 2,
+        cache: Optional[WebPageCache] = None,
+    ):
+        self.per_host_limit = max(per_host_limit, 1)
+        self.timeout = timeout
+        self.extract_workers = extract_workers
+        self.cache = cache
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.extract_workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # Spawn rather than fork, the server process runs threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.extract_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    async def _extract(self, html: str, url: str) -> tuple[str, dict]:
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        if pool is not None:
+            try:
+                return await loop.run_in_executor(pool, extract_page, html, url)
+            except BrokenProcessPool:
+                log.warning("Web page extraction pool broke, recreating it")
+                with self._lock:
+                    if self._pool is pool:
+                        self._pool = None
+        return await asyncio.to_thread(extract_page, html, url)
+
+    async def _download(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: dict,
+        verify_ssl: bool,
+    ) -> tuple[int, str, Optional[str], Optional[str]]:
+        async with session.get(url, headers=headers, ssl=verify_ssl) as r:
+            if r.status != 304:
+                r.raise_for_status()
+            return (
+                r.status,
+                await r.text(errors="replace"),
+                r.headers.get("ETag"),
+                r.headers.get("Last-Modified"),
+            )
+
+    async def _fetch(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        verify_ssl: bool,
+        semaphore: asyncio.Semaphore,
+        host_semaphore: asyncio.Semaphore,
+    ) -> Document:
+        cached = self.cache.get(url) if self.cache else None
+        if cached and cached["fresh"]:
+            return Document(page_content=cached["text"], metadata=cached["metadata"])
+
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        # The deadline starts once the page gets its turn, time spent queued
+        # behind other pages of the same host does not count against it
+        async with semaphore, host_semaphore:
+            deadline = time.monotonic() + self.timeout
+            status, html, etag, last_modified = await asyncio.wait_for(
+                self._download(session, url, headers, verify_ssl),
+                timeout=self.timeout,
+            )
+
+        if status == 304 and cached:
+            self.cache.touch(url)
+            return Document(page_content=cached["text"], metadata=cached["metadata"])
+
+        text, metadata = await asyncio.wait_for(
+            self._extract(html, url), timeout=max(deadline - time.monotonic(), 0)
+        )
+        if self.cache:
+            self.cache.set(url, text, metadata, etag, last_modified)
+
+        return Document(page_content=text, metadata=metadata)
+
+    async def fetch_documents(
+        self, urls: Sequence[str], verify_ssl: bool = True, concurrency: int = 10
+    ) -> list[Document]:
+        urls = list(dict.fromkeys(urls))
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        host_semaphores = {}
+
+        async def fetch(session, url):
+            host = urllib.parse.urlparse(url).hostname
+            if host not in host_semaphores:
+                host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+
+            try:
+                return await self._fetch(
+                    session, url, verify_ssl, semaphore, host_semaphores[host]
+                )
+            except asyncio.TimeoutError:
+                log.error(f"Error loading {url}: timed out after {self.timeout}s")
+            except Exception as e:
+                # Log the error and continue with the next URL
+                log.error(f"Error loading {url}: {e}")
+
+        async with aiohttp.ClientSession(
+            headers={"User-Agent": get_user_agent()},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trust_env=True,
+        ) as session:
+            docs = await asyncio.gather(*[fetch(session, url) for url in urls])
+
+        return [doc for doc in docs if doc is not None]
+
+    def load(
+        self, urls: Sequence[str], verify_ssl: bool = True, concurrency: int = 10
+    ) -> list[Document]:
+        coroutine = self.fetch_documents(urls, verify_ssl, concurrency)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+
+        # asyncio.run can not be nested, run the fetch on a thread of its own
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+
+WEB_FETCHER = WebFetcher(
+    per_host_limit=RAG_WEB_FETCH_PER_HOST_LIMIT,
+    timeout=RAG_WEB_FETCH_TIMEOUT,
+    extract_workers=RAG_WEB_EXTRACT_WORKERS,
+    cache=(
+        WebPageCache(
+            os.path.join(RAG_WEB_PAGE_CACHE_DIR, "pages.db"),
+            ttl=RAG_WEB_PAGE_CACHE_TTL,
+            max_age=RAG_WEB_PAGE_CACHE_MAX_AGE,
+        )
+        if ENABLE_RAG_WEB_PAGE_CACHE
+        else None
+    ),
+)
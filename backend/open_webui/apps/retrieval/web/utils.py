@@ -3,12 +3,11 @@ import urllib.parse
 import validators
 from typing import Union, Sequence, Iterator
 
-from langchain_community.document_loaders import (
-    WebBaseLoader,
-)
+from langchain_core.document_loaders import BaseLoader
 from langchain_core.documents import Document
 
 
+from open_webui.apps.retrieval.web.fetcher import WEB_FETCHER
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.config import ENABLE_RAG_LOCAL_WEB_FETCH
 from open_webui.env import SRC_LOG_LEVELS
@@ -54,44 +53,37 @@ def resolve_hostname(hostname):
     return ipv4_addresses, ipv6_addresses
 
 
-class SafeWebBaseLoader(WebBaseLoader):
-    """WebBaseLoader with enhanced error handling for URLs."""
+class WebLoader(BaseLoader):
+    """Loads web pages concurrently through WEB_FETCHER, skipping failed ones."""
+
+    def __init__(
+        self,
+        web_paths: Union[str, Sequence[str]],
+        verify_ssl: bool = True,
+        concurrent_requests: int = 10,
+    ):
+        self.web_paths = [web_paths] if isinstance(web_paths, str) else web_paths
+        self.verify_ssl = verify_ssl
+        self.concurrent_requests = concurrent_requests
 
     def lazy_load(self) -> Iterator[Document]:
-        """Lazy load text from the url(s) in web_path with error handling."""
-        for path in self.web_paths:
-            try:
-                soup = self._scrape(path, bs_kwargs=self.bs_kwargs)
-                text = soup.get_text(**self.bs_get_text_kwargs)
-
-                # Build metadata
-                metadata = {"source": path}
-                if title := soup.find("title"):
-                    metadata["title"] = title.get_text()
-                if description := soup.find("meta", attrs={"name": "description"}):
-                    metadata["description"] = description.get(
-                        "content", "No description found."
-                    )
-                if html := soup.find("html"):
-                    metadata["language"] = html.get("lang", "No language found.")
-
-                yield Document(page_content=text, metadata=metadata)
-            except Exception as e:
-                # Log the error and continue with the next URL
-                log.error(f"Error loading {path}: {e}")
+        yield from WEB_FETCHER.load(
+            self.web_paths,
+            verify_ssl=self.verify_ssl,
+            concurrency=self.concurrent_requests,
+        )
 
 
 def get_web_loader(
     url: Union[str, Sequence[str]],
     verify_ssl: bool = True,
-    requests_per_second: int = 2,
+    requests_per_second: int = 10,
 ):
     # Check if the URL is valid
     if not validate_url(url):
         raise ValueError(ERROR_MESSAGES.INVALID_URL)
-    return SafeWebBaseLoader(
+    return WebLoader(
         url,
         verify_ssl=verify_ssl,
-        requests_per_second=requests_per_second,
-        continue_on_failure=True,
+        concurrent_requests=requests_per_second,
     )
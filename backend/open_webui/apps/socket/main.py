@@ -217,3 +217,9 @@ def get_event_call(request_info):
         return response
 
     return __event_call__
+
+
+async def emit_to_user(user_id, event, data):
+    # Send an event to every socket session of a user
+    for sid in USER_POOL.get(user_id, []):
+        await sio.emit(event, data, to=sid)
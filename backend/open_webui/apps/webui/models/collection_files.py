@@ -0,0 +1,186 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.apps.webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Text
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# CollectionFile DB Schema
+####################
+
+
+class CollectionFile(Base):
+    """
+    Index of the content stored in each vector DB collection: one row per
+    file (or per content hash for content without a file), with its number
+    of chunks. Kept in sync by the retrieval app so that duplicate checks and
+    deletes do not need a metadata query on the vector DB.
+    """
+
+    __tablename__ = "collection_file"
+
+    id = Column(Text, primary_key=True)
+    collection_name = Column(Text)
+    file_id = Column(Text, nullable=True)
+    hash = Column(Text, nullable=True)
+    chunk_count = Column(BigInteger, default=0)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+
+class CollectionFileModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    collection_name: str
+    file_id: Optional[str] = None
+    hash: Optional[str] = None
+    chunk_count: int = 0
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+class CollectionFilesTable:
+    def _filter(
+        self, db, collection_name: str, file_id: Optional[str], hash: Optional[str]
+    ):
+        query = db.query(CollectionFile).filter_by(collection_name=collection_name)
+        if file_id is not None:
+            return query.filter_by(file_id=file_id)
+        return query.filter(CollectionFile.file_id.is_(None)).filter_by(hash=hash)
+
+    def upsert(
+        self,
+        collection_name: str,
+        file_id: Optional[str],
+        hash: Optional[str],
+        chunk_count: int,
+        increment: bool = False,
+    ) -> Optional[CollectionFileModel]:
+        """Sets the chunk count of the file, or adds to it with increment."""
+        try:
+            with get_db() as db:
+                now = int(time.time())
+                entry = self._filter(db, collection_name, file_id, hash).first()
+                if entry:
+                    entry.hash = hash
+                    entry.chunk_count = (
+                        (entry.chunk_count or 0) + chunk_count
+                        if increment
+                        else chunk_count
+                    )
+                    entry.updated_at = now
+                else:
+                    entry = CollectionFile(
+                        id=str(uuid.uuid4()),
+                        collection_name=collection_name,
+                        file_id=file_id,
+                        hash=hash,
+                        chunk_count=chunk_count,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                    db.add(entry)
+                db.commit()
+                db.refresh(entry)
+                return CollectionFileModel.model_validate(entry)
+        except Exception as e:
+            log.exception(f"Error indexing {file_id or hash} in {collection_name}: {e}")
+            return None
+
+    def insert_many(self, collection_name: str, entries: list[dict]):
+        """Adds (file_id, hash, chunk_count) entries of an untracked collection."""
+        with get_db() as db:
+            now = int(time.time())
+            db.add_all(
+                [
+                    CollectionFile(
+                        id=str(uuid.uuid4()),
+                        collection_name=collection_name,
+                        file_id=entry.get("file_id"),
+                        hash=entry.get("hash"),
+                        chunk_count=entry.get("chunk_count", 0),
+                        created_at=now,
+                        updated_at=now,
+                    )
+                    for entry in entries
+                ]
+            )
+            db.commit()
+
+    def has_collection(self, collection_name: str) -> bool:
+        with get_db() as db:
+            return (
+                db.query(CollectionFile.id)
+                .filter_by(collection_name=collection_name)
+                .first()
+                is not None
+            )
+
+    def has_hash(
+        self, collection_name: str, hash: str, exclude_file_id: Optional[str] = None
+    ) -> bool:
+        with get_db() as db:
+            query = db.query(CollectionFile.id).filter_by(
+                collection_name=collection_name, hash=hash
+            )
+            if exclude_file_id is not None:
+                query = query.filter(
+                    (CollectionFile.file_id != exclude_file_id)
+                    | CollectionFile.file_id.is_(None)
+                )
+            return query.first() is not None
+
+    def delete_by_file_id(self, collection_name: str, file_id: str) -> bool:
+        try:
+            with get_db() as db:
+                db.query(CollectionFile).filter_by(
+                    collection_name=collection_name, file_id=file_id
+                ).delete()
+                db.commit()
+                return True
+        except Exception:
+            return False
+
+    def delete_by_hash(self, collection_name: str, hash: str) -> bool:
+        try:
+            with get_db() as db:
+                db.query(CollectionFile).filter_by(
+                    collection_name=collection_name, hash=hash
+                ).delete()
+                db.commit()
+                return True
+        except Exception:
+            return False
+
+    def delete_by_collection(self, collection_name: str) -> bool:
+        try:
+            with get_db() as db:
+                db.query(CollectionFile).filter_by(
+                    collection_name=collection_name
+                ).delete()
+                db.commit()
+                return True
+        except Exception:
+            return False
+
+    def delete_all(self) -> bool:
+        try:
+            with get_db() as db:
+                db.query(CollectionFile).delete()
+                db.commit()
+                return True
+        except Exception:
+            return False
+
+
+CollectionFiles = CollectionFilesTable()
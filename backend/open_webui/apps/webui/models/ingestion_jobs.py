@@ -0,0 +1,247 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.apps.webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Text
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+# Job lifecycle: queued -> extracting -> embedding -> indexed | failed
+ACTIVE_STATUSES = ["extracting", "embedding"]
+
+####################
+# IngestionJob DB Schema
+####################
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_job"
+
+    id = Column(Text, primary_key=True)
+    user_id = Column(Text)
+    file_id = Column(Text)
+    collection_name = Column(Text, nullable=True)
+
+    status = Column(Text)
+    error = Column(Text, nullable=True)
+    attempts = Column(BigInteger, default=0)
+    worker_id = Column(Text, nullable=True)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+
+class IngestionJobModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+    file_id: str
+    collection_name: Optional[str] = None
+
+    status: str
+    error: Optional[str] = None
+    attempts: int = 0
+    worker_id: Optional[str] = None
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+####################
+# Forms
+####################
+
+
+class IngestionJobResponse(BaseModel):
+    id: str
+    file_id: str
+    collection_name: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
+class IngestionJobsTable:
+    def insert_new_job(
+        self, user_id: str, file_id: str, collection_name: Optional[str] = None
+    ) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            job = IngestionJobModel(
+                **{
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "file_id": file_id,
+                    "collection_name": collection_name,
+                    "status": "queued",
+                    "created_at": int(time.time()),
+                    "updated_at": int(time.time()),
+                }
+            )
+
+            try:
+                result = IngestionJob(**job.model_dump())
+                db.add(result)
+                db.commit()
+                db.refresh(result)
+                if result:
+                    return IngestionJobModel.model_validate(result)
+                else:
+                    return None
+            except Exception as e:
+                log.exception(f"Error creating ingestion job: {e}")
+                return None
+
+    def get_job_by_id(self, id: str) -> Optional[IngestionJobModel]:
+        try:
+            with get_db() as db:
+                job = db.query(IngestionJob).filter_by(id=id).first()
+                return IngestionJobModel.model_validate(job) if job else None
+        except Exception:
+            return None
+
+    def get_jobs_by_file_id(self, file_id: str) -> list[IngestionJobModel]:
+        with get_db() as db:
+            return [
+                IngestionJobModel.model_validate(job)
+                for job in db.query(IngestionJob)
+                .filter_by(file_id=file_id)
+                .order_by(IngestionJob.created_at.desc())
+                .all()
+            ]
+
+    def get_jobs_by_status(self, statuses: list[str]) -> list[IngestionJobModel]:
+        with get_db() as db:
+            return [
+                IngestionJobModel.model_validate(job)
+                for job in db.query(IngestionJob)
+                .filter(IngestionJob.status.in_(statuses))
+                .order_by(IngestionJob.created_at.asc())
+                .all()
+            ]
+
+    def claim_next_job(self, worker_id: str) -> Optional[IngestionJobModel]:
+        """
+        Atomically move the oldest runnable queued job to "extracting" and
+        return it. Knowledge jobs wait until the file itself has been processed,
+        as they reuse its extracted content.
+        """
+        with get_db() as db:
+            candidates = (
+                db.query(IngestionJob)
+                .filter_by(status="queued")
+                .order_by(IngestionJob.created_at.asc())
+                .limit(32)
+                .all()
+            )
+
+            for candidate in candidates:
+                if candidate.collection_name is not None:
+                    pending = (
+                        db.query(IngestionJob)
+                        .filter(
+                            IngestionJob.file_id == candidate.file_id,
+                            IngestionJob.collection_name.is_(None),
+                            IngestionJob.status.in_(["queued", *ACTIVE_STATUSES]),
+                        )
+                        .first()
+                    )
+                    if pending:
+                        continue
+
+                # Conditional update, only one worker (in any process) wins
+                claimed = (
+                    db.query(IngestionJob)
+                    .filter_by(id=candidate.id, status="queued")
+                    .update(
+                        {
+                            "status": "extracting",
+                            "worker_id": worker_id,
+                            "attempts": (candidate.attempts or 0) + 1,
+                            "updated_at": int(time.time()),
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+
+                if claimed:
+                    # The session does not expire on commit, reload the row
+                    # updated behind its back
+                    db.refresh(candidate)
+                    return IngestionJobModel.model_validate(candidate)
+
+            return None
+
+    def update_job_status_by_id(
+        self, id: str, status: str, error: Optional[str] = None
+    ) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            db.query(IngestionJob).filter_by(id=id).update(
+                {"status": status, "error": error, "updated_at": int(time.time())}
+            )
+            db.commit()
+            return self.get_job_by_id(id)
+
+    def touch_jobs_by_ids(self, ids: list[str]):
+        if not ids:
+            return
+        with get_db() as db:
+            db.query(IngestionJob).filter(IngestionJob.id.in_(ids)).update(
+                {"updated_at": int(time.time())}, synchronize_session=False
+            )
+            db.commit()
+
+    def requeue_stale_jobs(self, timeout: int, max_attempts: int) -> int:
+        """
+        Jobs left in an active state by a worker that died (no heartbeat for
+        `timeout` seconds) are queued again, or failed after max_attempts.
+        """
+        with get_db() as db:
+            stale = (
+                db.query(IngestionJob)
+                .filter(
+                    IngestionJob.status.in_(ACTIVE_STATUSES),
+                    IngestionJob.updated_at < int(time.time()) - timeout,
+                )
+                .all()
+            )
+
+            for job in stale:
+                if (job.attempts or 0) >= max_attempts:
+                    job.status = "failed"
+                    job.error = "Ingestion worker stopped responding"
+                else:
+                    job.status = "queued"
+                job.worker_id = None
+                job.updated_at = int(time.time())
+
+            db.commit()
+            return len(stale)
+
+    def delete_jobs_by_file_id(self, file_id: str) -> bool:
+        try:
+            with get_db() as db:
+                db.query(IngestionJob).filter_by(file_id=file_id).delete()
+                db.commit()
+                return True
+        except Exception:
+            return False
+
+    def delete_all_jobs(self) -> bool:
+        try:
+            with get_db() as db:
+                db.query(IngestionJob).delete()
+                db.commit()
+                return True
+        except Exception:
+            return False
+
+
+IngestionJobs = IngestionJobsTable()
@@ -14,9 +14,18 @@ from open_webui.apps.webui.models.files import (
     FileModelResponse,
     Files,
 )
+from open_webui.apps.webui.models.ingestion_jobs import (
+    IngestionJobResponse,
+    IngestionJobs,
+)
 from open_webui.apps.retrieval.main import process_file, ProcessFileForm
+from open_webui.apps.retrieval.loaders.cache import (
+    EXTRACTION_CACHE,
+    delete_file_extractions,
+)
+from open_webui.apps.retrieval.ingestion.main import INGESTION_QUEUE
 
-from open_webui.config import UPLOAD_DIR
+from open_webui.config import ENABLE_RAG_BACKGROUND_INGESTION, UPLOAD_DIR
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.constants import ERROR_MESSAGES
 
@@ -67,6 +76,17 @@ def upload_file(file: UploadFile = File(...), user=Depends(get_verified_user)):
             ),
         )
 
+        if ENABLE_RAG_BACKGROUND_INGESTION:
+            # Return right away, progress is reported through "ingestion-events"
+            job = INGESTION_QUEUE.enqueue(user.id, id)
+            if job:
+                return FileModelResponse(
+                    **{
+                        **file_item.model_dump(),
+                        "ingestion": IngestionJobResponse(**job.model_dump()),
+                    }
+                )
+
         try:
             process_file(ProcessFileForm(file_id=id))
             file_item = Files.get_file_by_id(id=id)
@@ -119,6 +139,9 @@ async def list_files(user=Depends(get_verified_user)):
 async def delete_all_files(user=Depends(get_admin_user)):
     result = Files.delete_all_files()
     if result:
+        IngestionJobs.delete_all_jobs()
+        if EXTRACTION_CACHE is not None:
+            EXTRACTION_CACHE.clear()
         try:
             Storage.delete_all_files()
         except Exception as e:
@@ -154,6 +177,27 @@ async def get_file_by_id(id: str, user=Depends(get_verified_user)):
         )
 
 
+############################
+# Get File Ingestion Status By Id
+############################
+
+
+@router.get("/{id}/process/status", response_model=list[IngestionJobResponse])
+async def get_file_process_status_by_id(id: str, user=Depends(get_verified_user)):
+    file = Files.get_file_by_id(id)
+
+    if file and (file.user_id == user.id or user.role == "admin"):
+        return [
+            IngestionJobResponse(**job.model_dump())
+            for job in IngestionJobs.get_jobs_by_file_id(id)
+        ]
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+
+
 ############################
 # Get File Data Content By Id
 ############################
@@ -327,6 +371,8 @@ async def delete_file_by_id(id: str, user=Depends(get_verified_user)):
     if file and (file.user_id == user.id or user.role == "admin"):
         result = Files.delete_file_by_id(id)
         if result:
+            IngestionJobs.delete_jobs_by_file_id(id)
+            delete_file_extractions(f"{UPLOAD_DIR}/{file.filename}")
             try:
                 Storage.delete_file(file.filename)
             except Exception as e:
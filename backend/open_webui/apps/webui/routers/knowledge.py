@@ -11,9 +11,18 @@ from open_webui.apps.webui.models.knowledge import (
     KnowledgeResponse,
 )
 from open_webui.apps.webui.models.files import Files, FileModel
-from open_webui.apps.retrieval.vector.connector import VECTOR_DB_CLIENT
-from open_webui.apps.retrieval.main import process_file, ProcessFileForm
+from open_webui.apps.webui.models.ingestion_jobs import IngestionJobs
+from open_webui.apps.retrieval.main import (
+    delete_chunks,
+    delete_collection,
+    ingest_file,
+    process_file,
+    ProcessFileForm,
+)
+from open_webui.apps.retrieval.ingestion.main import INGESTION_QUEUE
+from open_webui.apps.retrieval.loaders.cache import delete_file_extractions
 
+from open_webui.config import ENABLE_RAG_BACKGROUND_INGESTION, UPLOAD_DIR
 
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.utils.utils import get_admin_user, get_verified_user
@@ -182,21 +191,55 @@ def add_file_to_knowledge_by_id(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=ERROR_MESSAGES.NOT_FOUND,
         )
-    if not file.data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_MESSAGES.FILE_NOT_PROCESSED,
+    if ENABLE_RAG_BACKGROUND_INGESTION:
+        # Files that are still being processed are fine, the knowledge job
+        # waits for the file's own ingestion job
+        pending = any(
+            job.collection_name is None and job.status not in ["indexed", "failed"]
+            for job in IngestionJobs.get_jobs_by_file_id(form_data.file_id)
         )
+        if not file.data and not pending:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.FILE_NOT_PROCESSED,
+            )
 
-    # Add content to the vector database
-    try:
-        process_file(ProcessFileForm(file_id=form_data.file_id, collection_name=id))
-    except Exception as e:
-        log.debug(e)
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e),
+        if not knowledge:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.NOT_FOUND,
+            )
+
+        file_ids = (knowledge.data or {}).get("file_ids", [])
+        if form_data.file_id in file_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.DEFAULT("file_id"),
+            )
+
+        # The file is added to the knowledge base once its job is indexed
+        INGESTION_QUEUE.enqueue(user.id, form_data.file_id, collection_name=id)
+
+        return KnowledgeFilesResponse(
+            **knowledge.model_dump(),
+            files=Files.get_files_by_ids(file_ids),
         )
+    else:
+        if not file.data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.FILE_NOT_PROCESSED,
+            )
+
+        # Add content to the vector database
+        try:
+            process_file(ProcessFileForm(file_id=form_data.file_id, collection_name=id))
+        except Exception as e:
+            log.debug(e)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
 
     if knowledge:
         data = knowledge.data or {}
@@ -248,19 +291,20 @@ def update_file_from_knowledge_by_id(
             detail=ERROR_MESSAGES.NOT_FOUND,
         )
 
-    # Remove content from the vector database
-    VECTOR_DB_CLIENT.delete(
-        collection_name=knowledge.id, filter={"file_id": form_data.file_id}
-    )
-
-    # Add content to the vector database
-    try:
-        process_file(ProcessFileForm(file_id=form_data.file_id, collection_name=id))
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e),
-        )
+    # Update content in the vector database, unchanged chunks are kept
+    if ENABLE_RAG_BACKGROUND_INGESTION:
+        INGESTION_QUEUE.enqueue(user.id, form_data.file_id, collection_name=id)
+    else:
+        try:
+            ingest_file(
+                ProcessFileForm(file_id=form_data.file_id, collection_name=id),
+                replace=True,
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
 
     if knowledge:
         data = knowledge.data or {}
@@ -299,15 +343,9 @@ def remove_file_from_knowledge_by_id(
         )
 
     # Remove content from the vector database
-    VECTOR_DB_CLIENT.delete(
-        collection_name=knowledge.id, filter={"file_id": form_data.file_id}
-    )
-
-    result = VECTOR_DB_CLIENT.query(
-        collection_name=knowledge.id,
-        filter={"file_id": form_data.file_id},
-    )
+    delete_chunks(knowledge.id, filter={"file_id": form_data.file_id})
 
+    delete_file_extractions(f"{UPLOAD_DIR}/{file.filename}")
     Files.delete_file_by_id(form_data.file_id)
 
     if knowledge:
@@ -354,7 +392,7 @@ def remove_file_from_knowledge_by_id(
 @router.post("/{id}/reset", response_model=Optional[KnowledgeResponse])
 async def reset_knowledge_by_id(id: str, user=Depends(get_admin_user)):
     try:
-        VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -373,7 +411,7 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_admin_user)):
 @router.delete("/{id}/delete", response_model=bool)
 async def delete_knowledge_by_id(id: str, user=Depends(get_admin_user)):
     try:
-        VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
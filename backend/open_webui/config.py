@@ -606,6 +606,25 @@ OLLAMA_BASE_URLS = PersistentConfig(
     "OLLAMA_BASE_URLS", "ollama.base_urls", OLLAMA_BASE_URLS
 )
 
+# How requests for a model are spread over the Ollama nodes serving it:
+# random, least_outstanding, power_of_two, resident or ewma
+OLLAMA_ROUTING_POLICY = os.environ.get(
+    "OLLAMA_ROUTING_POLICY", "least_outstanding"
+).lower()
+
+# Consecutive failures after which a node stops receiving requests, 0 disables
+OLLAMA_CIRCUIT_BREAKER_THRESHOLD = int(
+    os.environ.get("OLLAMA_CIRCUIT_BREAKER_THRESHOLD", "3")
+)
+
+# Seconds an ejected node waits before it is tried again
+OLLAMA_CIRCUIT_BREAKER_COOLDOWN = float(
+    os.environ.get("OLLAMA_CIRCUIT_BREAKER_COOLDOWN", "30")
+)
+
+# Seconds between polls of the models loaded on every node (/api/ps), 0 disables
+OLLAMA_PS_POLL_INTERVAL = float(os.environ.get("OLLAMA_PS_POLL_INTERVAL", "0"))
+
 ####################################
 # OPENAI_API
 ####################################
@@ -646,6 +665,22 @@ OPENAI_API_BASE_URLS = PersistentConfig(
     "OPENAI_API_BASE_URLS", "openai.api_base_urls", OPENAI_API_BASE_URLS
 )
 
+# How requests for a model are spread over the endpoints serving it:
+# random, least_outstanding, power_of_two or ewma (latency to first byte)
+OPENAI_ROUTING_POLICY = os.environ.get(
+    "OPENAI_ROUTING_POLICY", "least_outstanding"
+).lower()
+
+# Consecutive failures after which an endpoint stops receiving requests, 0 disables
+OPENAI_CIRCUIT_BREAKER_THRESHOLD = int(
+    os.environ.get("OPENAI_CIRCUIT_BREAKER_THRESHOLD", "3")
+)
+
+# Seconds an ejected endpoint waits before it is tried again
+OPENAI_CIRCUIT_BREAKER_COOLDOWN = float(
+    os.environ.get("OPENAI_CIRCUIT_BREAKER_COOLDOWN", "30")
+)
+
 OPENAI_API_KEY = ""
 
 try:
@@ -785,6 +820,10 @@ MODEL_FILTER_LIST = PersistentConfig(
     [model.strip() for model in MODEL_FILTER_LIST.split(";")],
 )
 
+# Seconds the models fetched from the Ollama and OpenAI connections are served
+# before they are fetched again in the background, 0 fetches them on every call
+MODELS_CACHE_TTL = int(os.environ.get("MODELS_CACHE_TTL", "60"))
+
 WEBHOOK_URL = PersistentConfig(
     "WEBHOOK_URL", "webhook_url", os.environ.get("WEBHOOK_URL", "")
 )
@@ -931,6 +970,19 @@ TOOLS_FUNCTION_CALLING_PROMPT_TEMPLATE = PersistentConfig(
 
 VECTOR_DB = os.environ.get("VECTOR_DB", "chroma")
 
+# has_collection results are cached for VECTOR_DB_COLLECTION_CACHE_TTL seconds
+# (only with ENABLE_RAG_QUERY_CACHE, whose collection versions invalidate them),
+# inserts are sent in batches of VECTOR_DB_INSERT_BATCH_SIZE items (defaults
+# depend on the backend, 0 disables batching)
+VECTOR_DB_COLLECTION_CACHE_TTL = float(
+    os.environ.get("VECTOR_DB_COLLECTION_CACHE_TTL", "60")
+)
+VECTOR_DB_INSERT_BATCH_SIZE = (
+    int(os.environ.get("VECTOR_DB_INSERT_BATCH_SIZE"))
+    if os.environ.get("VECTOR_DB_INSERT_BATCH_SIZE")
+    else None
+)
+
 # Chroma
 CHROMA_DATA_PATH = f"{DATA_DIR}/vector_db"
 CHROMA_TENANT = os.environ.get("CHROMA_TENANT", chromadb.DEFAULT_TENANT)
@@ -955,6 +1007,26 @@ MILVUS_URI = os.environ.get("MILVUS_URI", f"{DATA_DIR}/vector_db/milvus.db")
 # Qdrant
 QDRANT_URI = os.environ.get("QDRANT_URI", None)
 
+# NumPy (embedded, memory-mapped segments)
+NUMPY_VECTOR_DB_PATH = os.environ.get(
+    "NUMPY_VECTOR_DB_PATH", f"{DATA_DIR}/vector_db/numpy"
+)
+# float32 or float16, float16 halves the disk and page cache footprint
+NUMPY_VECTOR_DB_DTYPE = os.environ.get("NUMPY_VECTOR_DB_DTYPE", "float32")
+# Segments with at least this many rows get an IVF index, 0 to disable
+NUMPY_VECTOR_DB_IVF_THRESHOLD = int(
+    os.environ.get("NUMPY_VECTOR_DB_IVF_THRESHOLD", "50000")
+)
+NUMPY_VECTOR_DB_IVF_NPROBE = int(os.environ.get("NUMPY_VECTOR_DB_IVF_NPROBE", "8"))
+# "int8" or "binary" scans quantized copies of the vectors, the best
+# limit * NUMPY_VECTOR_DB_RESCORE_FACTOR candidates are re-scored with the
+# full vectors, which are then only read from disk for those rows. Binary
+# codes are 32x smaller than float32 but usually need a larger factor.
+NUMPY_VECTOR_DB_QUANTIZATION = os.environ.get("NUMPY_VECTOR_DB_QUANTIZATION", "")
+NUMPY_VECTOR_DB_RESCORE_FACTOR = int(
+    os.environ.get("NUMPY_VECTOR_DB_RESCORE_FACTOR", "4")
+)
+
 ####################################
 # Information Retrieval (RAG)
 ####################################
@@ -975,6 +1047,9 @@ TIKA_SERVER_URL = PersistentConfig(
 RAG_TOP_K = PersistentConfig(
     "RAG_TOP_K", "rag.top_k", int(os.environ.get("RAG_TOP_K", "3"))
 )
+# Upper bound on the number of collections searched concurrently per process
+RAG_RETRIEVAL_MAX_WORKERS = int(os.environ.get("RAG_RETRIEVAL_MAX_WORKERS", "8"))
+
 RAG_RELEVANCE_THRESHOLD = PersistentConfig(
     "RAG_RELEVANCE_THRESHOLD",
     "rag.relevance_threshold",
@@ -987,6 +1062,10 @@ ENABLE_RAG_HYBRID_SEARCH = PersistentConfig(
     os.environ.get("ENABLE_RAG_HYBRID_SEARCH", "").lower() == "true",
 )
 
+# Persistent BM25 index used by hybrid search, one directory per collection
+RAG_BM25_INDEX_DIR = os.environ.get("RAG_BM25_INDEX_DIR", f"{DATA_DIR}/bm25_index")
+RAG_BM25_MAX_SEGMENTS = int(os.environ.get("RAG_BM25_MAX_SEGMENTS", "8"))
+
 RAG_FILE_MAX_COUNT = PersistentConfig(
     "RAG_FILE_MAX_COUNT",
     "rag.file.max_count",
@@ -1049,6 +1128,95 @@ RAG_EMBEDDING_BATCH_SIZE = PersistentConfig(
     ),
 )
 
+# Number of embedding batches in flight per process during ingestion, failed
+# batches are retried with exponential backoff
+RAG_EMBEDDING_CONCURRENCY = int(os.environ.get("RAG_EMBEDDING_CONCURRENCY", "4"))
+RAG_EMBEDDING_MAX_RETRIES = int(os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "3"))
+RAG_EMBEDDING_RETRY_BACKOFF = float(
+    os.environ.get("RAG_EMBEDDING_RETRY_BACKOFF", "0.5")
+)
+
+# Embeddings are cached by (engine, model, is_query, sha256(text)) in memory
+# and in a SQLite database so identical text is never embedded twice.
+ENABLE_RAG_EMBEDDING_CACHE = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_CACHE", "True").lower() == "true"
+)
+RAG_EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "10000"))
+RAG_EMBEDDING_CACHE_DIR = os.environ.get(
+    "RAG_EMBEDDING_CACHE_DIR", f"{CACHE_DIR}/embeddings"
+)
+
+# Local SentenceTransformer models can run in a separate embedding server
+# shared by every uvicorn worker: RAG_EMBEDDING_SERVER_WORKERS processes each
+# own a copy of the model, requests arriving together are encoded as one
+# batch of up to RAG_EMBEDDING_SERVER_MAX_BATCH_SIZE texts.
+ENABLE_RAG_EMBEDDING_SERVER = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_SERVER", "False").lower() == "true"
+)
+RAG_EMBEDDING_SERVER_WORKERS = int(os.environ.get("RAG_EMBEDDING_SERVER_WORKERS", "1"))
+RAG_EMBEDDING_SERVER_MAX_BATCH_SIZE = int(
+    os.environ.get("RAG_EMBEDDING_SERVER_MAX_BATCH_SIZE", "64")
+)
+RAG_EMBEDDING_SERVER_BATCH_WAIT_MS = int(
+    os.environ.get("RAG_EMBEDDING_SERVER_BATCH_WAIT_MS", "5")
+)
+RAG_EMBEDDING_SERVER_START_TIMEOUT = int(
+    os.environ.get("RAG_EMBEDDING_SERVER_START_TIMEOUT", "600")
+)
+RAG_EMBEDDING_SERVER_DIR = os.environ.get(
+    "RAG_EMBEDDING_SERVER_DIR", f"{CACHE_DIR}/embedding_server"
+)
+
+# Retrieval results are cached per (collections, collection versions, query)
+ENABLE_RAG_QUERY_CACHE = (
+    os.environ.get("ENABLE_RAG_QUERY_CACHE", "True").lower() == "true"
+)
+RAG_QUERY_CACHE_SIZE = int(os.environ.get("RAG_QUERY_CACHE_SIZE", "1000"))
+RAG_QUERY_CACHE_TTL = int(os.environ.get("RAG_QUERY_CACHE_TTL", "3600"))
+RAG_QUERY_CACHE_DIR = os.environ.get("RAG_QUERY_CACHE_DIR", f"{CACHE_DIR}/retrieval")
+
+# Extracted documents are streamed through a temporary spool, only its first
+# RAG_DOCUMENT_SPOOL_MAX_MEMORY bytes stay in memory. At most
+# RAG_FILE_CONTENT_MAX_LENGTH characters of the extracted text are stored in
+# the file record (0 for no limit).
+RAG_DOCUMENT_SPOOL_MAX_MEMORY = int(
+    os.environ.get("RAG_DOCUMENT_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024))
+)
+RAG_FILE_CONTENT_MAX_LENGTH = int(
+    os.environ.get("RAG_FILE_CONTENT_MAX_LENGTH", str(10 * 1024 * 1024))
+)
+
+# Extracted documents are cached by sha256 of the file and extraction
+# settings, the least recently used are removed past the max size in bytes
+ENABLE_RAG_EXTRACTION_CACHE = (
+    os.environ.get("ENABLE_RAG_EXTRACTION_CACHE", "True").lower() == "true"
+)
+RAG_EXTRACTION_CACHE_DIR = os.environ.get(
+    "RAG_EXTRACTION_CACHE_DIR", f"{CACHE_DIR}/extraction"
+)
+RAG_EXTRACTION_CACHE_MAX_SIZE = int(
+    os.environ.get("RAG_EXTRACTION_CACHE_MAX_SIZE", str(1024 * 1024 * 1024))
+)
+
+# Pages of PDFs with at least RAG_PDF_PARALLEL_MIN_PAGES pages are extracted
+# (and OCRed with PDF_EXTRACT_IMAGES) by a pool of RAG_PDF_EXTRACT_WORKERS
+# processes, 0 extracts them in the calling thread
+RAG_PDF_EXTRACT_WORKERS = int(os.environ.get("RAG_PDF_EXTRACT_WORKERS", "2"))
+RAG_PDF_PARALLEL_MIN_PAGES = int(os.environ.get("RAG_PDF_PARALLEL_MIN_PAGES", "8"))
+
+# Connections kept open to the Tika server, and the timeout of a request
+TIKA_MAX_CONNECTIONS = int(os.environ.get("TIKA_MAX_CONNECTIONS", "10"))
+TIKA_TIMEOUT = int(os.environ.get("TIKA_TIMEOUT", "300"))
+
+# Background ingestion of uploaded files, see apps/retrieval/ingestion. Off by
+# default, uploads return before processing and the UI does not track job status
+ENABLE_RAG_BACKGROUND_INGESTION = (
+    os.environ.get("ENABLE_RAG_BACKGROUND_INGESTION", "False").lower() == "true"
+)
+RAG_INGESTION_WORKERS = int(os.environ.get("RAG_INGESTION_WORKERS", "2"))
+RAG_INGESTION_JOB_TIMEOUT = int(os.environ.get("RAG_INGESTION_JOB_TIMEOUT", "300"))
+RAG_INGESTION_MAX_ATTEMPTS = int(os.environ.get("RAG_INGESTION_MAX_ATTEMPTS", "3"))
+
 RAG_RERANKING_MODEL = PersistentConfig(
     "RAG_RERANKING_MODEL",
     "rag.reranking_model",
@@ -1065,6 +1233,17 @@ RAG_RERANKING_MODEL_TRUST_REMOTE_CODE = (
     os.environ.get("RAG_RERANKING_MODEL_TRUST_REMOTE_CODE", "").lower() == "true"
 )
 
+# Concurrent rerank requests are scored together, requests arriving while the
+# model is busy form the next batch. A wait > 0 holds each batch open a little
+# longer to collect more requests.
+RAG_RERANKING_MAX_BATCH_SIZE = int(
+    os.environ.get("RAG_RERANKING_MAX_BATCH_SIZE", "256")
+)
+RAG_RERANKING_BATCH_WAIT_MS = int(os.environ.get("RAG_RERANKING_BATCH_WAIT_MS", "0"))
+
+# Number of chunks whose ColBERT token embeddings are kept in memory
+RAG_COLBERT_CACHE_SIZE = int(os.environ.get("RAG_COLBERT_CACHE_SIZE", "10000"))
+
 
 RAG_TEXT_SPLITTER = PersistentConfig(
     "RAG_TEXT_SPLITTER",
@@ -1240,6 +1419,36 @@ RAG_WEB_SEARCH_CONCURRENT_REQUESTS = PersistentConfig(
     int(os.getenv("RAG_WEB_SEARCH_CONCURRENT_REQUESTS", "10")),
 )
 
+# Search engine results are cached for RAG_WEB_SEARCH_CACHE_TTL seconds (0 to
+# disable). When RAG_WEB_SEARCH_RACE_ENGINE names a second configured engine,
+# both are queried at once and the first to return results is used.
+RAG_WEB_SEARCH_CACHE_TTL = int(os.getenv("RAG_WEB_SEARCH_CACHE_TTL", "3600"))
+RAG_WEB_SEARCH_CACHE_SIZE = int(os.getenv("RAG_WEB_SEARCH_CACHE_SIZE", "1000"))
+RAG_WEB_SEARCH_RACE_ENGINE = os.getenv("RAG_WEB_SEARCH_RACE_ENGINE", "")
+
+# Web pages are fetched concurrently (RAG_WEB_SEARCH_CONCURRENT_REQUESTS at
+# once, RAG_WEB_FETCH_PER_HOST_LIMIT per host), each within
+# RAG_WEB_FETCH_TIMEOUT seconds. HTML is converted to text in a pool of
+# RAG_WEB_EXTRACT_WORKERS processes (0 to extract in threads).
+RAG_WEB_FETCH_PER_HOST_LIMIT = int(os.getenv("RAG_WEB_FETCH_PER_HOST_LIMIT", "2"))
+RAG_WEB_FETCH_TIMEOUT = float(os.getenv("RAG_WEB_FETCH_TIMEOUT", "10"))
+RAG_WEB_EXTRACT_WORKERS = int(os.getenv("RAG_WEB_EXTRACT_WORKERS", "2"))
+
+# Extracted page text is cached for RAG_WEB_PAGE_CACHE_TTL seconds, then
+# revalidated with its ETag / Last-Modified for up to RAG_WEB_PAGE_CACHE_MAX_AGE
+ENABLE_RAG_WEB_PAGE_CACHE = (
+    os.getenv("ENABLE_RAG_WEB_PAGE_CACHE", "True").lower() == "true"
+)
+RAG_WEB_PAGE_CACHE_TTL = int(os.getenv("RAG_WEB_PAGE_CACHE_TTL", "3600"))
+RAG_WEB_PAGE_CACHE_MAX_AGE = int(
+    os.getenv("RAG_WEB_PAGE_CACHE_MAX_AGE", str(7 * 24 * 60 * 60))
+)
+RAG_WEB_PAGE_CACHE_DIR = os.getenv("RAG_WEB_PAGE_CACHE_DIR", f"{CACHE_DIR}/web")
+
+# Collections built by web search and URL processing are reused as is for
+# RAG_WEB_COLLECTION_TTL seconds, later refreshes only re-embed changed pages
+RAG_WEB_COLLECTION_TTL = int(os.getenv("RAG_WEB_COLLECTION_TTL", "3600"))
+
 
 ####################################
 # Images
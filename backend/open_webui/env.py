@@ -377,6 +377,19 @@ else:
     except Exception:
         AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST = 3
 
+# Connections kept open to each upstream (Ollama, OpenAI, ...), 0 for no limit
+AIOHTTP_CLIENT_POOL_LIMIT = int(os.environ.get("AIOHTTP_CLIENT_POOL_LIMIT", "100"))
+
+# Seconds an idle upstream connection is kept alive for reuse
+AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = float(
+    os.environ.get("AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30")
+)
+
+# Seconds resolved upstream host names are cached for
+AIOHTTP_CLIENT_DNS_CACHE_TTL = int(
+    os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+)
+
 ####################################
 # OFFLINE_MODE
 ####################################
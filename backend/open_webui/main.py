@@ -8,6 +8,7 @@ import shutil
 import sys
 import time
 import random
+from collections import defaultdict
 from contextlib import asynccontextmanager
 from typing import Optional
 
@@ -39,6 +40,7 @@ from open_webui.apps.ollama.main import (
     app as ollama_app,
     get_all_models as get_ollama_models,
     generate_chat_completion as generate_ollama_chat_completion,
+    poll_running_models as poll_ollama_running_models,
     GenerateChatCompletionForm,
 )
 from open_webui.apps.openai.main import (
@@ -47,6 +49,7 @@ from open_webui.apps.openai.main import (
     get_all_models as get_openai_models,
 )
 from open_webui.apps.retrieval.main import app as retrieval_app
+from open_webui.apps.retrieval.ingestion.main import INGESTION_QUEUE
 from open_webui.apps.retrieval.utils import get_rag_context, rag_template
 from open_webui.apps.socket.main import (
     app as socket_app,
@@ -66,6 +69,7 @@ from open_webui.apps.webui.models.users import UserModel, Users
 from open_webui.apps.webui.utils import load_function_module_by_id
 from open_webui.config import (
     CACHE_DIR,
+    ENABLE_RAG_BACKGROUND_INGESTION,
     CORS_ALLOW_ORIGIN,
     DEFAULT_LOCALE,
     ENABLE_ADMIN_CHAT_ACCESS,
@@ -76,6 +80,8 @@ from open_webui.config import (
     ENV,
     FRONTEND_BUILD_DIR,
     MODEL_FILTER_LIST,
+    MODELS_CACHE_TTL,
+    OLLAMA_PS_POLL_INTERVAL,
     OAUTH_PROVIDERS,
     ENABLE_SEARCH_QUERY,
     SEARCH_QUERY_GENERATION_PROMPT_TEMPLATE,
@@ -93,6 +99,7 @@ from open_webui.config import (
 )
 from open_webui.constants import TASKS
 from open_webui.env import (
+    AIOHTTP_CLIENT_TIMEOUT,
     CHANGELOG,
     GLOBAL_LOG_LEVEL,
     SAFE_MODE,
@@ -106,6 +113,7 @@ from open_webui.env import (
     RESET_CONFIG_ON_START,
     OFFLINE_MODE,
 )
+from open_webui.utils.http import HTTP_CLIENT_POOL, release_response
 from open_webui.utils.misc import (
     add_or_update_system_message,
     get_last_user_message,
@@ -113,6 +121,7 @@ from open_webui.utils.misc import (
 )
 from open_webui.utils.oauth import oauth_manager
 from open_webui.utils.payload import convert_payload_openai_to_ollama
+from open_webui.utils.registry import ModelRegistry
 from open_webui.utils.response import (
     convert_response_ollama_to_openai,
     convert_streaming_response_ollama_to_openai,
@@ -178,8 +187,32 @@ async def lifespan(app: FastAPI):
         reset_config()
 
     asyncio.create_task(periodic_usage_pool_cleanup())
+
+    if ENABLE_RAG_BACKGROUND_INGESTION:
+        INGESTION_QUEUE.start(asyncio.get_running_loop())
+
+    await HTTP_CLIENT_POOL.open(
+        ollama_app.state.config.OLLAMA_BASE_URLS
+        + openai_app.state.config.OPENAI_API_BASE_URLS
+    )
+
+    ollama_ps_task = None
+    if OLLAMA_PS_POLL_INTERVAL > 0:
+        ollama_ps_task = asyncio.create_task(poll_ollama_running_models())
+
+    models_task = None
+    if MODELS_CACHE_TTL > 0:
+        models_task = asyncio.create_task(MODEL_REGISTRY.run())
+
     yield
 
+    if models_task:
+        models_task.cancel()
+    if ollama_ps_task:
+        ollama_ps_task.cancel()
+    INGESTION_QUEUE.stop()
+    await HTTP_CLIENT_POOL.close()
+
 
 app = FastAPI(
     docs_url="/docs" if ENV == "dev" else None, openapi_url="/openapi.json" if ENV == "dev" else None, redoc_url=None, lifespan=lifespan
@@ -263,31 +296,59 @@ def get_filter_function_ids(model):
     return filter_ids
 
 
+def load_filter_module(filter_id):
+    # Blocking (database reads, loading the module), run it in a thread. The
+    # valves are returned rather than set on the shared module, see
+    # call_filter_handler
+    filter = Functions.get_function_by_id(filter_id)
+    if not filter:
+        return None, None
+
+    if filter_id in webui_app.state.FUNCTIONS:
+        function_module = webui_app.state.FUNCTIONS[filter_id]
+    else:
+        function_module, _, _ = load_function_module_by_id(filter_id)
+        webui_app.state.FUNCTIONS[filter_id] = function_module
+
+    valves = None
+    if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
+        valves = Functions.get_function_valves_by_id(filter_id)
+        valves = function_module.Valves(**(valves if valves else {}))
+
+    return function_module, valves
+
+
+# Synchronous filter handlers used to run one at a time on the event loop and
+# may rely on it, they now run in a thread but still one at a time per filter
+FILTER_LOCKS: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+
+async def call_filter_handler(filter_id, function_module, valves, handler, params):
+    # The valves are set on the event loop, right before the handler runs
+    if inspect.iscoroutinefunction(handler):
+        if valves is not None:
+            function_module.valves = valves
+        return await handler(**params)
+
+    async with FILTER_LOCKS[filter_id]:
+        if valves is not None:
+            function_module.valves = valves
+        return await asyncio.to_thread(handler, **params)
+
+
 async def chat_completion_filter_functions_handler(body, model, extra_params):
     skip_files = None
 
-    filter_ids = get_filter_function_ids(model)
+    filter_ids = await asyncio.to_thread(get_filter_function_ids, model)
     for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
-        if not filter:
+        function_module, valves = await asyncio.to_thread(load_filter_module, filter_id)
+        if not function_module:
             continue
 
-        if filter_id in webui_app.state.FUNCTIONS:
-            function_module = webui_app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            webui_app.state.FUNCTIONS[filter_id] = function_module
-
         # Check if the function has a file_handler variable
         if hasattr(function_module, "file_handler"):
             skip_files = function_module.file_handler
 
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
-
         if not hasattr(function_module, "inlet"):
             continue
 
@@ -309,17 +370,18 @@ async def chat_completion_filter_functions_handler(body, model, extra_params):
             if "__user__" in params and hasattr(function_module, "UserValves"):
                 try:
                     params["__user__"]["valves"] = function_module.UserValves(
-                        **Functions.get_user_valves_by_id_and_user_id(
-                            filter_id, params["__user__"]["id"]
+                        **await asyncio.to_thread(
+                            Functions.get_user_valves_by_id_and_user_id,
+                            filter_id,
+                            params["__user__"]["id"],
                         )
                     )
                 except Exception as e:
                     print(e)
 
-            if inspect.iscoroutinefunction(inlet):
-                body = await inlet(**params)
-            else:
-                body = inlet(**params)
+            body = await call_filter_handler(
+                filter_id, function_module, valves, inlet, params
+            )
 
         except Exception as e:
             print(f"Error: {e}")
@@ -382,7 +444,8 @@ async def chat_completion_tools_handler(
     citations = []
 
     task_model_id = get_task_model_id(body["model"])
-    tools = get_tools(
+    tools = await asyncio.to_thread(
+        get_tools,
         webui_app,
         tool_ids,
         user,
@@ -412,7 +475,7 @@ async def chat_completion_tools_handler(
     )
 
     try:
-        payload = filter_pipeline(payload, user)
+        payload = await filter_pipeline(payload, user)
     except Exception as e:
         raise e
 
@@ -491,7 +554,8 @@ async def chat_completion_files_handler(body) -> tuple[dict, dict[str, list]]:
     citations = []
 
     if files := body.get("metadata", {}).get("files", None):
-        contexts, citations = get_rag_context(
+        contexts, citations = await asyncio.to_thread(
+            get_rag_context,
             files=files,
             messages=body["messages"],
             embedding_function=retrieval_app.state.EMBEDDING_FUNCTION,
@@ -500,6 +564,7 @@ async def chat_completion_files_handler(body) -> tuple[dict, dict[str, list]]:
             r=retrieval_app.state.config.RELEVANCE_THRESHOLD,
             hybrid_search=retrieval_app.state.config.ENABLE_RAG_HYBRID_SEARCH,
             embedding_engine=retrieval_app.state.config.RAG_EMBEDDING_ENGINE,
+            embedding_model=retrieval_app.state.config.RAG_EMBEDDING_MODEL,
         )
 
         log.debug(f"rag_contexts: {contexts}, citations: {citations}")
@@ -525,7 +590,8 @@ async def get_body_and_model_and_user(request):
         raise Exception("Model not found")
     model = app.state.MODELS[model_id]
 
-    user = get_current_user(
+    user = await asyncio.to_thread(
+        get_current_user,
         request,
         get_http_authorization_cred(request.headers.get("Authorization")),
     )
@@ -707,7 +773,7 @@ def get_sorted_filters(model_id):
     return sorted_filters
 
 
-def filter_pipeline(payload, user):
+async def filter_pipeline(payload, user):
     user = {"id": user.id, "email": user.email, "name": user.name, "role": user.role}
     model_id = payload["model"]
     sorted_filters = get_sorted_filters(model_id)
@@ -729,25 +795,30 @@ def filter_pipeline(payload, user):
                 continue
 
             headers = {"Authorization": f"Bearer {key}"}
-            r = requests.post(
+            r = await HTTP_CLIENT_POOL.get(url).post(
                 f"{url}/{filter['id']}/filter/inlet",
                 headers=headers,
                 json={
                     "user": user,
                     "body": payload,
                 },
+                timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
             )
 
+            # Read before raise_for_status(), which releases the response
+            res = await r.json(content_type=None)
             r.raise_for_status()
-            payload = r.json()
+            payload = res
         except Exception as e:
             # Handle connection error here
             print(f"Connection error: {e}")
 
             if r is not None:
-                res = r.json()
+                res = await r.json(content_type=None)
                 if "detail" in res:
-                    raise Exception(r.status_code, res["detail"])
+                    raise Exception(r.status, res["detail"])
+        finally:
+            await release_response(r)
 
     return payload
 
@@ -767,7 +838,8 @@ class PipelineMiddleware(BaseHTTPMiddleware):
         data = json.loads(body_str) if body_str else {}
 
         try:
-            user = get_current_user(
+            user = await asyncio.to_thread(
+                get_current_user,
                 request,
                 get_http_authorization_cred(request.headers["Authorization"]),
             )
@@ -784,7 +856,7 @@ class PipelineMiddleware(BaseHTTPMiddleware):
                 )
 
         try:
-            data = filter_pipeline(data, user)
+            data = await filter_pipeline(data, user)
         except Exception as e:
             if len(e.args) > 1:
                 return JSONResponse(
@@ -876,6 +948,59 @@ async def check_url(request: Request, call_next):
     return response
 
 
+# Requests changing the models of the connections, or the models and
+# functions stored locally
+CONNECTION_MODELS_PATHS = [
+    "/ollama/config/update",
+    "/ollama/urls/update",
+    "/ollama/api/pull",
+    "/ollama/api/create",
+    "/ollama/api/copy",
+    "/ollama/api/delete",
+    "/ollama/models/download",
+    "/ollama/models/upload",
+    "/openai/config/update",
+    "/openai/urls/update",
+    "/openai/keys/update",
+    "/api/pipelines",
+]
+LOCAL_MODELS_PATHS = [
+    "/api/v1/models",
+    "/api/v1/functions",
+    "/api/v1/evaluations/config",
+    "/api/v1/configs/import",
+]
+
+
+@app.middleware("http")
+async def update_model_registry(request: Request, call_next):
+    response = await call_next(request)
+    if request.method == "GET" or response.status_code >= 400:
+        return response
+
+    path = request.url.path
+    if any(path.startswith(prefix) for prefix in CONNECTION_MODELS_PATHS):
+        update = MODEL_REGISTRY.refresh
+    elif any(path.startswith(prefix) for prefix in LOCAL_MODELS_PATHS):
+        update = MODEL_REGISTRY.rebuild
+    else:
+        return response
+
+    # After the body, pulls and uploads stream their progress
+    body_iterator = response.body_iterator
+
+    async def update_after_body():
+        async for chunk in body_iterator:
+            yield chunk
+        try:
+            await update()
+        except Exception as e:
+            log.error(f"Updating the models after {path} failed: {e}")
+
+    response.body_iterator = update_after_body()
+    return response
+
+
 @app.middleware("http")
 async def update_embedding_function(request: Request, call_next):
     response = await call_next(request)
@@ -916,9 +1041,8 @@ app.mount("/api/v1", webui_app)
 webui_app.state.EMBEDDING_FUNCTION = retrieval_app.state.EMBEDDING_FUNCTION
 
 
-async def get_all_models():
-    # TODO: Optimize this function
-    open_webui_models = []
+async def fetch_connection_models():
+    """Models of the Ollama and OpenAI connections, queries every one of them."""
     openai_models = []
     ollama_models = []
 
@@ -940,9 +1064,14 @@ async def get_all_models():
             for model in ollama_models["models"]
         ]
 
+    return openai_models + ollama_models
+
+
+async def build_models(connection_models: list):
     open_webui_models = await get_open_webui_models()
 
-    models = open_webui_models + openai_models + ollama_models
+    # Copies, the connection models are kept for the next builds
+    models = open_webui_models + [{**model} for model in connection_models]
 
     # If there are no models, return an empty list
     if len([model for model in models if model["owned_by"] != "arena"]) == 0:
@@ -1069,6 +1198,15 @@ async def get_all_models():
     return models
 
 
+MODEL_REGISTRY = ModelRegistry(
+    fetch_connection_models, build_models, ttl=MODELS_CACHE_TTL
+)
+
+
+async def get_all_models():
+    return await MODEL_REGISTRY.get()
+
+
 @app.get("/api/models")
 async def get_models(user=Depends(get_verified_user)):
     models = await get_all_models()
@@ -1206,7 +1344,7 @@ async def chat_completed(form_data: dict, user=Depends(get_verified_user)):
 
             if key != "":
                 headers = {"Authorization": f"Bearer {key}"}
-                r = requests.post(
+                r = await HTTP_CLIENT_POOL.get(url).post(
                     f"{url}/{filter['id']}/filter/outlet",
                     headers=headers,
                     json={
@@ -1218,20 +1356,22 @@ async def chat_completed(form_data: dict, user=Depends(get_verified_user)):
                         },
                         "body": data,
                     },
+                    timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
                 )
 
+                res = await r.json(content_type=None)
                 r.raise_for_status()
-                data = r.json()
+                data = res
         except Exception as e:
             # Handle connection error here
             print(f"Connection error: {e}")
 
             if r is not None:
                 try:
-                    res = r.json()
+                    res = await r.json(content_type=None)
                     if "detail" in res:
                         return JSONResponse(
-                            status_code=r.status_code,
+                            status_code=r.status,
                             content=res,
                         )
                 except Exception:
@@ -1239,6 +1379,8 @@ async def chat_completed(form_data: dict, user=Depends(get_verified_user)):
 
             else:
                 pass
+        finally:
+            await release_response(r)
 
     __event_emitter__ = get_event_emitter(
         {
@@ -1256,46 +1398,12 @@ async def chat_completed(form_data: dict, user=Depends(get_verified_user)):
         }
     )
 
-    def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None and hasattr(function, "valves"):
-            # TODO: Fix FunctionModel to include vavles
-            return (function.valves if function.valves else {}).get("priority", 0)
-        return 0
-
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
-    if "info" in model and "meta" in model["info"]:
-        filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-        filter_ids = list(set(filter_ids))
-
-    enabled_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
-    filter_ids = [
-        filter_id for filter_id in filter_ids if filter_id in enabled_filter_ids
-    ]
-
-    # Sort filter_ids by priority, using the get_priority function
-    filter_ids.sort(key=get_priority)
-
+    filter_ids = await asyncio.to_thread(get_filter_function_ids, model)
     for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
-        if not filter:
+        function_module, valves = await asyncio.to_thread(load_filter_module, filter_id)
+        if not function_module:
             continue
 
-        if filter_id in webui_app.state.FUNCTIONS:
-            function_module = webui_app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            webui_app.state.FUNCTIONS[filter_id] = function_module
-
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
-
         if not hasattr(function_module, "outlet"):
             continue
         try:
@@ -1329,8 +1437,10 @@ async def chat_completed(form_data: dict, user=Depends(get_verified_user)):
                 try:
                     if hasattr(function_module, "UserValves"):
                         __user__["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, user.id
+                            **await asyncio.to_thread(
+                                Functions.get_user_valves_by_id_and_user_id,
+                                filter_id,
+                                user.id,
                             )
                         )
                 except Exception as e:
@@ -1338,10 +1448,9 @@ async def chat_completed(form_data: dict, user=Depends(get_verified_user)):
 
                 params = {**params, "__user__": __user__}
 
-            if inspect.iscoroutinefunction(outlet):
-                data = await outlet(**params)
-            else:
-                data = outlet(**params)
+            data = await call_filter_handler(
+                filter_id, function_module, valves, outlet, params
+            )
 
         except Exception as e:
             print(f"Error: {e}")
@@ -1582,7 +1691,7 @@ Artificial Intelligence in Healthcare
 
     # Handle pipeline filters
     try:
-        payload = filter_pipeline(payload, user)
+        payload = await filter_pipeline(payload, user)
     except Exception as e:
         if len(e.args) > 1:
             return JSONResponse(
@@ -1651,7 +1760,7 @@ JSON format: { "tags": ["tag1", "tag2", "tag3"] }
 
     # Handle pipeline filters
     try:
-        payload = filter_pipeline(payload, user)
+        payload = await filter_pipeline(payload, user)
     except Exception as e:
         if len(e.args) > 1:
             return JSONResponse(
@@ -1728,7 +1837,7 @@ Search Query:"""
 
     # Handle pipeline filters
     try:
-        payload = filter_pipeline(payload, user)
+        payload = await filter_pipeline(payload, user)
     except Exception as e:
         if len(e.args) > 1:
             return JSONResponse(
@@ -1796,7 +1905,7 @@ Message: """{{prompt}}"""
 
     # Handle pipeline filters
     try:
-        payload = filter_pipeline(payload, user)
+        payload = await filter_pipeline(payload, user)
     except Exception as e:
         if len(e.args) > 1:
             return JSONResponse(
@@ -1857,7 +1966,7 @@ Responses from models: {{responses}}"""
     log.debug(payload)
 
     try:
-        payload = filter_pipeline(payload, user)
+        payload = await filter_pipeline(payload, user)
     except Exception as e:
         if len(e.args) > 1:
             return JSONResponse(
@@ -2320,6 +2429,11 @@ async def update_webhook_url(form_data: UrlForm, user=Depends(get_admin_user)):
     return {"url": app.state.config.WEBHOOK_URL}
 
 
+@app.get("/api/http/stats")
+async def get_http_client_stats(user=Depends(get_admin_user)):
+    return HTTP_CLIENT_POOL.stats()
+
+
 @app.get("/api/version")
 async def get_app_version():
     return {
@@ -0,0 +1,39 @@
+"""Add ingestion_job table
+
+Revision ID: 5f3c1e2a9b7d
+Revises: 4ace53fd72c8
+Create Date: 2024-10-28 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "5f3c1e2a9b7d"
+down_revision = "4ace53fd72c8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ingestion_job",
+        sa.Column("id", sa.Text(), primary_key=True),
+        sa.Column("user_id", sa.Text(), nullable=True),
+        sa.Column("file_id", sa.Text(), nullable=True),
+        sa.Column("collection_name", sa.Text(), nullable=True),
+        sa.Column("status", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.BigInteger(), nullable=True),
+        sa.Column("worker_id", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+    )
+    op.create_index("ingestion_job_status_idx", "ingestion_job", ["status"])
+    op.create_index("ingestion_job_file_id_idx", "ingestion_job", ["file_id"])
+
+
+def downgrade():
+    op.drop_index("ingestion_job_file_id_idx", table_name="ingestion_job")
+    op.drop_index("ingestion_job_status_idx", table_name="ingestion_job")
+    op.drop_table("ingestion_job")
@@ -0,0 +1,46 @@
+"""Add collection_file table
+
+Revision ID: 8d2e4c6b1a3f
+Revises: 5f3c1e2a9b7d
+Create Date: 2024-11-04 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "8d2e4c6b1a3f"
+down_revision = "5f3c1e2a9b7d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "collection_file",
+        sa.Column("id", sa.Text(), primary_key=True),
+        sa.Column("collection_name", sa.Text(), nullable=False),
+        sa.Column("file_id", sa.Text(), nullable=True),
+        sa.Column("hash", sa.Text(), nullable=True),
+        sa.Column("chunk_count", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.BigInteger(), nullable=False),
+    )
+    op.create_index(
+        "collection_file_collection_hash_idx",
+        "collection_file",
+        ["collection_name", "hash"],
+    )
+    op.create_index(
+        "collection_file_collection_file_id_idx",
+        "collection_file",
+        ["collection_name", "file_id"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "collection_file_collection_file_id_idx", table_name="collection_file"
+    )
+    op.drop_index("collection_file_collection_hash_idx", table_name="collection_file")
+    op.drop_table("collection_file")
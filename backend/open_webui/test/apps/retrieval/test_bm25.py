@@ -0,0 +1,92 @@
+import os
+
+from open_webui.apps.retrieval.bm25.main import BM25Index, BM25IndexManager
+
+
+def add_docs(index: BM25Index, start: int, count: int, file_id: str = "file-1"):
+    index.add(
+        ids=[f"doc-{idx}" for idx in range(start, start + count)],
+        texts=[
+            f"common word{idx} topic{idx % 3}" for idx in range(start, start + count)
+        ],
+        metadatas=[
+            {"file_id": file_id, "idx": idx} for idx in range(start, start + count)
+        ],
+    )
+
+
+def result_ids(results) -> set[str]:
+    return {id for id, _, _, _ in results}
+
+
+class TestBM25Index:
+    def test_insert_delete_search(self, tmp_path):
+        index = BM25Index(str(tmp_path / "collection"))
+        assert not index.exists()
+        assert index.search("common", k=5) == []
+
+        add_docs(index, 0, 10)
+        assert index.exists()
+
+        results = index.search("word3", k=5)
+        assert [id for id, _, _, _ in results] == ["doc-3"]
+        assert results[0][2] == {"file_id": "file-1", "idx": 3}
+
+        index.delete(ids=["doc-3"])
+        assert index.search("word3", k=5) == []
+        assert "doc-4" in result_ids(index.search("word4", k=5))
+
+    def test_delete_by_filter(self, tmp_path):
+        index = BM25Index(str(tmp_path / "collection"))
+        add_docs(index, 0, 5, file_id="file-1")
+        add_docs(index, 5, 5, file_id="file-2")
+
+        index.delete(filter={"file_id": "file-1"})
+        assert result_ids(index.search("common", k=20)) == {
+            f"doc-{idx}" for idx in range(5, 10)
+        }
+
+    def test_compaction_keeps_live_documents(self, tmp_path):
+        index = BM25Index(str(tmp_path / "collection"))
+        for start in range(0, 50, 5):
+            add_docs(index, start, 5)
+        index.delete(ids=[f"doc-{idx}" for idx in range(0, 30)])
+
+        # Too many segments and tombstones, everything was rewritten into one
+        manifest = index._read_manifest()
+        assert len(manifest["segments"]) == 1
+        assert manifest["deleted"] == {}
+        assert result_ids(index.search("common", k=50)) == {
+            f"doc-{idx}" for idx in range(30, 50)
+        }
+
+    def test_writes_of_another_worker_are_visible(self, tmp_path):
+        path = str(tmp_path / "collection")
+        reader = BM25Index(path)
+        writer = BM25Index(path)
+
+        add_docs(writer, 0, 10)
+        assert "doc-3" in result_ids(reader.search("word3", k=5))
+
+        # A filesystem with coarse timestamps gives the rewritten manifest
+        # the same mtime as the previous one
+        stat = os.stat(writer.manifest_path)
+        writer.delete(ids=["doc-3"])
+        os.utime(writer.manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert reader.search("word3", k=5) == []
+
+    def test_recreated_collection_is_reloaded(self, tmp_path):
+        root = str(tmp_path / "bm25")
+        reader = BM25IndexManager(root)
+        writer = BM25IndexManager(root)
+
+        writer.insert("collection", ["doc-1"], ["first version"], [{}])
+        assert result_ids(reader.search("collection", "first", k=5)) == {"doc-1"}
+
+        # Same generation as before the delete, but a new manifest id
+        writer.delete_collection("collection")
+        writer.insert("collection", ["doc-2"], ["second version"], [{}])
+
+        assert reader.search("collection", "first", k=5) == []
+        assert result_ids(reader.search("collection", "second", k=5)) == {"doc-2"}
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import time
+
+import pytest
+
+from open_webui.apps.retrieval.embeddings.server import EmbeddingServer
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    from sentence_transformers import SentenceTransformer, models
+
+    # Bag of words model, loads without downloading anything
+    path = str(tmp_path_factory.mktemp("model"))
+    SentenceTransformer(modules=[models.BoW(vocab=["hello", "world"])]).save(path)
+    return path
+
+
+def wait_until_stopped(server: EmbeddingServer, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while server._ping(0):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+
+
+class TestEmbeddingServer:
+    def test_encode(self, model_path, tmp_path):
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_path)
+        server = EmbeddingServer(model_path, path=str(tmp_path))
+        try:
+            texts = ["hello world", "world", "hello"]
+            assert server.encode(texts).tolist() == model.encode(texts).tolist()
+            assert server.encode("hello").tolist() == model.encode("hello").tolist()
+        finally:
+            server.close()
+        wait_until_stopped(server)
+
+    def test_close_keeps_servers_used_by_other_workers(self, model_path, tmp_path):
+        server = EmbeddingServer(model_path, path=str(tmp_path))
+
+        # Another web worker using the same model
+        other = subprocess.Popen(["sleep", "60"])
+        users_path = os.path.join(server.path, "users.json")
+        with open(users_path, "r") as f:
+            users = json.load(f)
+        with open(users_path, "w") as f:
+            json.dump(users + [other.pid], f)
+
+        try:
+            server.close()
+            assert server._ping(0)
+        finally:
+            other.kill()
+            other.wait()
+
+        # The other worker exited without closing, the next close stops the
+        # servers it left behind
+        server = EmbeddingServer(model_path, path=str(tmp_path))
+        assert server.encode(["hello"]).shape == (1, 2)
+        server.close()
+        wait_until_stopped(server)
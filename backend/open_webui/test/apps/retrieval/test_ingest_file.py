@@ -0,0 +1,87 @@
+import uuid
+
+import pytest
+
+from test.util.abstract_integration_test import AbstractPostgresTest
+
+
+def embedding_function(texts: list[str], is_query: bool = False) -> list[list[float]]:
+    # Deterministic stand-in for the embedding model
+    return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+
+class TestIngestFile(AbstractPostgresTest):
+    @classmethod
+    def setup_class(cls):
+        super().setup_class()
+        from open_webui.apps.retrieval import main
+
+        cls.retrieval = main
+
+    @pytest.fixture(autouse=True)
+    def fake_embeddings(self, monkeypatch):
+        monkeypatch.setattr(
+            self.retrieval,
+            "get_embedding_function",
+            lambda *args, **kwargs: embedding_function,
+        )
+
+    def teardown_method(self):
+        from open_webui.apps.webui.models.collection_files import CollectionFiles
+        from open_webui.apps.webui.models.files import Files
+
+        Files.delete_all_files()
+        CollectionFiles.delete_all()
+        super().teardown_method()
+
+    def _insert_file(self, content: str):
+        from open_webui.apps.webui.models.files import FileForm, Files
+
+        id = str(uuid.uuid4())
+        return Files.insert_new_file(
+            "1",
+            FileForm(
+                id=id,
+                filename="notes.txt",
+                path="",
+                data={"content": content},
+                meta={"name": "notes.txt"},
+            ),
+        )
+
+    def _documents(self, collection_name: str) -> list[str]:
+        result = self.retrieval.VECTOR_DB_CLIENT.get(collection_name=collection_name)
+        return sorted(result.documents[0]) if result is not None else []
+
+    def test_content_update_replaces_chunks(self):
+        ProcessFileForm = self.retrieval.ProcessFileForm
+        ingest_file = self.retrieval.ingest_file
+
+        file = self._insert_file("the first version of the notes")
+        knowledge_id = f"knowledge-{uuid.uuid4()}"
+
+        # Upload, then add the file to a knowledge base
+        ingest_file(ProcessFileForm(file_id=file.id))
+        ingest_file(ProcessFileForm(file_id=file.id, collection_name=knowledge_id))
+        assert self._documents(f"file-{file.id}") == ["the first version of the notes"]
+        assert self._documents(knowledge_id) == ["the first version of the notes"]
+
+        # /files/{id}/data/content/update, then /knowledge/{id}/file/update
+        result = ingest_file(
+            ProcessFileForm(file_id=file.id, content="the second version")
+        )
+        assert result["chunks"] == {"added": 1, "reused": 0, "removed": 1}
+        ingest_file(
+            ProcessFileForm(file_id=file.id, collection_name=knowledge_id),
+            replace=True,
+        )
+
+        assert self._documents(f"file-{file.id}") == ["the second version"]
+        assert self._documents(knowledge_id) == ["the second version"]
+
+        # Saving unchanged content reuses the stored chunk
+        result = ingest_file(
+            ProcessFileForm(file_id=file.id, content="the second version")
+        )
+        assert result["chunks"] == {"added": 0, "reused": 1, "removed": 0}
+        assert self._documents(f"file-{file.id}") == ["the second version"]
@@ -0,0 +1,168 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from open_webui.apps.retrieval.vector.dbs.numpy_store import (
+    MERGE_FACTOR,
+    NumpyClient,
+)
+
+
+def make_items(start: int, count: int, file_id: str = "file-1") -> list[dict]:
+    # One-hot vectors, every item is its own nearest neighbour
+    return [
+        {
+            "id": f"doc-{idx}",
+            "text": f"text {idx}",
+            "vector": [1.0 if dim == idx else 0.0 for dim in range(32)],
+            "metadata": {"file_id": file_id, "idx": idx},
+        }
+        for idx in range(start, start + count)
+    ]
+
+
+def query_vector(idx: int) -> list[float]:
+    return [1.0 if dim == idx else 0.0 for dim in range(32)]
+
+
+def top_id(client: NumpyClient, collection_name: str, idx: int) -> str:
+    result = client.search(collection_name, [query_vector(idx)], limit=1)
+    return result.ids[0][0] if result.ids[0] else None
+
+
+class TestNumpyClient:
+    def test_insert_delete_search(self, tmp_path):
+        client = NumpyClient(root=str(tmp_path))
+        assert not client.has_collection("collection")
+        assert client.search("collection", [query_vector(0)], limit=1) is None
+
+        client.insert("collection", make_items(0, 10))
+        assert client.has_collection("collection")
+
+        result = client.search("collection", [query_vector(3)], limit=1)
+        assert result.ids == [["doc-3"]]
+        assert result.documents == [["text 3"]]
+        assert result.metadatas == [[{"file_id": "file-1", "idx": 3}]]
+        assert abs(result.distances[0][0]) < 1e-5
+
+        client.delete("collection", ids=["doc-3"])
+        assert top_id(client, "collection", 3) != "doc-3"
+        assert top_id(client, "collection", 4) == "doc-4"
+
+    def test_delete_by_filter_and_query(self, tmp_path):
+        client = NumpyClient(root=str(tmp_path))
+        client.insert("collection", make_items(0, 5, file_id="file-1"))
+        client.insert("collection", make_items(5, 5, file_id="file-2"))
+
+        result = client.query("collection", filter={"file_id": "file-2"})
+        assert set(result.ids[0]) == {f"doc-{idx}" for idx in range(5, 10)}
+
+        client.delete("collection", filter={"file_id": "file-1"})
+        assert set(client.get("collection").ids[0]) == {
+            f"doc-{idx}" for idx in range(5, 10)
+        }
+
+    def test_upsert_replaces_items(self, tmp_path):
+        client = NumpyClient(root=str(tmp_path))
+        client.insert("collection", make_items(0, 5))
+
+        item = make_items(2, 1)[0]
+        item["metadata"] = {"file_id": "file-1", "idx": 2, "name": "renamed"}
+        client.upsert("collection", [item])
+
+        result = client.query("collection", filter={"idx": 2})
+        assert result.ids == [["doc-2"]]
+        assert result.metadatas[0][0]["name"] == "renamed"
+
+    def test_get_vectors(self, tmp_path):
+        client = NumpyClient(root=str(tmp_path))
+        assert client.get_vectors("collection", ["doc-1"]) == {}
+
+        client.insert("collection", make_items(0, 5))
+        client.delete("collection", ids=["doc-2"])
+
+        vectors = client.get_vectors("collection", ["doc-1", "doc-2", "missing"])
+        assert list(vectors.keys()) == ["doc-1"]
+        assert vectors["doc-1"] == query_vector(1)
+
+    def test_merge_keeps_live_items(self, tmp_path):
+        client = NumpyClient(root=str(tmp_path))
+        for start in range(MERGE_FACTOR):
+            client.insert("collection", make_items(start, 1))
+
+        # The single-row segments of the same size tier were merged
+        collection = client._collection("collection")
+        manifest = collection._read_manifest()
+        assert len(manifest["segments"]) == 1
+        for name in os.listdir(collection.path):
+            assert not name.startswith("seg-") or name in manifest["segments"]
+
+        for idx in range(MERGE_FACTOR):
+            assert top_id(client, "collection", idx) == f"doc-{idx}"
+
+    def test_merge_waits_for_pinned_segments(self, tmp_path):
+        client = NumpyClient(root=str(tmp_path))
+        client.insert("collection", make_items(0, 1))
+
+        # As pinned by a search running outside the collection lock
+        collection = client._collection("collection")
+        segment = next(iter(collection._segments.values()))
+        segment.pin()
+
+        for start in range(1, MERGE_FACTOR):
+            client.insert("collection", make_items(start, 1))
+        assert segment.name not in collection._segments
+        assert segment.document(0)["id"] == "doc-0"
+
+        segment.unpin()
+        with pytest.raises(ValueError):
+            segment.document(0)
+
+    def test_searches_concurrent_with_merges(self, tmp_path):
+        client = NumpyClient(root=str(tmp_path))
+        client.insert("collection", make_items(0, 16))
+
+        def search(idx: int):
+            for _ in range(20):
+                assert top_id(client, "collection", idx % 16) == f"doc-{idx % 16}"
+
+        def insert():
+            # Single-row segments, merged every MERGE_FACTOR inserts
+            for start in range(16, 32):
+                client.insert("collection", make_items(start, 1))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            writer = executor.submit(insert)
+            list(executor.map(search, range(64)))
+            writer.result()
+
+        assert len(client.get("collection").ids[0]) == 32
+
+    def test_writes_of_another_worker_are_visible(self, tmp_path):
+        reader = NumpyClient(root=str(tmp_path))
+        writer = NumpyClient(root=str(tmp_path))
+
+        writer.insert("collection", make_items(0, 10))
+        assert top_id(reader, "collection", 3) == "doc-3"
+
+        # A filesystem with coarse timestamps gives the rewritten manifest
+        # the same mtime as the previous one
+        manifest_path = writer._collection("collection").manifest_path
+        stat = os.stat(manifest_path)
+        writer.delete("collection", ids=["doc-3"])
+        os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert top_id(reader, "collection", 3) != "doc-3"
+
+    def test_recreated_collection_is_reloaded(self, tmp_path):
+        reader = NumpyClient(root=str(tmp_path))
+        writer = NumpyClient(root=str(tmp_path))
+
+        writer.insert("collection", make_items(0, 1))
+        assert top_id(reader, "collection", 0) == "doc-0"
+
+        writer.delete_collection("collection")
+        writer.insert("collection", make_items(1, 1))
+
+        assert reader.get("collection").ids == [["doc-1"]]
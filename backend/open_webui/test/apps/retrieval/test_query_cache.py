@@ -0,0 +1,88 @@
+import pytest
+
+from open_webui.apps.retrieval.cache import CollectionVersions, QueryResultCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    versions = CollectionVersions(str(tmp_path / "cache" / "versions.db"))
+    return QueryResultCache(versions, max_size=2, ttl=60)
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"documents": [[f"result {self.calls}"]]}
+
+
+class TestQueryResultCache:
+    def test_hit(self, cache):
+        compute = Counter()
+        first = cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+        second = cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+
+        assert compute.calls == 1
+        assert first == second == {"documents": [["result 1"]]}
+        assert cache.stats()["hits"] == 1
+
+        # Callers get their own copy of the cached result
+        second["documents"].append(["modified"])
+        third = cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+        assert third == {"documents": [["result 1"]]}
+
+    def test_params_are_part_of_the_key(self, cache):
+        compute = Counter()
+        cache.get_or_compute("query", ["a"], {"query": "q", "k": 3}, compute)
+        cache.get_or_compute("query", ["a"], {"query": "q", "k": 4}, compute)
+        cache.get_or_compute("hybrid", ["a"], {"query": "q", "k": 3}, compute)
+        assert compute.calls == 3
+
+    def test_bump_invalidates_collection(self, cache):
+        compute = Counter()
+        cache.get_or_compute("query", ["a", "b"], {"query": "q"}, compute)
+        cache.get_or_compute("query", ["c"], {"query": "q"}, compute)
+
+        cache.bump("b")
+        result = cache.get_or_compute("query", ["a", "b"], {"query": "q"}, compute)
+        assert result == {"documents": [["result 3"]]}
+
+        # Other collections are unaffected
+        result = cache.get_or_compute("query", ["c"], {"query": "q"}, compute)
+        assert result == {"documents": [["result 2"]]}
+        assert compute.calls == 3
+
+    def test_bump_all_invalidates_every_collection(self, cache):
+        compute = Counter()
+        cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+
+        cache.bump_all()
+        cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+        assert compute.calls == 2
+
+    def test_versions_are_shared_across_workers(self, tmp_path, cache):
+        other = CollectionVersions(str(tmp_path / "cache" / "versions.db"))
+        compute = Counter()
+        cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+
+        other.bump("a")
+        cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+        assert compute.calls == 2
+
+    def test_lru_eviction(self, cache):
+        compute = Counter()
+        for query in ["q1", "q2", "q3"]:
+            cache.get_or_compute("query", ["a"], {"query": query}, compute)
+
+        assert cache.stats()["items"] == 2
+        cache.get_or_compute("query", ["a"], {"query": "q1"}, compute)
+        assert compute.calls == 4
+
+    def test_disabled_without_versions(self):
+        cache = QueryResultCache(None, max_size=10, ttl=60)
+        compute = Counter()
+        cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+        cache.get_or_compute("query", ["a"], {"query": "q"}, compute)
+        assert compute.calls == 2
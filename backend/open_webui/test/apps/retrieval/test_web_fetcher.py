@@ -0,0 +1,54 @@
+import asyncio
+
+from aiohttp import web
+
+from open_webui.apps.retrieval.web.fetcher import WebFetcher
+
+
+async def fetch_pages(fetcher: WebFetcher, delay: float, count: int):
+    async def page(request):
+        await asyncio.sleep(delay)
+        name = request.match_info["name"]
+        return web.Response(
+            text=f"<html><body><p>Page {name}</p></body></html>",
+            content_type="text/html",
+        )
+
+    app = web.Application()
+    app.router.add_get("/{name}", page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        return await fetcher.fetch_documents(
+            [f"http://127.0.0.1:{port}/{idx}" for idx in range(count)]
+        )
+    finally:
+        await runner.cleanup()
+
+
+class TestWebFetcher:
+    def test_fetch_documents(self):
+        fetcher = WebFetcher(per_host_limit=2, timeout=5, extract_workers=0)
+        docs = asyncio.run(fetch_pages(fetcher, delay=0, count=3))
+
+        assert sorted(doc.page_content.strip() for doc in docs) == [
+            "Page 0",
+            "Page 1",
+            "Page 2",
+        ]
+
+    def test_queued_pages_are_not_timed_out(self):
+        # Pages 2 and 3 wait for pages 0 and 1 for longer than half of the
+        # timeout, which only runs from the start of their own request
+        fetcher = WebFetcher(per_host_limit=2, timeout=1, extract_workers=0)
+        docs = asyncio.run(fetch_pages(fetcher, delay=0.6, count=4))
+        assert len(docs) == 4
+
+    def test_slow_pages_are_skipped(self):
+        fetcher = WebFetcher(per_host_limit=2, timeout=0.2, extract_workers=0)
+        docs = asyncio.run(fetch_pages(fetcher, delay=1, count=2))
+        assert docs == []
@@ -0,0 +1,85 @@
+from test.util.abstract_integration_test import AbstractPostgresTest
+
+
+class TestCollectionFiles(AbstractPostgresTest):
+    @classmethod
+    def setup_class(cls):
+        super().setup_class()
+        from open_webui.apps.webui.models.collection_files import CollectionFiles
+
+        cls.collection_files = CollectionFiles
+
+    def teardown_method(self):
+        self.collection_files.delete_all()
+        super().teardown_method()
+
+    def test_upsert(self):
+        entry = self.collection_files.upsert("collection", "file-1", "hash-1", 3)
+        assert entry.file_id == "file-1"
+        assert entry.chunk_count == 3
+
+        # The file's row is updated in place
+        updated = self.collection_files.upsert("collection", "file-1", "hash-2", 5)
+        assert updated.id == entry.id
+        assert updated.hash == "hash-2"
+        assert updated.chunk_count == 5
+
+        updated = self.collection_files.upsert(
+            "collection", "file-1", "hash-2", 2, increment=True
+        )
+        assert updated.chunk_count == 7
+
+        # Content without a file is tracked by its hash
+        text = self.collection_files.upsert("collection", None, "hash-3", 1)
+        assert text.id != entry.id
+        assert self.collection_files.upsert("collection", None, "hash-3", 2).id == (
+            text.id
+        )
+
+    def test_has_hash(self):
+        self.collection_files.upsert("collection", "file-1", "hash-1", 3)
+        self.collection_files.upsert("collection", None, "hash-2", 1)
+
+        assert self.collection_files.has_hash("collection", "hash-1")
+        assert not self.collection_files.has_hash("other", "hash-1")
+        assert not self.collection_files.has_hash("collection", "hash-3")
+
+        # A file is not a duplicate of its own previous content
+        assert not self.collection_files.has_hash(
+            "collection", "hash-1", exclude_file_id="file-1"
+        )
+        assert self.collection_files.has_hash(
+            "collection", "hash-1", exclude_file_id="file-2"
+        )
+        assert self.collection_files.has_hash(
+            "collection", "hash-2", exclude_file_id="file-1"
+        )
+
+    def test_insert_many_and_has_collection(self):
+        assert not self.collection_files.has_collection("collection")
+
+        self.collection_files.insert_many(
+            "collection",
+            [
+                {"file_id": "file-1", "hash": "hash-1", "chunk_count": 3},
+                {"hash": "hash-2", "chunk_count": 1},
+            ],
+        )
+        assert self.collection_files.has_collection("collection")
+        assert self.collection_files.has_hash("collection", "hash-1")
+        assert self.collection_files.has_hash("collection", "hash-2")
+
+    def test_deletes(self):
+        self.collection_files.upsert("collection", "file-1", "hash-1", 3)
+        self.collection_files.upsert("collection", None, "hash-2", 1)
+        self.collection_files.upsert("other", "file-1", "hash-1", 3)
+
+        self.collection_files.delete_by_file_id("collection", "file-1")
+        assert not self.collection_files.has_hash("collection", "hash-1")
+        assert self.collection_files.has_hash("other", "hash-1")
+
+        self.collection_files.delete_by_hash("collection", "hash-2")
+        assert not self.collection_files.has_collection("collection")
+
+        self.collection_files.delete_by_collection("other")
+        assert not self.collection_files.has_collection("other")
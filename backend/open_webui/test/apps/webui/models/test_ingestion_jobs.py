@@ -0,0 +1,180 @@
+import time
+
+from test.util.abstract_integration_test import AbstractPostgresTest
+
+
+class TestIngestionJobs(AbstractPostgresTest):
+    @classmethod
+    def setup_class(cls):
+        super().setup_class()
+        from open_webui.apps.webui.models.ingestion_jobs import IngestionJobs
+
+        cls.jobs = IngestionJobs
+
+    def teardown_method(self):
+        self.jobs.delete_all_jobs()
+        super().teardown_method()
+
+    def test_claim_next_job(self):
+        first = self.jobs.insert_new_job("1", "file-1")
+        second = self.jobs.insert_new_job("1", "file-2")
+        assert first.status == "queued"
+        assert first.attempts == 0
+
+        job = self.jobs.claim_next_job("worker-1")
+        assert job.status == "extracting"
+        assert job.worker_id == "worker-1"
+        assert job.attempts == 1
+
+        # A claimed job is not handed out twice
+        other = self.jobs.claim_next_job("worker-2")
+        assert {job.id, other.id} == {first.id, second.id}
+        assert self.jobs.claim_next_job("worker-2") is None
+
+    def test_knowledge_job_waits_for_file_job(self):
+        file_job = self.jobs.insert_new_job("1", "file-1")
+        knowledge_job = self.jobs.insert_new_job("1", "file-1", "knowledge-1")
+
+        assert self.jobs.claim_next_job("worker-1").id == file_job.id
+        # The file is still being extracted
+        assert self.jobs.claim_next_job("worker-2") is None
+
+        self.jobs.update_job_status_by_id(file_job.id, "indexed")
+        assert self.jobs.claim_next_job("worker-2").id == knowledge_job.id
+
+    def test_status_transitions(self):
+        job = self.jobs.insert_new_job("1", "file-1")
+        self.jobs.claim_next_job("worker-1")
+
+        job = self.jobs.update_job_status_by_id(job.id, "embedding")
+        assert job.status == "embedding"
+        assert job.error is None
+
+        job = self.jobs.update_job_status_by_id(job.id, "failed", "no content")
+        assert job.status == "failed"
+        assert job.error == "no content"
+
+        assert [job.id for job in self.jobs.get_jobs_by_status(["failed"])] == [job.id]
+        assert self.jobs.get_jobs_by_status(["queued", "extracting"]) == []
+
+    def test_requeue_stale_jobs(self):
+        job = self.jobs.insert_new_job("1", "file-1")
+        self.jobs.claim_next_job("worker-1")
+
+        # The worker is alive, its job is not stale
+        time.sleep(2.1)
+        self.jobs.touch_jobs_by_ids([job.id])
+        assert self.jobs.requeue_stale_jobs(timeout=1, max_attempts=2) == 0
+
+        # The worker died, the job is queued again
+        time.sleep(2.1)
+        assert self.jobs.requeue_stale_jobs(timeout=1, max_attempts=2) == 1
+        job = self.jobs.get_job_by_id(job.id)
+        assert job.status == "queued"
+        assert job.worker_id is None
+
+        # ...until it ran out of attempts
+        assert self.jobs.claim_next_job("worker-2").attempts == 2
+        time.sleep(2.1)
+        assert self.jobs.requeue_stale_jobs(timeout=1, max_attempts=2) == 1
+        job = self.jobs.get_job_by_id(job.id)
+        assert job.status == "failed"
+        assert job.error is not None
+
+    def test_delete_jobs_by_file_id(self):
+        self.jobs.insert_new_job("1", "file-1")
+        self.jobs.insert_new_job("1", "file-1", "knowledge-1")
+        other = self.jobs.insert_new_job("1", "file-2")
+
+        assert len(self.jobs.get_jobs_by_file_id("file-1")) == 2
+        self.jobs.delete_jobs_by_file_id("file-1")
+        assert self.jobs.get_jobs_by_file_id("file-1") == []
+        assert [job.id for job in self.jobs.get_jobs_by_file_id("file-2")] == [other.id]
+
+
+class TestIngestionQueue(AbstractPostgresTest):
+    @classmethod
+    def setup_class(cls):
+        super().setup_class()
+        from open_webui.apps.retrieval.ingestion.main import IngestionQueue
+        from open_webui.apps.webui.models.ingestion_jobs import IngestionJobs
+        from open_webui.apps.webui.models.knowledge import Knowledges
+
+        cls.queue = IngestionQueue(workers=0)
+        cls.jobs = IngestionJobs
+        cls.knowledges = Knowledges
+
+    def teardown_method(self):
+        self.jobs.delete_all_jobs()
+        self.knowledges.delete_all_knowledge()
+        super().teardown_method()
+
+    def _run(self, monkeypatch, job, ingest_file):
+        from open_webui.apps.retrieval.ingestion import main
+
+        monkeypatch.setattr(main, "ingest_file", ingest_file)
+        self.queue._run(job)
+        return self.jobs.get_job_by_id(job.id)
+
+    def _insert_knowledge(self, file_ids: list[str]):
+        from open_webui.apps.webui.models.knowledge import KnowledgeForm
+
+        return self.knowledges.insert_new_knowledge(
+            "1",
+            KnowledgeForm(
+                name="knowledge", description="", data={"file_ids": file_ids}
+            ),
+        )
+
+    def test_indexed_job_adds_file_to_knowledge(self, monkeypatch):
+        knowledge = self._insert_knowledge([])
+        self.jobs.insert_new_job("1", "file-1", knowledge.id)
+        job = self.jobs.claim_next_job("worker-1")
+
+        statuses = []
+        calls = []
+
+        def ingest_file(form_data, on_status=None, replace=False):
+            statuses.append(self.jobs.get_job_by_id(job.id).status)
+            on_status("embedding")
+            calls.append((form_data.file_id, form_data.collection_name, replace))
+
+        job = self._run(monkeypatch, job, ingest_file)
+        assert job.status == "indexed"
+        assert statuses == ["embedding"]
+        assert calls == [("file-1", knowledge.id, False)]
+
+        knowledge = self.knowledges.get_knowledge_by_id(knowledge.id)
+        assert knowledge.data["file_ids"] == ["file-1"]
+
+    def test_failed_job_leaves_knowledge_unchanged(self, monkeypatch):
+        knowledge = self._insert_knowledge([])
+        self.jobs.insert_new_job("1", "file-1", knowledge.id)
+        job = self.jobs.claim_next_job("worker-1")
+
+        def ingest_file(form_data, on_status=None, replace=False):
+            raise ValueError("The content provided is empty")
+
+        job = self._run(monkeypatch, job, ingest_file)
+        assert job.status == "failed"
+        assert job.error == "The content provided is empty"
+
+        knowledge = self.knowledges.get_knowledge_by_id(knowledge.id)
+        assert knowledge.data["file_ids"] == []
+
+    def test_file_already_in_knowledge_is_replaced(self, monkeypatch):
+        knowledge = self._insert_knowledge(["file-1"])
+        self.jobs.insert_new_job("1", "file-1", knowledge.id)
+        job = self.jobs.claim_next_job("worker-1")
+
+        calls = []
+
+        def ingest_file(form_data, on_status=None, replace=False):
+            calls.append(replace)
+
+        job = self._run(monkeypatch, job, ingest_file)
+        assert job.status == "indexed"
+        assert calls == [True]
+
+        knowledge = self.knowledges.get_knowledge_by_id(knowledge.id)
+        assert knowledge.data["file_ids"] == ["file-1"]
@@ -0,0 +1,135 @@
+import pytest
+
+from open_webui.utils import router as router_module
+from open_webui.utils.router import UpstreamRouter
+
+URLS = ["http://a", "http://b", "http://c"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(router_module.time, "monotonic", clock)
+    return clock
+
+
+def fail(router: UpstreamRouter, url: str, times: int):
+    for _ in range(times):
+        router.start(url)
+        router.finish(url, failed=True)
+
+
+class TestUpstreamRouter:
+    def test_ejection_after_consecutive_failures(self, clock):
+        router = UpstreamRouter("test", "random", failure_threshold=3, cooldown=30)
+
+        fail(router, "http://a", 2)
+        assert not router.stats()["upstreams"]["http://a"]["ejected"]
+
+        fail(router, "http://a", 1)
+        stats = router.stats()["upstreams"]["http://a"]
+        assert stats["ejected"]
+        assert stats["failures"] == 3
+        assert stats["in_flight"] == 0
+
+        assert all(router.choose(URLS) != "http://a" for _ in range(50))
+
+    def test_recovery_after_cooldown(self, clock):
+        router = UpstreamRouter("test", "random", failure_threshold=2, cooldown=30)
+        fail(router, "http://a", 2)
+
+        clock.now += 29
+        assert all(router.choose(URLS) != "http://a" for _ in range(50))
+
+        # Back in rotation once the cooldown is over
+        clock.now += 1
+        assert "http://a" in {router.choose(URLS) for _ in range(100)}
+
+        # ...but ejected again on its next failure
+        fail(router, "http://a", 1)
+        assert router.stats()["upstreams"]["http://a"]["ejected"]
+
+        # A success closes the circuit
+        clock.now += 30
+        router.record("http://a", failed=False)
+        fail(router, "http://a", 1)
+        assert not router.stats()["upstreams"]["http://a"]["ejected"]
+
+    def test_success_resets_consecutive_failures(self, clock):
+        router = UpstreamRouter("test", "random", failure_threshold=3, cooldown=30)
+
+        fail(router, "http://a", 2)
+        router.start("http://a")
+        router.finish("http://a")
+        fail(router, "http://a", 2)
+
+        stats = router.stats()["upstreams"]["http://a"]
+        assert not stats["ejected"]
+        assert stats["consecutive_failures"] == 2
+        assert stats["failures"] == 4
+
+    def test_all_upstreams_ejected(self, clock):
+        router = UpstreamRouter("test", "random", failure_threshold=1, cooldown=30)
+        for url in URLS:
+            fail(router, url, 1)
+
+        # Every upstream is still used rather than none
+        assert {router.choose(URLS) for _ in range(100)} == set(URLS)
+
+    def test_disabled_circuit_breaker(self, clock):
+        router = UpstreamRouter("test", "random", failure_threshold=0, cooldown=30)
+        fail(router, "http://a", 10)
+        assert not router.stats()["upstreams"]["http://a"]["ejected"]
+
+    def test_least_outstanding(self, clock):
+        router = UpstreamRouter(
+            "test", "least_outstanding", failure_threshold=3, cooldown=30
+        )
+        router.start("http://a")
+        router.start("http://b")
+        assert router.choose(URLS) == "http://c"
+
+        router.finish("http://a")
+        router.start("http://c")
+        assert router.choose(URLS) == "http://a"
+
+    def test_resident(self, clock):
+        router = UpstreamRouter(
+            "test",
+            "resident",
+            failure_threshold=3,
+            cooldown=30,
+            resident_max_in_flight=2,
+        )
+        router.set_resident("http://b", ["llama"])
+        router.start("http://b")
+        assert router.choose(URLS, "llama") == "http://b"
+
+        # Too busy, the least busy upstream loads the model instead
+        router.start("http://b")
+        url = router.choose(URLS, "llama")
+        assert url in ["http://a", "http://c"]
+        assert router.stats()["upstreams"][url]["resident"] == ["llama"]
+
+    def test_ewma(self, clock):
+        router = UpstreamRouter("test", "ewma", failure_threshold=3, cooldown=30)
+        router.observe("http://a", 1.0)
+        router.observe("http://b", 0.2)
+        router.observe("http://c", 0.5)
+        assert router.choose(URLS) == "http://b"
+
+        router.start("http://b")
+        router.start("http://b")
+        assert router.choose(URLS) == "http://c"
+
+    def test_unknown_policy_falls_back_to_random(self):
+        router = UpstreamRouter("test", "fastest", failure_threshold=3, cooldown=30)
+        assert router.policy == "random"
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from open_webui.env import (
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_LIMIT,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def get_origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class ClientSessionPool:
+    """
+    One aiohttp session per upstream origin, shared by every request to it so
+    that TCP/TLS connections and DNS lookups are reused between requests.
+
+    The app opens the sessions of the configured upstreams on startup, others
+    are created on first use since upstream URLs can be changed at runtime,
+    and close() closes them all when the app shuts down. Each session keeps
+    up to `limit` connections; requests beyond that wait for a connection and
+    are counted in the stats, which is where a saturated pool shows up.
+    """
+
+    def __init__(self, limit: int, keepalive_timeout: float, dns_cache_ttl: int):
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+        self._sessions: dict[
+            tuple[str, asyncio.AbstractEventLoop], aiohttp.ClientSession
+        ] = {}
+        self._stats: dict[str, dict] = {}
+
+    def _new_stats(self) -> dict:
+        return {
+            "requests": 0,
+            "errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "queued": 0,
+            "waiting": 0,
+            "queue_wait_total_ms": 0.0,
+            "queue_wait_max_ms": 0.0,
+        }
+
+    def _trace_config(self, stats: dict) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            stats["requests"] += 1
+
+        async def on_request_exception(session, ctx, params):
+            stats["errors"] += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_at = time.monotonic()
+            stats["queued"] += 1
+            stats["waiting"] += 1
+
+        async def on_connection_queued_end(session, ctx, params):
+            waited = (time.monotonic() - ctx.queued_at) * 1000
+            stats["waiting"] -= 1
+            stats["queue_wait_total_ms"] += waited
+            stats["queue_wait_max_ms"] = max(stats["queue_wait_max_ms"], waited)
+
+        async def on_connection_create_end(session, ctx, params):
+            stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats["connections_reused"] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def get(self, url: str) -> aiohttp.ClientSession:
+        """
+        Returns the session of the origin of `url`, never close it. A session
+        belongs to the event loop it was created in, calls from another loop
+        get a session of their own.
+        """
+        origin = get_origin(url)
+        loop = asyncio.get_running_loop()
+
+        session = self._sessions.get((origin, loop))
+        if session is not None and not session.closed:
+            return session
+
+        stats = self._stats.setdefault(origin, self._new_stats())
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            ),
+            trust_env=True,
+            trace_configs=[self._trace_config(stats)],
+        )
+        log.debug(f"Created the HTTP session of {origin}")
+        self._sessions[(origin, loop)] = session
+        return session
+
+    async def open(self, urls: list[str]):
+        """Creates the sessions of the configured upstreams ahead of the first request."""
+        for url in urls:
+            if url:
+                self.get(url)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        for (origin, session_loop), session in list(self._sessions.items()):
+            if session_loop is not loop:
+                continue
+            del self._sessions[(origin, session_loop)]
+            if not session.closed:
+                await session.close()
+
+    def stats(self) -> dict:
+        upstreams = {}
+        for origin, stats in self._stats.items():
+            connectors = [
+                session.connector
+                for (session_origin, _), session in self._sessions.items()
+                if session_origin == origin and not session.closed
+            ]
+            upstreams[origin] = {
+                **stats,
+                "sessions": len(connectors),
+                "limit": self.limit,
+                # Connections currently lent to a request
+                "in_use": sum(
+                    len(getattr(connector, "_acquired", ())) for connector in connectors
+                ),
+                "queue_wait_avg_ms": (
+                    stats["queue_wait_total_ms"] / stats["queued"]
+                    if stats["queued"]
+                    else 0.0
+                ),
+            }
+        return {"upstreams": upstreams}
+
+
+HTTP_CLIENT_POOL = ClientSessionPool(
+    limit=AIOHTTP_CLIENT_POOL_LIMIT,
+    keepalive_timeout=AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl=AIOHTTP_CLIENT_DNS_CACHE_TTL,
+)
+
+
+async def release_response(response: Optional[aiohttp.ClientResponse]):
+    """Gives the connection of `response` back to its pool once it is done with."""
+    if response:
+        response.release()
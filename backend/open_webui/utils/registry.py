@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ModelRegistry:
+    """
+    Snapshot of the models list, so that listing models does not query every
+    connection.
+
+    `fetch` returns the models of the connections (the expensive part), and
+    `build` turns them into the models list with what is stored locally
+    (custom models, functions, ...). The fetched models are kept for `ttl`
+    seconds, after which they are still served while they are fetched again
+    in the background; run() fetches them on startup and then every `ttl`
+    seconds so that requests rarely wait for them or see them stale.
+    Concurrent refreshes share one fetch.
+
+    refresh() fetches again, for when connections change, and rebuild()
+    builds the list again from the fetched models, for when local models or
+    functions change. With a `ttl` of 0 every get() fetches.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[list]],
+        build: Callable[[list], Awaitable[list]],
+        ttl: int,
+    ):
+        self.fetch = fetch
+        self.build = build
+        self.ttl = ttl
+
+        self._fetched: Optional[list] = None
+        self._fetched_at = 0.0
+        self._models: Optional[list] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at >= self.ttl
+
+    async def _refresh(self) -> list:
+        fetched = await self.fetch()
+        async with self._lock:
+            self._fetched = fetched
+            self._fetched_at = time.monotonic()
+            self._models = await self.build(fetched)
+            return self._models
+
+    def _log_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            log.error(f"Refreshing the models failed: {task.exception()}")
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._log_failure)
+        return self._refresh_task
+
+    async def refresh(self) -> list:
+        return await asyncio.shield(self._start_refresh())
+
+    async def rebuild(self):
+        async with self._lock:
+            if self._fetched is not None:
+                self._models = await self.build(self._fetched)
+
+    async def get(self) -> list:
+        if self.ttl <= 0 or self._fetched is None:
+            return await self.refresh()
+
+        if self.is_stale:
+            self._start_refresh()
+        if self._models is None:
+            await self.rebuild()
+        return self._models
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                # Logged by the task, the previous models are kept
+                pass
+            await asyncio.sleep(self.ttl)
@@ -0,0 +1,187 @@
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+POLICIES = ["random", "least_outstanding", "power_of_two", "resident", "ewma"]
+
+
+class UpstreamState:
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        # Seconds to the response headers, exponentially weighted
+        self.latency: Optional[float] = None
+        self.resident: set[str] = set()
+
+
+class UpstreamRouter:
+    """
+    Picks the upstream a request for a model goes to, among the upstreams
+    serving the model.
+
+    Policies:
+      random             the upstream is picked at random
+      least_outstanding  the upstream with the fewest requests in flight
+      power_of_two       the less busy of two upstreams picked at random
+      resident           the least busy upstream that has the model loaded,
+                         least_outstanding when none has or all of them
+                         have `resident_max_in_flight` requests in flight
+      ewma               the upstream with the lowest latency EWMA times its
+                         requests in flight plus one; upstreams without a
+                         latency yet come first
+
+    Ties are broken at random. Models are known to be loaded on an upstream
+    once a request for them was routed there, or from set_resident().
+
+    An upstream failing `failure_threshold` requests in a row (connection
+    errors, timeouts, 5xx) is ejected for `cooldown` seconds. It then gets
+    requests again, and is ejected again on its next failure until one
+    succeeds. When every upstream of a model is ejected, they are all used
+    rather than none.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        policy: str,
+        failure_threshold: int,
+        cooldown: float,
+        resident_max_in_flight: int = 4,
+        latency_alpha: float = 0.3,
+    ):
+        if policy not in POLICIES:
+            log.warning(f"Unknown {name} routing policy {policy}, using random")
+            policy = "random"
+
+        self.name = name
+        self.policy = policy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        # Ollama serves up to 4 requests per loaded model at once by default
+        self.resident_max_in_flight = resident_max_in_flight
+        self.latency_alpha = latency_alpha
+
+        self._upstreams: dict[str, UpstreamState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, url: str) -> UpstreamState:
+        state = self._upstreams.get(url)
+        if state is None:
+            state = self._upstreams[url] = UpstreamState()
+        return state
+
+    def _load(self, url: str) -> float:
+        state = self._state(url)
+        if self.policy == "ewma":
+            return (state.latency or 0.0) * (state.in_flight + 1)
+        return state.in_flight
+
+    def choose(self, urls: list[str], model: Optional[str] = None) -> str:
+        """Returns the url of the upstream to send a request for `model` to."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                url for url in urls if self._state(url).ejected_until <= now
+            ] or list(urls)
+
+            if self.policy == "power_of_two" and len(candidates) > 2:
+                candidates = random.sample(candidates, 2)
+            elif self.policy == "resident" and model:
+                candidates = [
+                    url
+                    for url in candidates
+                    if model in self._state(url).resident
+                    and self._state(url).in_flight < self.resident_max_in_flight
+                ] or candidates
+
+            if self.policy == "random":
+                url = random.choice(candidates)
+            else:
+                lowest = min(self._load(url) for url in candidates)
+                url = random.choice([u for u in candidates if self._load(u) == lowest])
+
+            if model and self.policy == "resident":
+                # The upstream loads the model to serve the request
+                self._state(url).resident.add(model)
+            return url
+
+    def start(self, url: str):
+        with self._lock:
+            state = self._state(url)
+            state.in_flight += 1
+            state.requests += 1
+
+    def observe(self, url: str, latency: float):
+        """Records the seconds `url` took to send the headers of a response."""
+        with self._lock:
+            state = self._state(url)
+            state.latency = (
+                latency
+                if state.latency is None
+                else self.latency_alpha * latency
+                + (1 - self.latency_alpha) * state.latency
+            )
+
+    def finish(self, url: str, failed: bool = False):
+        with self._lock:
+            state = self._state(url)
+            state.in_flight = max(state.in_flight - 1, 0)
+        self.record(url, failed)
+
+    def record(self, url: str, failed: bool):
+        """Records the outcome of a request to `url` for its circuit breaker."""
+        with self._lock:
+            state = self._state(url)
+            if not failed:
+                state.consecutive_failures = 0
+                return
+
+            state.failures += 1
+            state.consecutive_failures += 1
+            if (
+                self.failure_threshold > 0
+                and state.consecutive_failures >= self.failure_threshold
+            ):
+                if state.ejected_until <= time.monotonic():
+                    log.warning(
+                        f"{self.name} upstream {url} failed "
+                        f"{state.consecutive_failures} requests in a row, "
+                        f"ejecting it for {self.cooldown}s"
+                    )
+                state.ejected_until = time.monotonic() + self.cooldown
+
+    def set_resident(self, url: str, models: list[str]):
+        with self._lock:
+            self._state(url).resident = set(models)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "policy": self.policy,
+                "upstreams": {
+                    url: {
+                        "in_flight": state.in_flight,
+                        "requests": state.requests,
+                        "failures": state.failures,
+                        "consecutive_failures": state.consecutive_failures,
+                        "ejected": state.ejected_until > now,
+                        "ejected_for": max(state.ejected_until - now, 0.0),
+                        "latency_ms": (
+                            state.latency * 1000 if state.latency is not None else None
+                        ),
+                        "resident": sorted(state.resident),
+                    }
+                    for url, state in self._upstreams.items()
+                },
+            }
@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import threading
+import uuid
+from hashlib import sha256
+from typing import Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class FileLock:
+    # Serializes writers across uvicorn workers sharing the same DATA_DIR
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+
+
+def matches_filter(metadata: Optional[dict], filter: dict) -> bool:
+    if not metadata:
+        return False
+    return all(metadata.get(key) == value for key, value in filter.items())
+
+
+def collection_path(root: str, collection_name: str) -> str:
+    # Collection names that are not safe directory names are hashed
+    if re.fullmatch(r"[A-Za-z0-9_\-]{1,128}", collection_name):
+        return os.path.join(root, collection_name)
+    return os.path.join(root, sha256(collection_name.encode("utf-8")).hexdigest())
+
+
+# Generation of a collection that has not been loaded yet
+_UNLOADED = object()
+
+# Attempts at opening the segments of a manifest that was replaced meanwhile
+_LOAD_ATTEMPTS = 3
+
+
+class SegmentCollection:
+    """
+    Base of collections stored as immutable segment directories.
+
+    manifest.json lists the live segments and the tombstoned rows of each one.
+    Writers hold the collection's file lock, write new segments first and then
+    replace the manifest, which carries an `id` assigned when it is first
+    written and a `generation` incremented on every write. Readers reload
+    their segments whenever (id, generation) differs from what they loaded,
+    so they see the writes of other processes regardless of the filesystem's
+    timestamp granularity.
+
+    Subclasses implement _open_segment and may extend _empty_manifest.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self._lock = threading.RLock()
+        self._generation: Any = _UNLOADED
+        self._segments: dict[str, Any] = {}
+        self._deleted: dict[str, set[int]] = {}
+
+    def _open_segment(self, path: str):
+        raise NotImplementedError
+
+    def _empty_manifest(self) -> dict:
+        return {"segments": [], "deleted": {}}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def _write_lock(self) -> FileLock:
+        os.makedirs(self.path, exist_ok=True)
+        return FileLock(os.path.join(self.path, ".lock"))
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self._empty_manifest()
+
+    def _write_manifest(self, manifest: dict):
+        # Must be called with the write lock held
+        current = self._read_manifest()
+        manifest["id"] = current.get("id") or uuid.uuid4().hex
+        manifest["generation"] = current.get("generation", 0) + 1
+
+        tmp_path = f"{self.manifest_path}.{uuid.uuid4().hex}"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load(self):
+        # Reload lazily whenever another worker rewrote the manifest
+        for attempt in range(_LOAD_ATTEMPTS):
+            manifest = self._read_manifest()
+            generation = (manifest.get("id"), manifest.get("generation", 0))
+            if generation == self._generation:
+                return
+
+            segments = {}
+            opened = []
+            try:
+                for name in manifest["segments"]:
+                    segment = self._segments.get(name)
+                    if segment is None:
+                        segment = self._open_segment(os.path.join(self.path, name))
+                        opened.append(segment)
+                    segments[name] = segment
+            except FileNotFoundError:
+                # A concurrent merge removed a segment after we read the
+                # manifest, the new manifest no longer lists it
+                for segment in opened:
+                    segment.close()
+                if attempt == _LOAD_ATTEMPTS - 1:
+                    raise
+                continue
+
+            for name, segment in self._segments.items():
+                if name not in segments:
+                    segment.close()
+
+            self._segments = segments
+            self._deleted = {
+                name: set(indices) for name, indices in manifest["deleted"].items()
+            }
+            self._generation = generation
+            return
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments = {}
+            self._deleted = {}
+            self._generation = _UNLOADED